@@ -0,0 +1,145 @@
+from pymodaq.control_modules.move_utility_classes import DAQ_Move_base, \
+    comon_parameters_fun, main, DataActuatorType
+from pymodaq.utils.data import DataActuator
+from pymodaq.utils.parameter import Parameter
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_photoino import PhotoinoController
+import numpy as np
+
+
+class DAQ_Move_photoino(DAQ_Move_base):
+    """PyMoDAQ actuator scanning the trigger level (V) or the time base (ms)
+       of a photoino
+
+    Settings are written through the controller settings cache, so a move
+    is done as soon as it is sent. The actuator can share its controller
+    with the photoino viewers (Master/Slave); for a count versus trigger
+    level curve measured in one transfer, see the photoino-sweep Viewer1D.
+    """
+
+    _axis_names = {'Trigger level': 'trigger_level', 'Time base': 'time_base'}
+    _controller_units = {'Trigger level': 'V', 'Time base': 'ms'}
+    _epsilons = {'Trigger level': 1e-3, 'Time base': 1e-3}
+    # range accepted by the firmware, and value reached by move_home
+    hardware_limits = {'trigger_level': (-5., 5.), 'time_base': (0.1, 1e5)}
+    home = {'trigger_level': 1., 'time_base': 1.}
+    is_multiaxes = True
+    data_actuator_type = DataActuatorType.DataActuator
+    serial_ports = PhotoinoController.available_ports
+
+    params = [
+        {'title': 'Serial port:', 'name': 'serial_port', 'type': 'str',
+         'value': '', 'limits': serial_ports},
+        {'title': 'Baud rate:', 'name': 'baud_rate', 'type': 'int',
+         'value': 0, 'min': 0},
+        {'title': 'Binary protocol:', 'name': 'binary_protocol',
+         'type': 'bool', 'value': True},
+    ] + comon_parameters_fun(is_multiaxes, axis_names=_axis_names,
+                             epsilon=1e-3)
+
+    def ini_attributes(self):
+        self.controller: PhotoinoController = None
+
+    def get_actuator_value(self):
+        """Get the current value from the hardware with scaling conversion.
+
+        Returns
+        -------
+        DataActuator: The position obtained after scaling conversion.
+        """
+        value = getattr(self.controller, self.axis_value)
+        pos = DataActuator(data=float(value), units=self.axis_unit)
+        pos = self.get_position_with_scaling(pos)
+        return pos
+
+    def close(self):
+        """Terminate the communication protocol"""
+        if self.is_master:
+            self.controller.close()
+
+    def commit_settings(self, param: Parameter):
+        """Apply the consequences of a change of value in the actuator
+        settings
+
+        Parameters
+        ----------
+        param: Parameter
+            A given parameter (within detector_settings) whose value has
+            been changed by the user
+        """
+        if param.name() == "binary_protocol":
+            self.controller.set_binary(param.value())
+            if self.controller.binary != param.value():
+                param.setValue(self.controller.binary)
+
+    def ini_stage(self, controller=None):
+        """Actuator communication initialization
+
+        Parameters
+        ----------
+        controller: (object)
+            custom object of a PyMoDAQ plugin (Slave case). None if only one
+            actuator by controller (Master case)
+
+        Returns
+        -------
+        info: str
+        initialized: bool
+            False if initialization failed otherwise True
+        """
+        self.controller = self.ini_stage_init(old_controller=controller,
+                                              new_controller=PhotoinoController())
+        if self.is_master:
+            self.controller.open(self.settings['serial_port'],
+                                 self.settings['baud_rate'],
+                                 binary=self.settings['binary_protocol'])
+        self.settings.child('binary_protocol').setValue(self.controller.binary)
+
+        info = "photoino actuator initialised"
+        return info, True
+
+    def set_value(self, value):
+        low, high = self.hardware_limits[self.axis_value]
+        setattr(self.controller, self.axis_value,
+                float(np.clip(value, low, high)))
+
+    def move_abs(self, value: DataActuator):
+        """ Move the actuator to the absolute target defined by value
+
+        Parameters
+        ----------
+        value: (float) value of the absolute target positioning
+        """
+        value = self.check_bound(value)
+        self.target_value = value
+        value = self.set_position_with_scaling(value)
+        self.set_value(value.value())
+
+    def move_rel(self, value: DataActuator):
+        """ Move the actuator to the relative target actuator value defined
+        by value
+
+        Parameters
+        ----------
+        value: (float) value of the relative target positioning
+        """
+        value = self.check_bound(self.current_value + value) \
+            - self.current_value
+        self.target_value = value + self.current_value
+        value = self.set_position_relative_with_scaling(value)
+        self.set_value(getattr(self.controller, self.axis_value)
+                       + value.value())
+
+    def move_home(self):
+        """Set the current axis back to its default value"""
+        self.target_value = DataActuator(data=self.home[self.axis_value],
+                                         units=self.axis_unit)
+        self.set_value(self.home[self.axis_value])
+
+    def stop_motion(self):
+        """Settings are applied at once, nothing to stop"""
+        self.move_done()
+
+
+if __name__ == '__main__':
+    main(__file__)
@@ -1,21 +1,92 @@
 from pymodaq.control_modules.viewer_utility_classes import DAQ_Viewer_base, \
     comon_parameters, main
 from pymodaq.utils.parameter import Parameter
+from pymodaq.utils.daq_utils import ThreadCommand
 from pymodaq.utils.data import DataFromPlugins, DataToExport
 import numpy as np
-from pathlib import Path
+from contextlib import contextmanager
+import threading
+import time
 import serial
 
+from pymodaq_plugins_photoino.hardware.metrics import Metrics
+from pymodaq_plugins_photoino.hardware.multiplexer import PRIORITY_COUNTS, \
+    PRIORITY_SETTINGS, CommandQueue, DeviceBusy
+from pymodaq_plugins_photoino.hardware.ports import DeviceCache, \
+    available_ports, find_port, port_info
+from pymodaq_plugins_photoino.hardware.protocol import BLOCK_HEADER, \
+    COUNT_DTYPE, FRAME_SIZE, FrameDecoder, decode_block_header, decode_counts
+from pymodaq_plugins_photoino.hardware.serial_reader import SerialReader
+from pymodaq_plugins_photoino.hardware.settings_cache import SettingsCache
+from pymodaq_plugins_photoino.hardware.stream import SampleQueue, StreamReader
+from pymodaq_plugins_photoino.processing.stages import COUNTS, \
+    AdaptiveGatingStage, DecimationStage, RecorderStage, StatisticsStage, \
+    TimingStage, merge_groups
 
-class PhotoinoController:
-    """Controller class for interacting with photoino."""
-
-    available_ports = \
-        [str(path) for path in list(Path('/dev/').glob('ttyACM0'))]
 
-    def open(self, port, baudrate):
+class PhotoinoController:
+    """Controller class for interacting with photoino.
+
+    `time_base` and `trigger_level` are served from a SettingsCache once
+    known; their writes are coalesced over `settings.debounce` seconds and
+    flushed before every acquisition request. `verify_settings` reads them
+    back from the device.
+
+    Without port, `open` picks the most recently used photoino still
+    connected (DeviceCache), else the first candidate port. After a USB drop
+    `reconnect` reopens the same device (by serial number) in a background
+    thread, restores the settings and restarts the stream.
+
+    Every command and the reading of its reply run as one exchange on the
+    single I/O thread of `io`, so modules sharing the controller
+    (Master/Slave) never read each other's replies; count reads overtake
+    pending settings traffic. Starting and stopping the stream are
+    exchanges too. While streaming, the stream thread alone reads the port:
+    settings are still written and read from the cache, but queries needing
+    a reply ('rate?', 'counts?', 'sweep', `verify_settings`) raise
+    DeviceBusy.
+
+    `metrics` counts the bytes written, read and discarded and the streamed
+    bins, and times the 'rate?', 'counts?' and 'sweep' round trips and
+    `receive_number`, once enabled.
+    """
+
+    setting_commands = {'time_base': 'timebase', 'trigger_level': 'level'}
+    sweep_chunk = 32
+
+    available_ports = available_ports()
+
+    def __init__(self):
+        self.ser = None
+        self.stream = None
+        self.queue = SampleQueue()
+        self.decoder = FrameDecoder()
+        self.binary = False
+        self.settings = SettingsCache(self._write_setting)
+        self.metrics = Metrics()
+        self.io = CommandQueue()
+        self.device_cache = DeviceCache()
+        self.port = None
+        self.baudrate = 115200
+        self.identity = None
+        self.reconnecting = False
+        self.reconnect_interval = 0.5
+        self._binary_requested = False
+        self._connected = threading.Event()
+        self._closing = threading.Event()
+        self._close_lock = threading.Lock()
+
+    def open(self, port, baudrate, binary=False):
+        """Open the serial port, with `binary` try to switch the device to
+        the binary protocol, staying with ASCII if the firmware refuses."""
+        self._closing.clear()
+        self._open(port, baudrate, binary)
+
+    def _open(self, port, baudrate, binary):
         if port == '':
-            port = self.available_ports[0]
+            port = find_port(cache=self.device_cache)
+            if port is None:
+                raise ValueError("no photoino found")
         if baudrate == 0:
             baudrate = 115200
 
@@ -24,80 +95,421 @@ class PhotoinoController:
 
         try:
             self.ser = serial.Serial(port=port, baudrate=baudrate, timeout=1)
-        except:
+        except serial.SerialException as e:
             self.ser = None
-            raise ValueError("couldn't open port '%s'" % port)
+            raise ValueError("couldn't open port '%s': %s" % (port, e)) from e
+        self.port, self.baudrate = port, baudrate
+        self.identity = port_info(port)
+        self.device_cache.remember(self.identity)
+        self.reader = SerialReader(self.ser, metrics=self.metrics)
+        self.io.metrics = self.metrics
+        self.settings.invalidate()
+        self._binary_requested = binary
+        self.binary = binary and self.negotiate_binary()
+        self.io.start()
+        self._connected.set()
+
+    def reconnect(self):
+        """Reopen the device in a background thread, no-op if already
+        reconnecting. Acquisitions fail until `wait_connected` is True."""
+        if self.reconnecting:
+            return
+        self.reconnecting = True
+        self._connected.clear()
+        threading.Thread(target=self._reconnect, daemon=True).start()
+
+    def wait_connected(self, timeout=None):
+        return self._connected.wait(timeout)
+
+    def _reconnect(self):
+        restore = {name: self.settings.get(name)
+                   for name in self.setting_commands if name in self.settings}
+        streaming = self.stream is not None
+        if streaming:
+            self.stream.stop()
+            self.stream = None
+        try:
+            self.ser.close()
+        except (serial.SerialException, OSError):
+            pass
+        serial_number = None if self.identity is None \
+            else self.identity.serial_number
+        while not self._closing.is_set():
+            port = find_port(serial_number) if serial_number else self.port
+            if port is not None:
+                try:
+                    self._open(port, self.baudrate, self._binary_requested)
+                    break
+                except (ValueError, serial.SerialException, OSError):
+                    pass
+            self._closing.wait(self.reconnect_interval)
+        else:
+            self.reconnecting = False
+            return
+        if not self._closing.is_set():
+            for name, value in restore.items():
+                self.settings.set(name, value)
+            self.settings.flush()
+            if streaming:
+                self.start_stream()
+        with self._close_lock:
+            # close() during the reopen left the port to this thread
+            if self._closing.is_set():
+                self._shutdown()
+            self.reconnecting = False
+
+    def write(self, command):
+        self.io.call(lambda: self.ser.write(command.encode()))
+        self.metrics.count('bytes_written', len(command))
+
+    def _check_idle(self):
+        if self.stream is not None:
+            raise DeviceBusy("photoino is streaming, its replies can't be "
+                             "told apart from the counts")
+
+    def query(self, command, receive, priority=PRIORITY_SETTINGS):
+        """Send `command` and return `receive()`, the reading of its reply,
+        in one exchange on the I/O thread. Raises DeviceBusy while
+        streaming."""
+        def exchange():
+            self._check_idle()
+            self.write(command)
+            return receive()
+        return self.io.call(exchange, priority)
+
+    def _write_setting(self, name, value):
+        self.write('%s %f\n' % (self.setting_commands[name], value))
+
+    @property
+    def debounce(self):
+        return self.settings.debounce
+
+    @debounce.setter
+    def debounce(self, value):
+        self.settings.debounce = value
+
+    def verify_settings(self):
+        """Flush pending settings, read them back from the device and
+        return those that differ from the cached values.
+
+        The firmware reports whole numbers, cached values are compared
+        rounded.
+        """
+        self.settings.flush()
+        mismatches = {}
+        for name, command in self.setting_commands.items():
+            value = self.query('%s?\n' % command, self.receive_number)
+            if name not in self.settings:
+                self.settings.update(name, value)
+            elif round(self.settings.get(name)) != value:
+                mismatches[name] = value
+                self.settings.update(name, value)
+        return mismatches
+
+    @contextmanager
+    def _timeout(self, timeout):
+        default_timeout, self.ser.timeout = self.ser.timeout, timeout
+        try:
+            yield
+        finally:
+            self.ser.timeout = default_timeout
+
+    def negotiate_binary(self, timeout=0.2):
+        """Ask the firmware for the binary protocol, True if it accepts.
+
+        Older firmware does not know the command and either stays silent or
+        answers something else, in which case the ASCII protocol is kept.
+        """
+        def exchange():
+            self._check_idle()
+            self.reader.clear()
+            self.write('protocol binary\n')
+            with self._timeout(timeout):
+                reply = self.reader.read_line()
+            self.reader.clear()
+            self.decoder.reset()
+            return reply == b'binary'
+        return self.io.call(exchange)
+
+    def set_binary(self, binary):
+        if binary == self.binary:
+            return
+        self.stop_stream()
+        if binary:
+            self.binary = self.negotiate_binary()
+        else:
+            self.write('protocol ascii\n')
+            self.binary = False
 
     def close(self):
-        if self.ser is not None:
-            self.stop()
-            self.ser.close()
-            self.ser = None
+        with self._close_lock:
+            self._closing.set()
+            if self.ser is not None and not self.reconnecting:
+                self._shutdown()
+        self.io.stop()
+
+    def _shutdown(self):
+        self.settings.flush()
+        self.stop_stream()
+        self.stop()
+        self.ser.close()
+        self.ser = None
+        self.io.stop()
 
     def start(self):
-        self.ser.write('start\n'.encode())
+        self.write('start\n')
 
     def stop(self):
-        self.ser.write('stop\n'.encode())
+        self.write('stop\n')
+
+    @property
+    def streaming(self):
+        return self.stream is not None
+
+    def start_stream(self):
+        """Let the device push its counts continuously and collect them in a
+        background thread, which owns the port reads until `stop_stream`.
+        """
+        self.settings.flush()
+        self.io.call(self._start_stream, PRIORITY_COUNTS)
+
+    def _start_stream(self):
+        if self.stream is not None:
+            return
+        self.queue.clear()
+        self.reader.clear()
+        self.decoder.reset()
+        self.start()
+        if self.binary:
+            read = lambda: (self.reader.decode(self.decoder,
+                                               block=True)['count'],
+                            self.decoder.bins)
+        else:
+            read = lambda: (self.reader.read_numbers(block=True), None)
+        self.stream = StreamReader(read, self.queue)
+        self.stream.start()
+
+    def read_stream(self, n=None, timeout=None):
+        """Return up to `n` streamed counts, waiting up to `timeout` seconds
+        for the first one."""
+        if self.stream.error is not None:
+            raise self.stream.error
+        counts = self.queue.get(n, timeout)
+        self.metrics.count('stream_bins', len(counts))
+        return counts
+
+    def read_samples(self, n=None, timeout=None):
+        """Like `read_stream`, with the bin index and host receive time of
+        every count, see SAMPLE_DTYPE. Bin indices come from the frame
+        sequence numbers with the binary protocol, ASCII bins are assumed
+        consecutive."""
+        if self.stream.error is not None:
+            raise self.stream.error
+        samples = self.queue.get_samples(n, timeout)
+        self.metrics.count('stream_bins', len(samples))
+        return samples
+
+    def start_recording(self, recorder):
+        """Hand every streamed batch to `recorder.write`, from the reader
+        thread."""
+        self.queue.sink = recorder.write
+
+    def stop_recording(self):
+        self.queue.sink = None
+
+    def stop_stream(self):
+        self.io.call(self._stop_stream, PRIORITY_COUNTS)
+
+    def _stop_stream(self):
+        if self.stream is None:
+            return
+        self.stop()
+        self.stream.stop()
+        self.stream = None
+        self.reader.clear()
 
     def receive_number(self):
-        while True: # skip leading line breaks
-            c = self.ser.read(1)
-            if c != b'\n' and c != b'\r':
-                break
-        result = 0
-        while c != b'\n' and c != b'\r':
-            result = result * 10 + int(c)
-            c = self.ser.read(1)
-        n = self.ser.in_waiting # skip trailing stuff
-        if n > 0:
-            self.ser.read(n)
-        return result
+        with self.metrics.timer('receive_number'):
+            return self.reader.read_number()
+
+    def receive_numbers(self):
+        """Return all numbers the device has sent so far, without waiting."""
+        return self.reader.read_numbers()
+
+    def receive_frame(self):
+        frame = self.reader.read_exact(FRAME_SIZE, skip_line_breaks=True)
+        if frame is None:
+            raise TimeoutError("no reply from photoino")
+        frames, _ = self.decoder.decode(frame)
+        if len(frames) == 0:
+            raise ValueError("corrupt frame from photoino")
+        return int(frames['count'][0])
+
+    @property
+    def missing_bins(self):
+        """Number of bins lost so far according to the frame sequence
+        numbers (binary protocol only)."""
+        return self.decoder.missing
 
     @property
     def count_rate(self):
-        self.ser.write(str.encode('rate?\n'))
-        return self.receive_number()
+        self.settings.flush()
+        receive = self.receive_frame if self.binary else self.receive_number
+        with self.metrics.timer('rate_round_trip'):
+            return self.query('rate?\n', receive, PRIORITY_COUNTS)
+
+    def read_counts(self, n, timeout=None):
+        """Return the counts of `n` consecutive time bins as a NumPy array.
+
+        The bins are transferred in a single binary block. `timeout` defaults
+        to the acquisition time of the bins plus one second.
+        """
+        if timeout is None:
+            timeout = 1. + 1e-3 * n * self.settings.get('time_base', 1.)
+        self.settings.flush()
+        with self.metrics.timer('counts_round_trip'):
+            return self.query('counts? %d\n' % n,
+                              lambda: self.receive_block(timeout),
+                              PRIORITY_COUNTS)
+
+    def receive_block(self, timeout):
+        with self._timeout(timeout):
+            header = self.reader.read_exact(BLOCK_HEADER.size,
+                                            skip_line_breaks=True)
+            if header is None:
+                raise TimeoutError("no reply from photoino")
+            n = decode_block_header(header)
+            payload = self.reader.read_exact(n * COUNT_DTYPE.itemsize)
+            if payload is None:
+                raise TimeoutError("incomplete block from photoino")
+        return decode_counts(payload)
+
+    def sweep(self, levels, bins=1, timeout=None):
+        """Return the counts summed over `bins` time bins at each of the
+        trigger `levels`, scanned by the firmware in one go.
+
+        The levels are uploaded in 'sweep' commands of at most `sweep_chunk`
+        levels sent back to back, each answered by a binary block, so the
+        whole curve costs a single round trip. The device is left at the
+        last level.
+        """
+        levels = np.asarray(levels, dtype=float)
+        if timeout is None:
+            timeout = 1. + 1e-3 * bins * len(levels) \
+                * self.settings.get('time_base', 1.)
+        self.settings.flush()
+        chunks = range(0, len(levels), self.sweep_chunk)
+
+        def exchange():
+            self._check_idle()
+            for start in chunks:
+                self.write('sweep %d %s\n' % (bins, ' '.join(
+                    '%f' % level for level in
+                    levels[start:start + self.sweep_chunk])))
+            return [self.receive_block(timeout) for _ in chunks]
+        with self.metrics.timer('sweep_round_trip'):
+            counts = self.io.call(exchange, PRIORITY_COUNTS)
+        if len(levels) > 0:
+            self.settings.update('trigger_level', float(levels[-1]))
+        return np.concatenate(counts) if counts \
+            else np.zeros(0, dtype=COUNT_DTYPE)
+
+    def _cached_setting(self, name):
+        if name not in self.settings:
+            self.settings.flush()
+            self.settings.update(name, self.query(
+                '%s?\n' % self.setting_commands[name], self.receive_number))
+        return self.settings.get(name)
 
     @property
     def trigger_level(self):
-        self.ser.write(str.encode('level?\n'))
-        return self.receive_number()
-        
+        return self._cached_setting('trigger_level')
+
     @trigger_level.setter
     def trigger_level(self, value):
-        self.ser.write(str.encode('level %f\n' % value))
-
+        self.settings.set('trigger_level', value)
 
     @property
     def time_base(self):
-        self.ser.write(str.encode('timebase?\n'))
-        return self.receive_number()
-        
+        return self._cached_setting('time_base')
+
     @time_base.setter
     def time_base(self, value):
-        self.ser.write(str.encode('timebase %f\n' % value))
+        self.settings.set('time_base', value)
+
+
+DEVICE_PARAMS = [
+    {'title': 'Serial port:', 'name': 'serial_port', 'type': 'str',
+     'value': '', 'limits': PhotoinoController.available_ports},
+    {'title': 'Baud rate:', 'name': 'baud_rate', 'type': 'int',
+     'value': 0, 'min': 0},
+    {'title': 'Time base:', 'name': 'time_base', 'type': 'float',
+     'value': 1., 'min': 0.1, 'max': 1e5},
+    {'title': 'Trigger level:', 'name': 'trigger_level', 'type': 'float',
+     'value': 1., 'min': -5.0, 'max': 5.0},
+    {'title': 'Binary protocol:', 'name': 'binary_protocol',
+     'type': 'bool', 'value': True},
+    {'title': 'Streaming:', 'name': 'streaming', 'type': 'bool',
+     'value': False},
+]
+
+CONTROL_PARAMS = [
+    {'title': 'Metrics:', 'name': 'metrics', 'type': 'group',
+     'children': [
+        {'title': 'Enabled:', 'name': 'metrics_enabled', 'type': 'bool',
+         'value': False,
+         'tip': 'count serial traffic and time round trips and grabs'},
+        {'title': 'Summary:', 'name': 'metrics_summary', 'type': 'text',
+         'value': '', 'readonly': True},
+        {'title': 'File:', 'name': 'metrics_path', 'type': 'str',
+         'value': '', 'tip': 'timestamped file in the working directory '
+                             'if empty'},
+        {'title': 'Dump metrics:', 'name': 'dump_metrics',
+         'type': 'bool_push', 'value': False},
+        {'title': 'Reset metrics:', 'name': 'reset_metrics',
+         'type': 'bool_push', 'value': False},
+    ]},
+    {'title': 'Settings debounce (ms):', 'name': 'debounce',
+     'type': 'float', 'value': 50., 'min': 0.},
+    {'title': 'Verify settings:', 'name': 'verify_settings',
+     'type': 'bool_push', 'value': False},
+]
+
+
+def viewer_params(stage_types=(), exclude=()):
+    """Settings of a photoino viewer with the processing stages of
+    `stage_types`, leaving out the device settings named in `exclude`."""
+    device = [param for param in DEVICE_PARAMS
+              if param['name'] not in exclude]
+    return comon_parameters + device \
+        + [stage_type.params for stage_type in stage_types] + CONTROL_PARAMS
 
 
 class DAQ_0DViewer_photoino(DAQ_Viewer_base):
     """PyMoDAQ plugin for controlling photoino single-photon 
-       counting module"""
+       counting module
+
+    The counts of every grab go through the processing stages of
+    `stage_types` (see processing.stages): hardware timestamps, adaptive
+    gating, decimation, statistics and the raw bin recorder. Subclasses
+    build their settings from the stages they use with `viewer_params`.
+    """
 
     controller_type = PhotoinoController
     serial_ports = PhotoinoController.available_ports
+    hardware_averaging = True
+    stage_types = (TimingStage, AdaptiveGatingStage, DecimationStage,
+                   StatisticsStage, RecorderStage)
 
-    params = comon_parameters+[
-        {'title': 'Serial port:', 'name': 'serial_port', 'type': 'str',
-         'limits': serial_ports },
-        {'title': 'Baud rate:', 'name': 'baud_rate', 'type': 'int', 'min': 0},
-        {'title': 'Time base:', 'name': 'time_base', 'type': 'float',
-         'min': 0.1, 'max': 1e5},
-        {'title': 'Trigger level:', 'name': 'trigger_level', 'type': 'float',
-         'min': -5.0, 'max': 5.0},
-    ]
+    params = viewer_params(stage_types)
 
     def ini_attributes(self):
-        self.controller: PhotoinoDriver = None
+        self.controller: PhotoinoController = None
+        self.stages = [stage_type(self) for stage_type in self.stage_types]
+        self.metrics = Metrics()
+        self._samples = None
+        self._last_grab = None
+        self._metrics_refresh = 0.
 
     def ini_detector(self, controller=None):
         """Detector communication initialization
@@ -115,12 +527,12 @@ class DAQ_0DViewer_photoino(DAQ_Viewer_base):
             False if initialization failed otherwise True
         """
 
-        import pdb
-        pdb.set_trace()
         self.ini_detector_init(old_controller=controller,
                                new_controller=self.controller_type())
         self.controller.open(self.settings['serial_port'],
-                             self.settings['baud_rate'])
+                             self.settings['baud_rate'],
+                             binary=self.settings['binary_protocol'])
+        self.settings.child('binary_protocol').setValue(self.controller.binary)
 
         self.init_params()
 
@@ -128,10 +540,18 @@ class DAQ_0DViewer_photoino(DAQ_Viewer_base):
         return info, True
 
     def init_params(self):
+        self.controller.debounce = 1e-3 * self.settings['debounce']
         self.controller.time_base = self.settings['time_base']
         self.controller.trigger_level = self.settings['trigger_level']
+        # share the registry of controllers that have one
+        self.metrics = getattr(self.controller, 'metrics', self.metrics)
+        self.metrics.enabled = self.settings['metrics', 'metrics_enabled']
+        for stage in self.stages:
+            stage.reset()
 
     def close(self):
+        for stage in self.stages:
+            stage.stop()
         self.controller.close()
 
     def commit_settings(self, param: Parameter):
@@ -143,11 +563,60 @@ class DAQ_0DViewer_photoino(DAQ_Viewer_base):
             A given parameter (within detector_settings) whose value has been 
             changed by the user
         """
+        # stages first: the recorder stops before the stream
+        for stage in self.stages:
+            stage.commit_settings(param)
         if param.name() == "time_base":
-            self.controller.time_base = self.settings.child('time_base').value()
+            self.set_time_base(param.value())
         elif param.name() == "trigger_level":
             self.controller.trigger_level = \
                 self.settings.child('trigger_level').value()
+        elif param.name() == "debounce":
+            self.controller.debounce = 1e-3 * param.value()
+        elif param.name() == "verify_settings":
+            if param.value():
+                self.verify_settings()
+                param.setValue(False)
+        elif param.name() == "binary_protocol":
+            self.controller.set_binary(param.value())
+            if self.controller.binary != param.value():
+                param.setValue(self.controller.binary)
+        elif param.name() == "streaming":
+            if not param.value():
+                self.controller.stop_stream()
+        elif param.name() == "metrics_enabled":
+            self.metrics.enabled = param.value()
+            self._last_grab = None
+        elif param.name() == "reset_metrics":
+            if param.value():
+                self.metrics.reset()
+                self._last_grab = None
+                param.setValue(False)
+        elif param.name() == "dump_metrics":
+            if param.value():
+                self.dump_metrics()
+                param.setValue(False)
+
+    def set_time_base(self, value):
+        self.controller.time_base = value
+        for stage in self.stages:
+            stage.restart()
+
+    def start_stream(self):
+        self.controller.start_stream()
+        for stage in self.stages:
+            stage.restart()
+
+    def verify_settings(self):
+        try:
+            mismatches = self.controller.verify_settings()
+        except DeviceBusy as e:
+            self.emit_status(ThreadCommand('Update_Status', [
+                'photoino settings not verified: %s' % e]))
+            return
+        if mismatches:
+            self.emit_status(ThreadCommand('Update_Status', [
+                'photoino settings differ from the device: %s' % mismatches]))
 
     def grab_data(self, Naverage=1, **kwargs):
         """Start a grab from the detector
@@ -155,20 +624,137 @@ class DAQ_0DViewer_photoino(DAQ_Viewer_base):
         Parameters
         ----------
         Naverage: int
-            Number of hardware averaging (if hardware averaging is possible, 
-            self.hardware_averaging should be set to
-            True in class preamble and you should code this implementation)
+            Number of time bins averaged by the device, read in a single
+            transfer
         kwargs: dict
             others optionals arguments
         """
 
-        data = [np.array([self.controller.count_rate])]
-        data_to_emit = DataFromPlugins(name='Photon counter', data=data,
-                                       dim='Data0D', labels=['Counts'],)
-        self.data_grabed_signal.emit([data_to_emit])
+        n = Naverage
+        for stage in self.stages:
+            n = stage.bins(n)
+        if n == 0:
+            self.emit_counts(np.zeros(0))
+            return
+        self._samples = None
+        counts = self.grab_counts(n)
+        if counts is None:
+            if self.controller.reconnecting:
+                # a gap in the data keeps the grab loop going meanwhile
+                self.emit_counts(self.gap_counts())
+            return
+        for stage in self.stages:
+            stage.update(counts, self._samples)
+        self.emit_counts(counts)
+
+    def gap_counts(self):
+        """Counts emitted for the bins lost while reconnecting."""
+        return np.full(1, np.nan)
+
+    def grab_counts(self, Naverage):
+        """Return the counts of `Naverage` time bins (last axis), None if the
+        device did not deliver them.
+
+        A lost connection starts a background reconnection, during which
+        grabs return None after waiting at most 0.1 s. A query refused
+        while streaming returns None with a status message.
+        """
+        self.update_metrics()
+        if self.controller.reconnecting \
+                and not self.controller.wait_connected(0.1):
+            return None
+        try:
+            return self._grab_counts(Naverage)
+        except serial.SerialException as e:
+            if not hasattr(self.controller, 'reconnect'):
+                raise
+            self.controller.reconnect()
+            self.emit_status(ThreadCommand('Update_Status', [
+                'photoino connection lost (%s), reconnecting' % e]))
+            return None
+        except DeviceBusy as e:
+            self.emit_status(ThreadCommand('Update_Status', [
+                'photoino busy: %s' % e]))
+            return None
+
+    def _grab_counts(self, Naverage):
+        if self.settings['streaming']:
+            counts = self.read_stream(Naverage)
+            if counts.shape[-1] < Naverage:
+                self.emit_status(ThreadCommand('Update_Status',
+                                               ['no counts from photoino']))
+                return None
+        elif Naverage > 1:
+            counts = self.controller.read_counts(Naverage)
+        else:
+            counts = np.array(self.controller.count_rate)[..., np.newaxis]
+        return counts
+
+    def emit_counts(self, counts):
+        """Emit the mean of `counts` with the data of the stages."""
+        groups = [DataFromPlugins(
+            name=COUNTS, data=[np.array([counts.mean() if counts.size
+                                         else np.nan])],
+            dim='Data0D', labels=['Counts'])]
+        for stage in self.stages:
+            groups += stage.process(counts)
+        self.data_grabed_signal.emit(merge_groups(groups))
+
+    def update_metrics(self):
+        """Observe the time since the previous grab and refresh the metrics
+        summary of the settings, at most once per second."""
+        if not self.metrics.enabled:
+            return
+        now = time.perf_counter()
+        if self._last_grab is not None:
+            self.metrics.observe('grab_interval', now - self._last_grab)
+        self._last_grab = now
+        if now >= self._metrics_refresh:
+            self._metrics_refresh = now + 1.
+            self.settings.child('metrics', 'metrics_summary').setValue(
+                self.metrics.summary())
+
+    def dump_metrics(self):
+        path = self.settings['metrics', 'metrics_path']
+        if path == '':
+            path = time.strftime('photoino_metrics_%Y%m%d_%H%M%S.json')
+        self.metrics.dump(path)
+        self.emit_status(ThreadCommand('Update_Status', [
+            'photoino metrics written to %s' % path]))
+
+    def read_stream(self, n):
+        """Collect `n` streamed counts, starting the stream if needed.
+
+        Stages that need the streamed samples get them in `_samples`, and
+        all the queued bins are read while a stage takes every bin.
+        """
+        if not self.controller.streaming:
+            self.start_stream()
+        timed = any(stage.needs_samples for stage in self.stages)
+        read = self.controller.read_samples if timed \
+            else self.controller.read_stream
+        timeout = 1. + 2e-3 * self.settings['time_base']
+        data = read(n, timeout=timeout)
+        while data.shape[-1] < n:
+            more = read(n - data.shape[-1], timeout=timeout)
+            if more.shape[-1] == 0:
+                break
+            data = np.concatenate((data, more), axis=-1)
+        if any(stage.reads_all for stage in self.stages):
+            data = np.concatenate((data, read(None, timeout=0)), axis=-1)
+        if not timed:
+            return data
+        self._samples = data
+        return data['count']
 
     def stop(self):
-        self.controller.stop()
+        for stage in self.stages:
+            stage.stop()
+        self._last_grab = None
+        if self.controller.streaming:
+            self.controller.stop_stream()
+        else:
+            self.controller.stop()
         return ''
 
 
@@ -0,0 +1,31 @@
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_photoino import DAQ_0DViewer_photoino
+from pymodaq_plugins_photoino.hardware.async_controller import \
+    SyncPhotoinoAdapter
+from pymodaq.utils.parameter import Parameter
+from pymodaq.control_modules.viewer_utility_classes import main
+
+
+class DAQ_0DViewer_photoino_async(DAQ_0DViewer_photoino):
+    """PyMoDAQ plugin for photoino talking to the device through an asyncio
+       event loop, so a missing reply times out instead of stalling"""
+
+    controller_type = SyncPhotoinoAdapter
+    params = DAQ_0DViewer_photoino.params+[
+        {'title': 'Request timeout (s):', 'name': 'request_timeout',
+         'type': 'float', 'value': 2., 'min': 0.01},
+    ]
+
+    def init_params(self):
+        self.controller.timeout = self.settings['request_timeout']
+        DAQ_0DViewer_photoino.init_params(self)
+
+    def commit_settings(self, param: Parameter):
+        if param.name() == "request_timeout":
+            self.controller.timeout = param.value()
+        else:
+            DAQ_0DViewer_photoino.commit_settings(self, param)
+
+
+if __name__ == '__main__':
+    main(__file__)
@@ -0,0 +1,146 @@
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_photoino_multi import DAQ_0DViewer_photoino_multi
+from pymodaq_plugins_photoino.hardware.stream import SAMPLE_DTYPE
+from pymodaq_plugins_photoino.hardware.timing import ClockDrift
+from pymodaq_plugins_photoino.processing.coincidence import \
+    CoincidenceCounter, events_from_bins
+from pymodaq.utils.daq_utils import ThreadCommand
+from pymodaq.utils.parameter import Parameter
+from pymodaq.utils.data import DataFromPlugins
+from pymodaq.control_modules.viewer_utility_classes import main
+import numpy as np
+
+
+class DAQ_0DViewer_photoino_coincidence(DAQ_0DViewer_photoino_multi):
+    """PyMoDAQ plugin counting coincidences between several streaming
+       photoinos
+
+    Every device streams timestamped bins; its host clock is fitted against
+    the bin indices (ClockDrift) and each count is placed at the host time
+    of its bin, shifted by the delay of its channel. Each grab reads
+    Naverage bins of every device (if one falls short, the bins of the
+    others wait for the next grab) and emits the singles rates, and for
+    every pair of devices the coincidence and accidental rates (Hz), see
+    CoincidenceCounter; the counts and duration accumulated since the
+    last reset go to a 'Coincidence totals' group. The counts are binned,
+    so the time resolution is one time bin: windows shorter than a bin
+    only pair counts of overlapping bins.
+    """
+
+    params = [param for param in DAQ_0DViewer_photoino_multi.params
+              if param['name'] not in ('streaming', 'skew')] + [
+        {'title': 'Coincidences:', 'name': 'coincidence', 'type': 'group',
+         'children': [
+            {'title': 'Window (ms):', 'name': 'coincidence_window',
+             'type': 'float', 'value': 1., 'min': 0.},
+            {'title': 'Delays (ms):', 'name': 'delays', 'type': 'str',
+             'value': '', 'tip': 'comma separated, one per serial port, '
+                                 'added to the event times'},
+            {'title': 'Reset:', 'name': 'reset_coincidences',
+             'type': 'bool_push', 'value': False},
+        ]},
+    ]
+
+    def ini_attributes(self):
+        DAQ_0DViewer_photoino_multi.ini_attributes(self)
+        self.clocks = []
+        self.coincidences = CoincidenceCounter(0, 0.)
+        self._backlog = []
+
+    def init_params(self):
+        DAQ_0DViewer_photoino_multi.init_params(self)
+        self.reset_coincidences()
+
+    def commit_settings(self, param: Parameter):
+        if param.name() in ("coincidence_window", "delays"):
+            self.reset_coincidences()
+        elif param.name() == "reset_coincidences":
+            if param.value():
+                self.reset_coincidences()
+                param.setValue(False)
+        else:
+            DAQ_0DViewer_photoino_multi.commit_settings(self, param)
+            if param.name() == "time_base":
+                self.reset_coincidences()
+
+    def delays(self):
+        """Delay (s) of every device, 0 for the ports not given one."""
+        delays = [1e-3 * float(delay) for delay in
+                  self.settings['coincidence', 'delays'].split(',')
+                  if delay.strip()]
+        n = len(self.controller.ports)
+        return np.array(delays[:n] + [0.] * (n - len(delays)))
+
+    def reset_coincidences(self):
+        self.clocks = [ClockDrift(1e-3 * self.settings['time_base'])
+                       for _ in self.controller.ports]
+        self._backlog = [np.zeros(0, dtype=SAMPLE_DTYPE)
+                         for _ in self.controller.ports]
+        self.coincidences = CoincidenceCounter(
+            len(self.controller.ports),
+            1e-3 * self.settings['coincidence', 'coincidence_window'])
+
+    def _grab_counts(self, Naverage):
+        if not self.controller.streaming:
+            self.controller.start_stream()
+            self.reset_coincidences()
+        timeout = 1. + 2e-3 * self.settings['time_base']
+        missing = [max(Naverage - len(backlog), 0) for backlog in self._backlog]
+        samples = [np.concatenate((backlog, new)) for backlog, new in zip(
+            self._backlog, self.controller.read_samples(missing,
+                                                        timeout=timeout))]
+        if min(len(s) for s in samples) < Naverage:
+            # the samples read are counted once every device caught up
+            self._backlog = samples
+            self.emit_status(ThreadCommand('Update_Status',
+                                           ['no counts from photoino']))
+            return None
+        self._backlog = [s[Naverage:] for s in samples]
+        return self.count_coincidences([s[:Naverage] for s in samples])
+
+    def count_coincidences(self, samples):
+        """Feed the streamed `samples` of every device to the clock fits and
+        the coincidence counter, return the rates of this grab."""
+        events, until = [], []
+        for clock, delay, s in zip(self.clocks, self.delays(), samples):
+            clock.update(s['bin'], s['time'])
+            events.append(events_from_bins(clock.host_time(s['bin']) + delay,
+                                           s['count']))
+            until.append(clock.host_time(s['bin'][-1]) + delay)
+        singles, coincidences, duration = \
+            self.coincidences.update(events, until)
+        if duration == 0:
+            return np.full(len(self.channel_labels()), np.nan)
+        accidentals = self.coincidences.accidentals(singles, duration)
+        return np.concatenate((singles, coincidences, accidentals)) / duration
+
+    def channel_labels(self):
+        ports = self.controller.ports
+        pairs = ['%s-%s' % (ports[i], ports[j])
+                 for i, j in self.coincidences.pairs]
+        return ['Singles %s' % port for port in ports] \
+            + ['Coincidences %s' % pair for pair in pairs] \
+            + ['Accidentals %s' % pair for pair in pairs]
+
+    def gap_counts(self):
+        return np.full(len(self.channel_labels()), np.nan)
+
+    def emit_counts(self, counts):
+        labels = self.channel_labels()
+        coincidences = self.coincidences
+        totals = np.concatenate((
+            coincidences.singles,
+            [coincidences.coincidences[i, j] for i, j in coincidences.pairs],
+            coincidences.accidentals()))
+        self.data_grabed_signal.emit([
+            DataFromPlugins(name='Coincidences',
+                            data=[np.array([value]) for value in counts],
+                            dim='Data0D', labels=labels),
+            DataFromPlugins(name='Coincidence totals',
+                            data=[np.array([value]) for value in totals]
+                            + [np.array([coincidences.duration])],
+                            dim='Data0D', labels=labels + ['Duration (s)'])])
+
+
+if __name__ == '__main__':
+    main(__file__)
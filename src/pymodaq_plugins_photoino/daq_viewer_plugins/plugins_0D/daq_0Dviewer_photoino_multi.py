@@ -0,0 +1,263 @@
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_photoino import DAQ_0DViewer_photoino, PhotoinoController, \
+    viewer_params
+from pymodaq_plugins_photoino.hardware.metrics import Metrics
+from pymodaq_plugins_photoino.hardware.ports import available_ports
+from pymodaq_plugins_photoino.hardware.stream import SAMPLE_DTYPE
+from pymodaq.utils.parameter import Parameter
+from pymodaq.utils.data import DataFromPlugins
+from pymodaq.control_modules.viewer_utility_classes import main
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import numpy as np
+
+
+class MultiPhotoinoController:
+    """Several photoinos read in lockstep, one thread per device.
+
+    The threads meet at a barrier before each request so the commands leave
+    together. `skew` holds the spread (s) of the host times at which the
+    devices returned the last query, or received the last aligned bin while
+    streaming: it measures how far apart the host gets the data, not the
+    skew between the device clocks, which the firmware does not report.
+    The devices share one `metrics` registry.
+    """
+
+    controller_type = PhotoinoController
+
+    def __init__(self):
+        self.controllers = []
+        self.ports = []
+        self.skew = 0.
+        self._pool = None
+        self._barrier = None
+        self._backlog = []
+        self.metrics = Metrics()
+
+    def open(self, ports, baudrate, binary=False):
+        self.close()
+        if len(ports) == 0:
+            ports = available_ports()
+        if len(ports) == 0:
+            raise ValueError("no photoino found")
+        for port in ports:
+            controller = self.controller_type()
+            controller.metrics = self.metrics
+            controller.open(port, baudrate, binary=binary)
+            self.controllers.append(controller)
+        self.ports = list(ports)
+        self._pool = ThreadPoolExecutor(max_workers=len(ports))
+        self._barrier = threading.Barrier(len(ports), timeout=5.)
+        self._backlog = [np.zeros(0, dtype=SAMPLE_DTYPE) for _ in ports]
+
+    def close(self):
+        for controller in self.controllers:
+            controller.close()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self.controllers = []
+        self.ports = []
+
+    @property
+    def reconnecting(self):
+        return any(controller.reconnecting for controller in self.controllers)
+
+    def reconnect(self):
+        """Reconnect every device in the background; the one that failed is
+        not known, so the others are reopened as well."""
+        for controller in self.controllers:
+            controller.reconnect()
+
+    def wait_connected(self, timeout=None):
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        for controller in self.controllers:
+            remaining = None if deadline is None \
+                else max(deadline - time.perf_counter(), 0)
+            if not controller.wait_connected(remaining):
+                return False
+        return True
+
+    def _map(self, function):
+        return list(self._pool.map(function, self.controllers))
+
+    def _query(self, function):
+        def query(controller):
+            self._barrier.wait()
+            result = function(controller)
+            return result, time.perf_counter()
+
+        results, stamps = zip(*self._map(query))
+        self.skew = max(stamps) - min(stamps)
+        return np.array(results)
+
+    @property
+    def debounce(self):
+        return self.controllers[0].debounce if self.controllers else 0.
+
+    @debounce.setter
+    def debounce(self, value):
+        for controller in self.controllers:
+            controller.debounce = value
+
+    def verify_settings(self):
+        """Mismatching settings per port."""
+        mismatches = self._map(lambda controller: controller.verify_settings())
+        return {port: mismatch for port, mismatch in zip(self.ports, mismatches)
+                if mismatch}
+
+    @property
+    def binary(self):
+        return all(controller.binary for controller in self.controllers)
+
+    def set_binary(self, binary):
+        self._map(lambda controller: controller.set_binary(binary))
+
+    def start(self):
+        self._map(lambda controller: controller.start())
+
+    def stop(self):
+        self._map(lambda controller: controller.stop())
+
+    @property
+    def count_rate(self):
+        """Counts of every device as an array."""
+        return self._query(lambda controller: controller.count_rate)
+
+    def read_counts(self, n):
+        """Counts of `n` time bins for every device, shape (devices, n)."""
+        return self._query(lambda controller: controller.read_counts(n))
+
+    @property
+    def streaming(self):
+        return any(controller.streaming for controller in self.controllers)
+
+    def start_stream(self):
+        self._backlog = [np.zeros(0, dtype=SAMPLE_DTYPE)
+                         for _ in self.controllers]
+        self._map(lambda controller: controller.start_stream())
+
+    def read_stream(self, n=None, timeout=None):
+        """Streamed counts aligned across devices, shape (devices, bins).
+
+        Bins received from one device ahead of the others are kept for the
+        next call. `skew` becomes the spread of the host receive times of
+        the last aligned bin.
+        """
+        def read(index):
+            backlog = self._backlog[index]
+            missing = None if n is None else max(n - len(backlog), 0)
+            if missing == 0:
+                return backlog
+            more = self.controllers[index].read_samples(missing, timeout)
+            return np.concatenate((backlog, more))
+
+        samples = list(self._pool.map(read, range(len(self.controllers))))
+        k = min(len(s) for s in samples)
+        if n is not None:
+            k = min(k, n)
+        self._backlog = [s[k:] for s in samples]
+        if k > 0:
+            times = [s['time'][k - 1] for s in samples]
+            self.skew = max(times) - min(times)
+        return np.stack([s['count'][:k] for s in samples])
+
+    def read_samples(self, n=None, timeout=None):
+        """Streamed samples of every device, one array per device as they
+        were received, not aligned (see SAMPLE_DTYPE). Each device returns
+        `n` samples, or its own number if `n` is a sequence, fewer if it
+        stops delivering within `timeout`."""
+        wanted = list(n) if np.iterable(n) else [n] * len(self.controllers)
+
+        def read(index):
+            controller, count = self.controllers[index], wanted[index]
+            if count == 0:
+                return np.zeros(0, dtype=SAMPLE_DTYPE)
+            samples = controller.read_samples(count, timeout)
+            while count is not None and len(samples) < count:
+                more = controller.read_samples(count - len(samples), timeout)
+                if len(more) == 0:
+                    break
+                samples = np.concatenate((samples, more))
+            return samples
+
+        return list(self._pool.map(read, range(len(self.controllers))))
+
+    def stop_stream(self):
+        self._map(lambda controller: controller.stop_stream())
+
+    @property
+    def trigger_level(self):
+        return self._map(lambda controller: controller.trigger_level)
+
+    @trigger_level.setter
+    def trigger_level(self, value):
+        for controller in self.controllers:
+            controller.trigger_level = value
+
+    @property
+    def time_base(self):
+        return self._map(lambda controller: controller.time_base)
+
+    @time_base.setter
+    def time_base(self, value):
+        for controller in self.controllers:
+            controller.time_base = value
+
+
+class DAQ_0DViewer_photoino_multi(DAQ_0DViewer_photoino):
+    """PyMoDAQ plugin reading several photoinos in parallel, one channel per
+       device"""
+
+    controller_type = MultiPhotoinoController
+    stage_types = ()
+    params = viewer_params(stage_types, exclude=('serial_port',)) + [
+        {'title': 'Serial ports:', 'name': 'serial_ports', 'type': 'str',
+         'value': '', 'tip': 'comma separated, all photoinos if empty'},
+        {'title': 'Timestamp skew (s):', 'name': 'skew', 'type': 'float',
+         'value': 0., 'readonly': True,
+         'tip': 'spread of the host times the devices answered at'},
+    ]
+
+    def ini_attributes(self):
+        DAQ_0DViewer_photoino.ini_attributes(self)
+        self.controller: MultiPhotoinoController = None
+
+    def ini_detector(self, controller=None):
+        self.ini_detector_init(old_controller=controller,
+                               new_controller=self.controller_type())
+        ports = [port.strip() for port in
+                 self.settings['serial_ports'].split(',') if port.strip()]
+        self.controller.open(ports, self.settings['baud_rate'],
+                             binary=self.settings['binary_protocol'])
+        self.settings.child('serial_ports').setValue(
+            ', '.join(self.controller.ports))
+        self.settings.child('binary_protocol').setValue(self.controller.binary)
+
+        self.init_params()
+
+        info = "%d photoinos initialised" % len(self.controller.ports)
+        return info, True
+
+    def commit_settings(self, param: Parameter):
+        if param.name() not in ("serial_ports", "skew"):
+            DAQ_0DViewer_photoino.commit_settings(self, param)
+
+    def gap_counts(self):
+        return np.full((len(self.controller.ports), 1), np.nan)
+
+    def emit_counts(self, counts):
+        data = [np.array([value]) for value in counts.mean(axis=-1)]
+        labels = ['Counts %s' % port for port in self.controller.ports]
+        self.settings.child('skew').setValue(self.controller.skew)
+        self.data_grabed_signal.emit([
+            DataFromPlugins(name='Photon counters', data=data, dim='Data0D',
+                            labels=labels),
+            DataFromPlugins(name='Timestamp skew',
+                            data=[np.array([self.controller.skew])],
+                            dim='Data0D', labels=['Skew (s)'])])
+
+
+if __name__ == '__main__':
+    main(__file__)
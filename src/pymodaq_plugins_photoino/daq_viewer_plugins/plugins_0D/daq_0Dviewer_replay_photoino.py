@@ -0,0 +1,245 @@
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_photoino import DAQ_0DViewer_photoino, viewer_params
+from pymodaq.utils.parameter import Parameter
+from pymodaq.control_modules.viewer_utility_classes import main
+from pymodaq_plugins_photoino.hardware.stream import make_samples
+from pymodaq_plugins_photoino.processing.recorder import Recording
+import numpy as np
+import time
+
+
+class ReplayPhotoinoController:
+    """Serve the counts of a recording (.npy or HDF5, see
+    processing/recorder.py) through the photoino controller interface.
+
+    `open` loads the recording given as port. Counts are read by slices
+    from `position`, from the start again at the end with `loop`, else
+    reads come back short. `speed` scales the playback: 1 delivers the bins
+    at the time base, 10 ten times faster and 0 as fast as possible, the
+    stream then serving `block_size` bins per read. Recorded bin indices
+    are replayed, shifted at every loop, so recorded gaps show as missing
+    bins.
+    """
+
+    reconnecting = False
+
+    def __init__(self, block_size=4096):
+        self.recording = None
+        self.position = 0
+        self.speed = 1.
+        self.loop = True
+        self.block_size = block_size
+        self.binary = False
+        self.missing_bins = 0
+        self.debounce = 0.
+        self._time_base = 1.
+        self._trigger_level = 1.
+        self._bin_offset = 0
+        self._span = 0
+        self._stream_time = None
+        self._recorder = None
+
+    def open(self, port, baudrate, binary=False):
+        if port:
+            self.load(port)
+
+    def load(self, path):
+        self.close()
+        self.recording = Recording(path)
+        first = self.recording.read(0, 1)[1][0]
+        last = self.recording.read(len(self.recording) - 1,
+                                   len(self.recording))[1][0]
+        self._span = int(last - first) + 1
+        self.rewind()
+
+    def rewind(self):
+        self.position = 0
+        self._bin_offset = 0
+
+    @property
+    def recorded_time_base(self):
+        return None if self.recording is None else self.recording.time_base
+
+    def _read(self, n):
+        """Next `n` recorded counts and bin indices, fewer at the end of the
+        recording without `loop`."""
+        if self.recording is None:
+            raise ValueError("no recording loaded")
+        counts, bins = [], []
+        while n > 0:
+            if self.position == len(self.recording):
+                if not self.loop:
+                    break
+                self.position = 0
+                self._bin_offset += self._span
+            stop = min(self.position + n, len(self.recording))
+            chunk, chunk_bins = self.recording.read(self.position, stop)
+            counts.append(chunk)
+            bins.append(chunk_bins + self._bin_offset)
+            n -= stop - self.position
+            self.position = stop
+        if not counts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(counts), np.concatenate(bins)
+
+    @property
+    def period(self):
+        """Playback duration (s) of one bin, 0 as fast as possible."""
+        return 1e-3 * self._time_base / self.speed if self.speed > 0 else 0.
+
+    def _take(self, n):
+        time.sleep(n * self.period)
+        counts, _ = self._read(n)
+        if len(counts) == 0:
+            raise TimeoutError("end of recording")
+        return counts
+
+    @property
+    def count_rate(self):
+        return int(self._take(1)[0])
+
+    def read_counts(self, n):
+        return self._take(n)
+
+    @property
+    def time_base(self):
+        return self._time_base
+
+    @time_base.setter
+    def time_base(self, value):
+        self._time_base = value
+
+    @property
+    def trigger_level(self):
+        return self._trigger_level
+
+    @trigger_level.setter
+    def trigger_level(self, value):
+        self._trigger_level = value
+
+    def verify_settings(self):
+        return {}
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    @property
+    def streaming(self):
+        return self._stream_time is not None
+
+    def start_stream(self):
+        self._stream_time = time.perf_counter()
+
+    def _stream_bins(self, n, timeout):
+        period = self.period
+        if period == 0:
+            return self.block_size if n is None else n
+        bins = int((time.perf_counter() - self._stream_time) / period)
+        if bins == 0:
+            wait = self._stream_time + period - time.perf_counter()
+            if timeout is not None:
+                wait = min(wait, timeout)
+            time.sleep(max(wait, 0))
+            bins = int((time.perf_counter() - self._stream_time) / period)
+        if n is not None:
+            bins = min(bins, n)
+        self._stream_time += bins * period
+        return bins
+
+    def read_stream(self, n=None, timeout=None):
+        """Return the recorded counts of the bins played since the last
+        call, waiting for the first one if needed."""
+        return self.read_samples(n, timeout)['count']
+
+    def read_samples(self, n=None, timeout=None):
+        """Like `read_stream`, with the recorded bin indices and the host
+        time of the call, see SAMPLE_DTYPE."""
+        counts, bins = self._read(self._stream_bins(n, timeout))
+        samples = make_samples(counts, bins, time.perf_counter())
+        if self._recorder is not None and len(samples) > 0:
+            self._recorder.write(samples)
+        return samples
+
+    def start_recording(self, recorder):
+        """Write the replayed samples to `recorder` as they are read."""
+        self._recorder = recorder
+
+    def stop_recording(self):
+        self._recorder = None
+
+    def stop_stream(self):
+        self._stream_time = None
+
+    def set_binary(self, binary):
+        pass
+
+    def close(self):
+        if self.recording is not None:
+            self.recording.close()
+            self.recording = None
+
+
+class DAQ_0DViewer_replay_photoino(DAQ_0DViewer_photoino):
+    """PyMoDAQ plugin replaying recorded photoino counts
+
+    The time base is taken from HDF5 recordings, which store it; set it by
+    hand for .npy recordings.
+    """
+
+    controller_type = ReplayPhotoinoController
+    params = viewer_params(DAQ_0DViewer_photoino.stage_types,
+                           exclude=('serial_port', 'baud_rate',
+                                    'binary_protocol')) + [
+        {'title': 'Replay:', 'name': 'replay', 'type': 'group',
+         'children': [
+            {'title': 'File:', 'name': 'replay_file', 'type': 'str',
+             'value': '', 'tip': '.npy or HDF5 recording'},
+            {'title': 'Speed:', 'name': 'replay_speed', 'type': 'float',
+             'value': 1., 'min': 0.,
+             'tip': 'relative to the time base, 0 as fast as possible'},
+            {'title': 'Loop:', 'name': 'loop', 'type': 'bool',
+             'value': True},
+            {'title': 'Rewind:', 'name': 'rewind', 'type': 'bool_push',
+             'value': False},
+        ]},
+    ]
+
+    def ini_detector(self, controller=None):
+        self.ini_detector_init(old_controller=controller,
+                               new_controller=self.controller_type())
+        self.controller.open(self.settings['replay', 'replay_file'], 0)
+
+        self.init_params()
+
+        info = "replaying %s" % self.settings['replay', 'replay_file']
+        return info, True
+
+    def init_params(self):
+        if self.controller.recorded_time_base is not None:
+            self.settings.child('time_base').setValue(
+                self.controller.recorded_time_base)
+        DAQ_0DViewer_photoino.init_params(self)
+        self.controller.speed = self.settings['replay', 'replay_speed']
+        self.controller.loop = self.settings['replay', 'loop']
+
+    def commit_settings(self, param: Parameter):
+        if param.name() == "replay_file":
+            self.controller.load(param.value())
+            self.init_params()
+        elif param.name() == "replay_speed":
+            self.controller.speed = param.value()
+        elif param.name() == "loop":
+            self.controller.loop = param.value()
+        elif param.name() == "rewind":
+            if param.value():
+                self.controller.rewind()
+                param.setValue(False)
+        else:
+            DAQ_0DViewer_photoino.commit_settings(self, param)
+
+
+if __name__ == '__main__':
+    main(__file__)
@@ -1,18 +1,110 @@
-from daq_0Dviewer_photoino import DAQ_0DViewer_photoino
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_photoino import DAQ_0DViewer_photoino
 from pymodaq.utils.parameter import Parameter
 from pymodaq.control_modules.viewer_utility_classes import main
+from pymodaq_plugins_photoino.hardware.photon_stream import PROFILES, \
+    PhotonStreamSimulator
+from pymodaq_plugins_photoino.hardware.stream import make_samples
 import numpy as np
+import time
 
 
 class SimulatePhotoinoController:
+    """Poisson distributed counts drawn in blocks from a seedable generator.
 
-    def __init__(self):
+    Blocks of `block_size` samples are generated lazily and served by
+    `count_rate`, `read_counts` and the stream. Any change of the simulated
+    rates discards the rest of the current block. Without `realtime` the
+    stream is not paced by the time base and serves samples as fast as they
+    are asked for.
+
+    With the 'photon stream' engine the counts are binned from simulated
+    photon arrivals, see PhotonStreamSimulator; `mean_count_rate` then sets
+    the signal counts per time bin and the trigger level the dark counts.
+    """
+
+    engines = ('poisson', 'photon stream')
+    reconnecting = False
+
+    def __init__(self, seed=None, block_size=4096):
         self._time_base = 1.
         self._trigger_level = 0.1
         self._mean_count_rate = 100
         self._low_dark = 1000
         self._low_trigger = 0.1
         self._trigger_level = 1.0
+        self._stream_time = None
+        self._recorder = None
+        self.binary = False
+        self.missing_bins = 0
+        self.realtime = True
+        self.debounce = 0.
+        self.photons = PhotonStreamSimulator()
+        self._engine = 'poisson'
+        self._block_size = block_size
+        self.seed = seed
+
+    @property
+    def seed(self):
+        return self._seed
+
+    @seed.setter
+    def seed(self, value):
+        self._seed = value
+        self._rng = np.random.default_rng(value)
+        self.photons.rng = self._rng
+        self.photons.reset()
+        self._discard_block()
+
+    @property
+    def engine(self):
+        return self._engine
+
+    @engine.setter
+    def engine(self, value):
+        if value not in self.engines:
+            raise ValueError("unknown simulation engine '%s'" % value)
+        self._engine = value
+        self._discard_block()
+
+    def set_photon_parameter(self, name, value):
+        setattr(self.photons, name, value)
+        self._discard_block()
+
+    @property
+    def block_size(self):
+        return self._block_size
+
+    @block_size.setter
+    def block_size(self, value: int):
+        self._block_size = max(int(value), 1)
+
+    def _discard_block(self):
+        self._block = np.zeros(0, dtype=np.int64)
+        self._index = 0
+
+    def _generate(self, n):
+        if self._engine == 'photon stream':
+            time_base = 1e-3 * self._time_base
+            self.photons.signal_rate = self._mean_count_rate / time_base
+            self.photons.trigger_level = self._trigger_level
+            return self.photons.bins(n, time_base)
+        return self._rng.poisson(self._mean(), n)
+
+    def _take(self, n):
+        if self._index == len(self._block) and n >= self._block_size:
+            return self._generate(n)
+        counts = np.empty(n, dtype=np.int64)
+        filled = 0
+        while filled < n:
+            if self._index == len(self._block):
+                self._block = self._generate(self._block_size)
+                self._index = 0
+            k = min(n - filled, len(self._block) - self._index)
+            counts[filled:filled + k] = self._block[self._index:self._index + k]
+            self._index += k
+            filled += k
+        return counts
 
     @property
     def time_base(self):
@@ -21,6 +113,7 @@ class SimulatePhotoinoController:
     @time_base.setter
     def time_base(self, value):
         self._time_base = value
+        self._discard_block()
 
     @property
     def trigger_level(self):
@@ -29,12 +122,28 @@ class SimulatePhotoinoController:
     @trigger_level.setter
     def trigger_level(self, value):
         self._trigger_level = value
+        self._discard_block()
+
+    def _mean(self):
+        return self._mean_count_rate if self._trigger_level > self._low_trigger\
+            else self._mean_count_rate + self._low_dark
 
     @property
     def count_rate(self):
-        mean = self._mean_count_rate if self._trigger_level > self._low_trigger\
-            else self._mean_count_rate + self._low_dark
-        return np.random.poisson(mean)
+        return int(self._take(1)[0])
+
+    def read_counts(self, n):
+        return self._take(n)
+
+    def sweep(self, levels, bins=1):
+        """Counts summed over `bins` bins at each trigger level of `levels`,
+        leaving the trigger at the last level."""
+        counts = np.empty(len(levels), dtype=np.int64)
+        for i, level in enumerate(levels):
+            self._trigger_level = level
+            counts[i] = self._generate(bins).sum()
+        self._discard_block()
+        return counts
 
     @property
     def mean_count_rate(self):
@@ -43,6 +152,7 @@ class SimulatePhotoinoController:
     @mean_count_rate.setter
     def mean_count_rate(self, value: int):
         self._mean_count_rate = int(value)
+        self._discard_block()
 
     @property
     def low_dark(self):
@@ -51,6 +161,7 @@ class SimulatePhotoinoController:
     @low_dark.setter
     def low_dark(self, value: int):
         self._low_dark = int(value)
+        self._discard_block()
 
     @property
     def low_trigger(self):
@@ -59,6 +170,10 @@ class SimulatePhotoinoController:
     @low_trigger.setter
     def low_trigger(self, value: float):
         self._low_trigger = float(value)
+        self._discard_block()
+
+    def verify_settings(self):
+        return {}
 
     def start(self):
         pass
@@ -66,9 +181,69 @@ class SimulatePhotoinoController:
     def stop(self):
         pass
 
-    def open(self, port, baudrate):
+    @property
+    def streaming(self):
+        return self._stream_time is not None
+
+    def start_stream(self):
+        self._stream_time = time.perf_counter()
+        self._stream_bin = 0
+
+    def _stream_counts(self, n, timeout):
+        if not self.realtime:
+            return self._take(self._block_size if n is None else n)
+        period = 1e-3 * self._time_base
+        bins = int((time.perf_counter() - self._stream_time) / period)
+        if bins == 0:
+            wait = self._stream_time + period - time.perf_counter()
+            if timeout is not None:
+                wait = min(wait, timeout)
+            time.sleep(max(wait, 0))
+            bins = int((time.perf_counter() - self._stream_time) / period)
+        if n is not None:
+            bins = min(bins, n)
+        self._stream_time += bins * period
+        return self._take(bins)
+
+    def read_stream(self, n=None, timeout=None):
+        """Return the counts of the time bins (of `time_base` ms) elapsed
+        since the last call, waiting for the first one if needed.
+
+        Without `realtime`, return `n` bins (a block if None) at once.
+        """
+        return self.read_samples(n, timeout)['count']
+
+    def read_samples(self, n=None, timeout=None):
+        """Like `read_stream`, with consecutive bin indices and the host
+        time of the call, see SAMPLE_DTYPE."""
+        counts = self._stream_counts(n, timeout)
+        first, self._stream_bin = \
+            self._stream_bin, self._stream_bin + len(counts)
+        samples = make_samples(counts, np.arange(first, self._stream_bin),
+                               time.perf_counter())
+        if self._recorder is not None and len(samples) > 0:
+            self._recorder.write(samples)
+        return samples
+
+    def start_recording(self, recorder):
+        """Write the streamed samples to `recorder` as they are read."""
+        self._recorder = recorder
+
+    def stop_recording(self):
+        self._recorder = None
+
+    def stop_stream(self):
+        self._stream_time = None
+
+    def open(self, port, baudrate, binary=False):
+        pass
+
+    def set_binary(self, binary):
         pass
 
+    def wait_connected(self, timeout=None):
+        return True
+
     def close(self):
         pass
 
@@ -79,15 +254,55 @@ class DAQ_0DViewer_simulate_photoino(DAQ_0DViewer_photoino):
     controller_type = SimulatePhotoinoController
     params = DAQ_0DViewer_photoino.params+[
         {'title': 'Mean count rate:', 'name': 'mean_count_rate', 'type': 'int',
-         'min': 0},
+         'value': 100, 'min': 0},
         {'title': 'Low trigger level dark rate:', 'name': 'low_dark',
-         'type': 'int', 'min': 0},
+         'type': 'int', 'value': 1000, 'min': 0},
         {'title': 'Low trigger level:', 'name': 'low_trigger', 'type': 'float',
-         'min': 0},
+         'value': 0.1, 'min': 0},
+        {'title': 'Seed (-1 for random):', 'name': 'seed', 'type': 'int',
+         'value': -1, 'min': -1},
+        {'title': 'Block size:', 'name': 'block_size', 'type': 'int',
+         'value': 4096, 'min': 1},
+        {'title': 'Real time:', 'name': 'realtime', 'type': 'bool',
+         'value': True},
+        {'title': 'Engine:', 'name': 'engine', 'type': 'list',
+         'limits': list(SimulatePhotoinoController.engines),
+         'value': 'poisson'},
+        {'title': 'Photon stream:', 'name': 'photon_stream', 'type': 'group',
+         'children': [
+            {'title': 'Signal profile:', 'name': 'profile', 'type': 'list',
+             'limits': list(PROFILES), 'value': 'constant'},
+            {'title': 'Modulation depth:', 'name': 'modulation_depth',
+             'type': 'float', 'value': 0.5, 'min': 0., 'max': 1.},
+            {'title': 'Modulation frequency:', 'name': 'modulation_frequency',
+             'type': 'float', 'value': 1., 'min': 0., 'suffix': 'Hz',
+             'siPrefix': True},
+            {'title': 'Dark rate:', 'name': 'dark_rate', 'type': 'float',
+             'value': 100., 'min': 0., 'suffix': 'Hz', 'siPrefix': True},
+            {'title': 'Noise rate at level 0:', 'name': 'noise_rate',
+             'type': 'float', 'value': 1e6, 'min': 0., 'suffix': 'Hz',
+             'siPrefix': True},
+            {'title': 'Noise level:', 'name': 'noise_level', 'type': 'float',
+             'value': 0.05, 'min': 1e-6, 'suffix': 'V', 'siPrefix': True},
+            {'title': 'Dead time:', 'name': 'dead_time', 'type': 'float',
+             'value': 50e-9, 'min': 0., 'suffix': 's', 'siPrefix': True},
+            {'title': 'Afterpulse probability:',
+             'name': 'afterpulse_probability', 'type': 'float',
+             'value': 0.01, 'min': 0., 'max': 1.},
+            {'title': 'Afterpulse time:', 'name': 'afterpulse_time',
+             'type': 'float', 'value': 1e-6, 'min': 0., 'suffix': 's',
+             'siPrefix': True},
+        ]},
     ]
 
     def init_params(self):
         DAQ_0DViewer_photoino.init_params(self)
+        self.controller.block_size = self.settings['block_size']
+        self.controller.realtime = self.settings['realtime']
+        self.controller.seed = self.seed_value()
+        self.controller.engine = self.settings['engine']
+        for param in self.settings.child('photon_stream').children():
+            self.controller.set_photon_parameter(param.name(), param.value())
         self.controller.mean_count_rate = self.settings['mean_count_rate']
         self.controller.low_dark = self.settings['low_dark']
         self.controller.low_trigger = self.settings['low_trigger']
@@ -102,9 +317,23 @@ class DAQ_0DViewer_simulate_photoino(DAQ_0DViewer_photoino):
         elif param.name() == "low_trigger":
             self.controller.low_trigger = \
                 self.settings.child('low_trigger').value()
+        elif param.name() == "seed":
+            self.controller.seed = self.seed_value()
+        elif param.name() == "block_size":
+            self.controller.block_size = param.value()
+        elif param.name() == "realtime":
+            self.controller.realtime = param.value()
+        elif param.name() == "engine":
+            self.controller.engine = param.value()
+        elif param.parent().name() == "photon_stream":
+            self.controller.set_photon_parameter(param.name(), param.value())
         else:
             DAQ_0DViewer_photoino.commit_settings(self, param)
 
+    def seed_value(self):
+        seed = self.settings['seed']
+        return None if seed < 0 else seed
+
 
 if __name__ == '__main__':
     main(__file__)
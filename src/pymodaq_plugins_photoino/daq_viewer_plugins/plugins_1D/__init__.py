@@ -1,13 +1,14 @@
-import importlib
 from pathlib import Path
-from ... import set_logger
-logger = set_logger('viewer1D_plugins', add_to_console=False)
+from ...plugin_registry import PluginRegistry
 
-for path in Path(__file__).parent.iterdir():
-    try:
-        if '__init__' not in str(path):
-            importlib.import_module('.' + path.stem, __package__)
-    except Exception as e:
-        logger.warning("{:} plugin couldn't be loaded due to some missing packages or errors: {:}".format(path.stem, str(e)))
-        pass
+# PyMoDAQ lists the plugin modules found in path.parent
+path = Path(__file__)
+registry = PluginRegistry(__package__, path.parent)
 
+
+def __getattr__(name):
+    return registry.module_getattr(name)
+
+
+def __dir__():
+    return registry.module_dir(globals())
@@ -0,0 +1,95 @@
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_photoino import DAQ_0DViewer_photoino, PhotoinoController, \
+    viewer_params
+from pymodaq_plugins_photoino.processing.stages import RecorderStage
+from pymodaq_plugins_photoino.processing.ring_buffer import RingBuffer
+from pymodaq.utils.daq_utils import ThreadCommand
+from pymodaq.utils.data import Axis, DataFromPlugins
+from pymodaq.utils.parameter import Parameter
+from pymodaq.control_modules.viewer_utility_classes import main
+import time
+
+
+class DAQ_1DViewer_photoino(DAQ_0DViewer_photoino):
+    """PyMoDAQ plugin showing the recent trace of a streaming photoino
+
+    The counts of the last `trace_length` time bins are kept in a RingBuffer
+    and emitted as Data1D at most `refresh_rate` times per second; the
+    stream keeps collecting bins in between, so the display rate does not
+    limit the acquisition.
+    """
+
+    controller_type = PhotoinoController
+    hardware_averaging = False
+    stage_types = (RecorderStage,)
+    params = viewer_params(stage_types, exclude=('streaming',)) + [
+        {'title': 'Trace length (bins):', 'name': 'trace_length',
+         'type': 'int', 'value': 1000, 'min': 2},
+        {'title': 'Refresh rate (Hz):', 'name': 'refresh_rate',
+         'type': 'float', 'value': 20., 'min': 0.1},
+    ]
+
+    def ini_attributes(self):
+        DAQ_0DViewer_photoino.ini_attributes(self)
+        self.buffer: RingBuffer = None
+        self._next_refresh = 0.
+
+    def init_params(self):
+        DAQ_0DViewer_photoino.init_params(self)
+        self.buffer = RingBuffer(self.settings['trace_length'])
+
+    def commit_settings(self, param: Parameter):
+        if param.name() == "trace_length":
+            self.buffer.resize(param.value())
+        elif param.name() == "time_base":
+            DAQ_0DViewer_photoino.commit_settings(self, param)
+            self.buffer.clear()
+        elif param.name() != "refresh_rate":
+            DAQ_0DViewer_photoino.commit_settings(self, param)
+
+    def grab_data(self, Naverage=1, **kwargs):
+        """Wait for the next refresh, then emit the trace updated with all
+        the bins streamed meanwhile.
+
+        Parameters
+        ----------
+        Naverage: int
+            not used, every emitted trace holds the individual bins
+        kwargs: dict
+            others optionals arguments
+        """
+        self.update_metrics()
+        if not self.controller.streaming:
+            self.controller.start_stream()
+            self.buffer.clear()
+        wait = self._next_refresh - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        self._next_refresh = time.perf_counter() \
+            + 1. / self.settings['refresh_rate']
+
+        timeout = 1. + 2e-3 * self.settings['time_base']
+        counts = self.controller.read_stream(timeout=timeout)
+        if len(counts) == 0:
+            self.emit_status(ThreadCommand('Update_Status',
+                                           ['no counts from photoino']))
+            return
+        self.buffer.extend(counts)
+        self.emit_trace()
+
+    def emit_trace(self):
+        n = len(self.buffer)
+        time_base = 1e-3 * self.settings['time_base']
+        axis = Axis('Time', units='s', scaling=time_base,
+                    offset=-(n - 1) * time_base, size=n, index=0)
+        # the buffer is overwritten by the next grab while the GUI thread
+        # may still use the emitted data, hence the copy
+        data_to_emit = DataFromPlugins(name='Photon counter',
+                                       data=[self.buffer.view().copy()],
+                                       dim='Data1D', labels=['Counts'],
+                                       axes=[axis])
+        self.data_grabed_signal.emit([data_to_emit])
+
+
+if __name__ == '__main__':
+    main(__file__)
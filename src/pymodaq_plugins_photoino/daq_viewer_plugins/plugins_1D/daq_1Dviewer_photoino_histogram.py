@@ -0,0 +1,78 @@
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_photoino import DAQ_0DViewer_photoino, PhotoinoController, \
+    viewer_params
+from pymodaq_plugins_photoino.processing.stages import RecorderStage
+from pymodaq_plugins_photoino.processing.histogram import CountHistogram
+from pymodaq.utils.data import Axis, DataFromPlugins
+from pymodaq.utils.parameter import Parameter
+from pymodaq.control_modules.viewer_utility_classes import main
+import numpy as np
+
+
+class DAQ_1DViewer_photoino_histogram(DAQ_0DViewer_photoino):
+    """PyMoDAQ plugin accumulating the photon number distribution of a
+       photoino
+
+    Every grab reads `batch_size` time bins per average in one transfer (or
+    from the stream) and adds them to a CountHistogram. The histogram is
+    emitted as Data1D, decimated to at most `display_points` values, along
+    with its mean, variance, Fano factor and g2(0) as Data0D.
+    """
+
+    controller_type = PhotoinoController
+    stage_types = (RecorderStage,)
+    params = viewer_params(stage_types) + [
+        {'title': 'Batch size (bins):', 'name': 'batch_size', 'type': 'int',
+         'value': 1000, 'min': 1},
+        {'title': 'Display points:', 'name': 'display_points', 'type': 'int',
+         'value': 200, 'min': 2},
+        {'title': 'Reset histogram:', 'name': 'reset_histogram',
+         'type': 'bool_push', 'value': False},
+    ]
+
+    def ini_attributes(self):
+        DAQ_0DViewer_photoino.ini_attributes(self)
+        self.histogram = CountHistogram()
+
+    def commit_settings(self, param: Parameter):
+        if param.name() == "reset_histogram":
+            if param.value():
+                self.histogram.reset()
+                param.setValue(False)
+        elif param.name() not in ("batch_size", "display_points"):
+            DAQ_0DViewer_photoino.commit_settings(self, param)
+
+    def grab_data(self, Naverage=1, **kwargs):
+        """Add `Naverage` batches of time bins to the histogram and emit it
+
+        Parameters
+        ----------
+        Naverage: int
+            Number of batches read in this grab
+        kwargs: dict
+            others optionals arguments
+        """
+        counts = self.grab_counts(Naverage * self.settings['batch_size'])
+        if counts is None:
+            return
+        self.histogram.add(counts)
+        self.emit_histogram()
+
+    def emit_histogram(self):
+        values, width = self.histogram.decimated(
+            self.settings['display_points'])
+        axis = Axis('Photon number', scaling=width,
+                    offset=(width - 1) / 2, size=len(values), index=0)
+        labels = ['Mean', 'Variance', 'Fano factor', 'g2(0)', 'Bins']
+        stats = [self.histogram.mean, self.histogram.variance,
+                 self.histogram.fano, self.histogram.g2, self.histogram.bins]
+        self.data_grabed_signal.emit([
+            DataFromPlugins(name='Photon number distribution', data=[values],
+                            dim='Data1D', labels=['Bins'], axes=[axis]),
+            DataFromPlugins(name='Photon statistics',
+                            data=[np.array([value]) for value in stats],
+                            dim='Data0D', labels=labels)])
+
+
+if __name__ == '__main__':
+    main(__file__)
@@ -0,0 +1,82 @@
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_photoino import DAQ_0DViewer_photoino, PhotoinoController, \
+    viewer_params
+from pymodaq.utils.daq_utils import ThreadCommand
+from pymodaq.utils.data import Axis, DataFromPlugins
+from pymodaq.utils.parameter import Parameter
+from pymodaq.control_modules.viewer_utility_classes import main
+import numpy as np
+
+
+class DAQ_1DViewer_photoino_sweep(DAQ_0DViewer_photoino):
+    """PyMoDAQ plugin measuring the counts versus trigger level curve of a
+       photoino
+
+    Every grab uploads the list of levels once and gets the counts summed
+    over `bins_per_level` time bins at each level back in one binary
+    transfer, instead of one move and one read per level as in a DAQ_Scan
+    of the photoino actuator. The trigger level is set back to its setting
+    afterwards. The sweep goes through `grab_counts`, so a lost connection
+    reconnects and a failed sweep emits a NaN curve.
+    """
+
+    controller_type = PhotoinoController
+    hardware_averaging = True
+    stage_types = ()
+    params = viewer_params(stage_types, exclude=('streaming',)) + [
+        {'title': 'Sweep:', 'name': 'sweep', 'type': 'group', 'children': [
+            {'title': 'Start (V):', 'name': 'sweep_start', 'type': 'float',
+             'value': 0., 'min': -5.0, 'max': 5.0},
+            {'title': 'Stop (V):', 'name': 'sweep_stop', 'type': 'float',
+             'value': 2., 'min': -5.0, 'max': 5.0},
+            {'title': 'Points:', 'name': 'sweep_points', 'type': 'int',
+             'value': 101, 'min': 2},
+            {'title': 'Bins per level:', 'name': 'bins_per_level',
+             'type': 'int', 'value': 10, 'min': 1},
+        ]},
+    ]
+
+    def commit_settings(self, param: Parameter):
+        if param.name() not in ("sweep_start", "sweep_stop", "sweep_points",
+                                "bins_per_level"):
+            DAQ_0DViewer_photoino.commit_settings(self, param)
+
+    def levels(self):
+        return np.linspace(self.settings['sweep', 'sweep_start'],
+                           self.settings['sweep', 'sweep_stop'],
+                           self.settings['sweep', 'sweep_points'])
+
+    def grab_data(self, Naverage=1, **kwargs):
+        """Measure and emit one count versus trigger level curve
+
+        Parameters
+        ----------
+        Naverage: int
+            Number of curves summed by the device, read in a single transfer
+        kwargs: dict
+            others optionals arguments
+        """
+        levels = self.levels()
+        counts = self.grab_counts(Naverage)
+        if counts is None:
+            counts = np.full(len(levels), np.nan)
+        axis = Axis('Trigger level', units='V', data=levels, index=0)
+        self.data_grabed_signal.emit([
+            DataFromPlugins(name='Trigger sweep', data=[counts],
+                            dim='Data1D', labels=['Counts'], axes=[axis])])
+
+    def _grab_counts(self, Naverage):
+        try:
+            counts = self.controller.sweep(
+                self.levels(),
+                Naverage * self.settings['sweep', 'bins_per_level'])
+        except TimeoutError as e:
+            self.emit_status(ThreadCommand('Update_Status', [str(e)]))
+            counts = None
+        # the device was left at a level of the sweep
+        self.controller.trigger_level = self.settings['trigger_level']
+        return counts
+
+
+if __name__ == '__main__':
+    main(__file__)
@@ -0,0 +1,370 @@
+"""asyncio based photoino controller and its synchronous adapter.
+
+The serial port is opened non-blocking and watched by the event loop
+(``loop.add_reader``, POSIX only), so writing commands never waits for the
+reply of an earlier request. Replies arrive in the order of the requests and
+are matched against a FIFO of pending futures.
+"""
+import asyncio
+from collections import deque
+import threading
+
+import serial
+
+from pymodaq_plugins_photoino.hardware.multiplexer import DeviceBusy
+from pymodaq_plugins_photoino.hardware.ports import find_port
+from pymodaq_plugins_photoino.hardware.protocol import BLOCK_HEADER, \
+    COUNT_DTYPE, FRAME_SIZE, FrameDecoder, decode_block_header, decode_counts
+from pymodaq_plugins_photoino.hardware.serial_reader import SerialReader
+from pymodaq_plugins_photoino.hardware.settings_cache import SettingsCache
+from pymodaq_plugins_photoino.hardware.stream import SampleQueue
+
+
+class AsyncPhotoinoController:
+    """Photoino controller running its serial transport in an event loop.
+
+    Every request takes an optional `timeout` in seconds. A request that
+    times out or is cancelled keeps its place in the reply queue, its reply
+    is discarded when it arrives so later requests stay matched.
+    """
+
+    def __init__(self):
+        self.ser = None
+        self.reader = None
+        self.binary = False
+        self.decoder = FrameDecoder()
+        self.queue = SampleQueue()
+        self.streaming = False
+        self._pending = deque()
+        self._loop = None
+        self._time_base = 1.
+
+    async def open(self, port, baudrate, binary=False):
+        if self.ser is not None:
+            await self.close()
+        self._loop = asyncio.get_running_loop()
+        try:
+            self.ser = serial.Serial(port=port, baudrate=baudrate, timeout=0)
+        except serial.SerialException as e:
+            self.ser = None
+            raise ValueError("couldn't open port '%s'" % port) from e
+        self.reader = SerialReader(self.ser)
+        self._loop.add_reader(self.ser.fileno(), self._on_readable)
+        if binary:
+            await self.set_binary(True)
+
+    async def close(self):
+        if self.ser is None:
+            return
+        await self.stop_stream()
+        self.write('stop\n')
+        self._loop.remove_reader(self.ser.fileno())
+        self._fail_pending(ConnectionError("photoino closed"))
+        self.ser.close()
+        self.ser = None
+
+    def _on_readable(self):
+        try:
+            self.reader.fill()
+        except serial.SerialException as e:
+            self._loop.remove_reader(self.ser.fileno())
+            self._fail_pending(e)
+            return
+        self._dispatch()
+
+    def _fail_pending(self, error):
+        while self._pending:
+            _, future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    def _dispatch(self):
+        while self._pending:
+            parse, future = self._pending[0]
+            try:
+                result = parse()
+            except Exception as e:
+                self._pending.popleft()
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if result is None:
+                return
+            self._pending.popleft()
+            if not future.done():
+                future.set_result(result)
+        if self.streaming:
+            if self.binary:
+                samples = self.reader.decode(self.decoder)['count']
+                bins = self.decoder.bins
+            else:
+                samples, bins = self.reader.read_numbers(), None
+            if len(samples) > 0:
+                self.queue.put(samples, bins)
+
+    def write(self, command):
+        self.ser.write(command.encode())
+
+    async def request(self, command, parse, timeout=None):
+        """Send `command` and wait for the reply decoded by `parse`.
+
+        `parse` is called whenever new data arrived and returns None until
+        its reply is complete.
+        """
+        future = self._loop.create_future()
+        self._pending.append((parse, future))
+        self.write(command)
+        self._dispatch()
+        return await asyncio.wait_for(future, timeout)
+
+    def _parse_number(self):
+        line = self.reader.read_line()
+        return None if line is None else int(line)
+
+    def _parse_frame(self):
+        frame = self.reader.read_exact(FRAME_SIZE, skip_line_breaks=True)
+        if frame is None:
+            return None
+        frames, _ = self.decoder.decode(frame)
+        if len(frames) == 0:
+            raise ValueError("corrupt frame from photoino")
+        return int(frames['count'][0])
+
+    def _block_parser(self):
+        size = None
+
+        def parse():
+            nonlocal size
+            if size is None:
+                header = self.reader.read_exact(BLOCK_HEADER.size,
+                                                skip_line_breaks=True)
+                if header is None:
+                    return None
+                size = decode_block_header(header) * COUNT_DTYPE.itemsize
+            payload = self.reader.read_exact(size)
+            return None if payload is None else decode_counts(payload)
+        return parse
+
+    async def set_binary(self, binary, timeout=0.2):
+        """Switch protocol, staying with ASCII if the firmware refuses.
+
+        Requests still pending after the switch expected their replies in
+        the former protocol, they fail with ConnectionError.
+        """
+        if binary == self.binary:
+            return
+        await self.stop_stream()
+        if not binary:
+            self.write('protocol ascii\n')
+            self.binary = False
+            return
+        try:
+            reply = await self.request('protocol binary\n',
+                                       self.reader.read_line, timeout)
+        except asyncio.TimeoutError:
+            reply = None
+        self._fail_pending(ConnectionError("photoino protocol switched"))
+        self.reader.clear()
+        self.decoder.reset()
+        self.binary = reply == b'binary'
+
+    async def count_rate(self, timeout=None):
+        parse = self._parse_frame if self.binary else self._parse_number
+        return await self.request('rate?\n', parse, timeout)
+
+    async def read_counts(self, n, timeout=None):
+        if timeout is None:
+            timeout = 1. + 1e-3 * n * self._time_base
+        return await self.request('counts? %d\n' % n, self._block_parser(),
+                                  timeout)
+
+    async def get_trigger_level(self, timeout=None):
+        return await self.request('level?\n', self._parse_number, timeout)
+
+    async def set_trigger_level(self, value):
+        self.write('level %f\n' % value)
+
+    async def get_time_base(self, timeout=None):
+        return await self.request('timebase?\n', self._parse_number, timeout)
+
+    async def set_time_base(self, value):
+        self.write('timebase %f\n' % value)
+        self._time_base = value
+
+    async def start(self):
+        self.write('start\n')
+
+    async def stop(self):
+        self.write('stop\n')
+
+    async def start_stream(self):
+        if self.streaming:
+            return
+        self.queue.clear()
+        self.decoder.reset()
+        self.streaming = True
+        self.write('start\n')
+
+    async def stop_stream(self):
+        if not self.streaming:
+            return
+        self.write('stop\n')
+        self.streaming = False
+
+
+class SyncPhotoinoAdapter:
+    """Synchronous facade over AsyncPhotoinoController.
+
+    The event loop runs in a daemon thread; every call is submitted to it and
+    waits for the result, so the adapter is a drop-in replacement for
+    PhotoinoController. Requests give up after `timeout` seconds instead of
+    stalling the caller.
+
+    As in PhotoinoController, `time_base` and `trigger_level` are served
+    from a SettingsCache, their writes coalesced over `debounce` seconds,
+    and `verify_settings` reads them back from the device. Queries needing
+    a reply raise DeviceBusy while streaming.
+    """
+
+    reconnecting = False
+
+    def __init__(self, timeout=2.):
+        self.timeout = timeout
+        self.controller = AsyncPhotoinoController()
+        self.settings = SettingsCache(self._write_setting)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        daemon=True)
+        self._thread.start()
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def open(self, port, baudrate, binary=False):
+        if port == '':
+            port = find_port()
+            if port is None:
+                raise ValueError("no photoino found")
+        if baudrate == 0:
+            baudrate = 115200
+        self.settings.invalidate()
+        self._run(self.controller.open(port, baudrate, binary=binary))
+
+    def close(self):
+        self.settings.flush()
+        self._run(self.controller.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    @property
+    def binary(self):
+        return self.controller.binary
+
+    def _check_idle(self):
+        if self.controller.streaming:
+            raise DeviceBusy("photoino is streaming, its replies can't be "
+                             "told apart from the counts")
+
+    def _write_setting(self, name, value):
+        setter = self.controller.set_trigger_level if name == 'trigger_level'\
+            else self.controller.set_time_base
+        self._run(setter(value))
+
+    def _read_setting(self, name):
+        self._check_idle()
+        getter = self.controller.get_trigger_level if name == 'trigger_level'\
+            else self.controller.get_time_base
+        return self._run(getter(self.timeout))
+
+    @property
+    def debounce(self):
+        return self.settings.debounce
+
+    @debounce.setter
+    def debounce(self, value):
+        self.settings.debounce = value
+
+    def verify_settings(self):
+        """Flush pending settings, read them back from the device and
+        return those that differ from the cached values, compared rounded
+        as the firmware reports whole numbers."""
+        self.settings.flush()
+        mismatches = {}
+        for name in ('time_base', 'trigger_level'):
+            value = self._read_setting(name)
+            if name not in self.settings:
+                self.settings.update(name, value)
+            elif round(self.settings.get(name)) != value:
+                mismatches[name] = value
+                self.settings.update(name, value)
+        return mismatches
+
+    def set_binary(self, binary):
+        self._run(self.controller.set_binary(binary))
+
+    @property
+    def missing_bins(self):
+        return self.controller.decoder.missing
+
+    def start(self):
+        self._run(self.controller.start())
+
+    def stop(self):
+        self._run(self.controller.stop())
+
+    @property
+    def streaming(self):
+        return self.controller.streaming
+
+    def start_stream(self):
+        self.settings.flush()
+        self._run(self.controller.start_stream())
+
+    def read_stream(self, n=None, timeout=None):
+        return self.controller.queue.get(n, timeout)
+
+    def read_samples(self, n=None, timeout=None):
+        return self.controller.queue.get_samples(n, timeout)
+
+    def start_recording(self, recorder):
+        self.controller.queue.sink = recorder.write
+
+    def stop_recording(self):
+        self.controller.queue.sink = None
+
+    def stop_stream(self):
+        self._run(self.controller.stop_stream())
+
+    @property
+    def count_rate(self):
+        self.settings.flush()
+        self._check_idle()
+        return self._run(self.controller.count_rate(self.timeout))
+
+    def read_counts(self, n, timeout=None):
+        self.settings.flush()
+        self._check_idle()
+        return self._run(self.controller.read_counts(n, timeout))
+
+    def _cached_setting(self, name):
+        if name not in self.settings:
+            self.settings.flush()
+            self.settings.update(name, self._read_setting(name))
+        return self.settings.get(name)
+
+    @property
+    def trigger_level(self):
+        return self._cached_setting('trigger_level')
+
+    @trigger_level.setter
+    def trigger_level(self, value):
+        self.settings.set('trigger_level', value)
+
+    @property
+    def time_base(self):
+        return self._cached_setting('time_base')
+
+    @time_base.setter
+    def time_base(self, value):
+        self.settings.set('time_base', value)
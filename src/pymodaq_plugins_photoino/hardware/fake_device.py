@@ -0,0 +1,211 @@
+"""Pseudo terminal stand-in for a photoino, for tests and benchmarks.
+
+FakePhotoino opens a pty pair and answers the firmware commands on the
+master side from a background thread, so PhotoinoController talks to it
+through the real serial.Serial code path by opening `port`. Replies can be
+delayed by a fixed latency plus random jitter, and outgoing bytes are
+throttled to the given baud rate (10 bits per byte). POSIX only.
+
+Run as a script to keep a fake device available for a PyMoDAQ session.
+"""
+import os
+import select
+import threading
+import time
+import tty
+
+import numpy as np
+
+from pymodaq_plugins_photoino.hardware.protocol import encode_block, \
+    encode_frames
+
+
+class FakePhotoino:
+    """Emulated photoino firmware behind a pseudo terminal.
+
+    Parameters
+    ----------
+    latency: float
+        delay (s) before every reply
+    jitter: float
+        standard deviation (s) of a random extra delay, clipped at 0
+    baudrate: int or None
+        simulated line speed, unthrottled if None
+    binary: bool
+        whether the firmware accepts the binary protocol
+    realtime: bool
+        whether 'counts?' and the stream wait for the bins to elapse
+    """
+
+    def __init__(self, latency=0., jitter=0., baudrate=None, binary=True,
+                 realtime=True, mean_count_rate=100, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.baudrate = baudrate
+        self.binary_capable = binary
+        self.realtime = realtime
+        self.mean_count_rate = mean_count_rate
+        self.rng = np.random.default_rng(seed)
+        self.time_base = 1.
+        self.trigger_level = 0.
+        self.binary = False
+        self.streaming = False
+        self.commands = []
+        self._seq = 0
+        self._master = self._slave = None
+        self._thread = None
+        self._running = threading.Event()
+
+    @property
+    def port(self):
+        return os.ttyname(self._slave)
+
+    def open(self):
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self._running.set()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _delay(self):
+        delay = self.latency
+        if self.jitter > 0:
+            delay += max(self.rng.normal(0., self.jitter), 0.)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _write(self, data):
+        while data and self._running.is_set():
+            _, writable, _ = select.select([], [self._master], [], 0.1)
+            if writable:
+                try:
+                    data = data[os.write(self._master, data):]
+                except BlockingIOError:
+                    pass
+
+    def _send(self, data):
+        if self.baudrate:
+            chunk = max(self.baudrate // 1000, 1)
+            for start in range(0, len(data), chunk):
+                part = data[start:start + chunk]
+                self._write(part)
+                time.sleep(10. * len(part) / self.baudrate)
+        else:
+            self._write(data)
+
+    def _counts(self, n):
+        return self.rng.poisson(self.mean_count_rate, n)
+
+    def _encode(self, counts):
+        if self.binary:
+            data = encode_frames(counts, self._seq)
+        else:
+            data = b''.join(b'%d\r\n' % count for count in counts)
+        self._seq += len(counts)
+        return data
+
+    def _handle(self, line):
+        self.commands.append(line)
+        words = line.split()
+        if not words:
+            return
+        command, args = words[0], words[1:]
+        if command == 'start':
+            self.streaming = True
+            self._next_bin = time.perf_counter() + 1e-3 * self.time_base
+        elif command == 'stop':
+            self.streaming = False
+        elif command == 'rate?':
+            self._delay()
+            self._send(self._encode(self._counts(1)))
+        elif command == 'counts?':
+            n = int(args[0])
+            if self.realtime:
+                time.sleep(1e-3 * n * self.time_base)
+            self._delay()
+            self._send(encode_block(self._counts(n)))
+        elif command == 'sweep':
+            bins = int(args[0])
+            levels = [float(level) for level in args[1:]]
+            if self.realtime:
+                time.sleep(1e-3 * bins * len(levels) * self.time_base)
+            self._delay()
+            counts = [self._counts(bins).sum() for _ in levels]
+            if levels:
+                self.trigger_level = levels[-1]
+            self._send(encode_block(counts))
+        elif command == 'level':
+            self.trigger_level = float(args[0])
+        elif command == 'timebase':
+            self.time_base = float(args[0])
+        elif command == 'level?':
+            self._delay()
+            self._send(b'%d\r\n' % round(self.trigger_level))
+        elif command == 'timebase?':
+            self._delay()
+            self._send(b'%d\r\n' % round(self.time_base))
+        elif command == 'protocol' and self.binary_capable:
+            self.binary = args[0] == 'binary'
+            if self.binary:
+                self._send(b'binary\r\n')
+
+    def _stream(self):
+        if self.realtime:
+            now = time.perf_counter()
+            n = int((now - self._next_bin) / (1e-3 * self.time_base)) + 1
+            if now < self._next_bin:
+                return
+            self._next_bin += n * 1e-3 * self.time_base
+        else:
+            n = 1000
+        self._send(self._encode(self._counts(n)))
+
+    def _serve(self):
+        buffer = b''
+        while self._running.is_set():
+            timeout = 0.1
+            if self.streaming:
+                timeout = 0. if not self.realtime else \
+                    max(self._next_bin - time.perf_counter(), 0.)
+            readable, _, _ = select.select([self._master], [], [],
+                                           min(timeout, 0.1))
+            if readable:
+                try:
+                    buffer += os.read(self._master, 4096)
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    break
+                *lines, buffer = buffer.split(b'\n')
+                for line in lines:
+                    self._handle(line.strip().decode())
+            if self.streaming:
+                self._stream()
+
+
+if __name__ == '__main__':
+    with FakePhotoino() as device:
+        print("fake photoino on %s, Ctrl-C to stop" % device.port)
+        try:
+            while True:
+                time.sleep(1.)
+        except KeyboardInterrupt:
+            pass
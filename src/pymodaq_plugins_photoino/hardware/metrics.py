@@ -0,0 +1,145 @@
+"""Counters and latency histograms for profiling the photoino I/O.
+
+A Metrics registry is disabled by default: every hook then returns after a
+single attribute test and `timer` hands out a shared no-op context manager,
+so instrumented code paths cost next to nothing unless profiling is on.
+"""
+import contextlib
+import json
+import math
+import threading
+import time
+
+
+class LatencyHistogram:
+    """Durations (s) binned in powers of two above `resolution`, with exact
+    count, sum, minimum and maximum.
+
+    Bucket 0 holds durations below `resolution`, bucket i those in
+    [resolution 2**(i - 1), resolution 2**i); the last bucket is open ended.
+    """
+
+    def __init__(self, resolution=1e-6, buckets=32):
+        self.resolution = resolution
+        self.counts = [0] * buckets
+        self.count = 0
+        self.total = 0.
+        self.min = math.inf
+        self.max = 0.
+
+    def add(self, value):
+        index = math.frexp(value / self.resolution)[1] \
+            if value >= self.resolution else 0
+        self.counts[min(index, len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else math.nan
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the `q` quantile, at most the
+        largest duration seen."""
+        if self.count == 0:
+            return math.nan
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                break
+        return min(self.resolution * 2 ** index, self.max)
+
+    def summary(self):
+        return {'count': self.count, 'mean': self.mean,
+                'min': self.min if self.count else math.nan, 'max': self.max,
+                'p50': self.quantile(0.5), 'p90': self.quantile(0.9),
+                'p99': self.quantile(0.99)}
+
+
+class _Timer:
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+
+
+_NO_TIMER = contextlib.nullcontext()
+
+
+class Metrics:
+    """Named counters and latency histograms, shared between threads.
+
+    `count` adds to a counter, `observe` adds a duration (s) to a histogram
+    and `timer(name)` observes the duration of a with block; all do nothing
+    while `enabled` is False.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+            self.since = time.time()
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.add(value)
+
+    def timer(self, name):
+        if not self.enabled:
+            return _NO_TIMER
+        return _Timer(self, name)
+
+    def snapshot(self):
+        """Counters, their rates (per s) since the last reset and the
+        histogram summaries, as a JSON serialisable dict."""
+        with self._lock:
+            elapsed = time.time() - self.since
+            return {
+                'since': self.since, 'elapsed': elapsed,
+                'counters': dict(self.counters),
+                'rates': {name: value / elapsed if elapsed > 0 else math.nan
+                          for name, value in self.counters.items()},
+                'histograms': {name: histogram.summary() for name, histogram
+                               in self.histograms.items()}}
+
+    def summary(self):
+        """Human readable snapshot, one counter or histogram per line."""
+        snapshot = self.snapshot()
+        lines = ['%s: %d (%.1f/s)' % (name, value, snapshot['rates'][name])
+                 for name, value in sorted(snapshot['counters'].items())]
+        lines += ['%s: n=%d mean=%.3g ms p50=%.3g ms p99=%.3g ms max=%.3g ms'
+                  % (name, h['count'], 1e3 * h['mean'], 1e3 * h['p50'],
+                     1e3 * h['p99'], 1e3 * h['max'])
+                  for name, h in sorted(snapshot['histograms'].items())]
+        return '\n'.join(lines)
+
+    def dump(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.snapshot(), file, indent=2)
@@ -0,0 +1,95 @@
+"""Serialised access to one photoino from several threads.
+
+The photoino protocol has no request identifiers: a reply belongs to the
+last command sent. When a viewer and an actuator share one controller, every
+exchange (a command and the reading of its reply) must therefore run as a
+whole before the next one starts. CommandQueue runs them on a single I/O
+thread, count reads ahead of settings traffic.
+
+While the device streams, it pushes its counts unasked and a reply could
+not be told apart from them: exchanges expecting a reply then raise
+DeviceBusy instead of reading the stream.
+"""
+from concurrent.futures import Future
+import itertools
+import queue
+import threading
+import time
+
+from pymodaq_plugins_photoino.hardware.metrics import Metrics
+
+
+PRIORITY_COUNTS = 0
+PRIORITY_SETTINGS = 1
+
+
+class DeviceBusy(RuntimeError):
+    """The device can't answer a query in its current state, e.g. while
+    streaming."""
+
+
+class CommandQueue:
+    """Run exchanges with a device on one I/O thread, by priority then in
+    submission order.
+
+    `call(exchange, priority)` runs `exchange()` on the I/O thread and
+    returns its result or raises its exception in the calling thread. Calls
+    made from the I/O thread itself, or while it is not running, run
+    directly, so exchanges can be composed. The time requests wait in the
+    queue is observed in `metrics` as 'io_queue_wait'.
+    """
+
+    def __init__(self, metrics=None, name='photoino I/O'):
+        self.metrics = Metrics() if metrics is None else metrics
+        self.name = name
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name,
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Run the pending exchanges, then stop the I/O thread."""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put((PRIORITY_SETTINGS + 1, next(self._sequence), None))
+        if thread is not threading.current_thread():
+            thread.join()
+
+    def submit(self, exchange, priority=PRIORITY_SETTINGS):
+        """Queue `exchange` and return a Future of its result."""
+        future = Future()
+        self._queue.put((priority, next(self._sequence),
+                         (exchange, future, time.perf_counter())))
+        return future
+
+    def call(self, exchange, priority=PRIORITY_SETTINGS):
+        thread = self._thread
+        if thread is None or thread is threading.current_thread():
+            return exchange()
+        return self.submit(exchange, priority).result()
+
+    def _run(self):
+        while True:
+            _, _, request = self._queue.get()
+            if request is None:
+                return
+            exchange, future, submitted = request
+            self.metrics.observe('io_queue_wait',
+                                 time.perf_counter() - submitted)
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(exchange())
+            except BaseException as e:
+                future.set_exception(e)
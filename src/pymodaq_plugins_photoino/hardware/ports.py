@@ -0,0 +1,116 @@
+"""Serial ports the photoino may be connected to.
+
+Ports are enumerated with pyserial, USB ports of the boards the photoino
+firmware runs on first. DeviceCache remembers the identity (USB ids and
+serial number) of the photoinos used before, so the same counter is found
+again on startup or after a USB drop, whatever port name it came back on.
+"""
+import json
+from pathlib import Path
+import time
+
+from serial.tools import list_ports
+
+
+# (vendor id, product id or None for any) of Arduino compatible boards and
+# of the usual USB serial bridges
+PHOTOINO_USB_IDS = ((0x2341, None), (0x2A03, None), (0x1A86, 0x7523),
+                    (0x0403, 0x6001), (0x10C4, 0xEA60))
+
+
+def is_photoino(info):
+    return any(info.vid == vid and pid in (None, info.pid)
+               for vid, pid in PHOTOINO_USB_IDS)
+
+
+def port_infos():
+    """pyserial descriptions of the USB serial ports, likely photoinos
+    first."""
+    infos = [info for info in list_ports.comports() if info.vid is not None]
+    return sorted(infos, key=lambda info: (not is_photoino(info),
+                                           info.device))
+
+
+def port_info(port):
+    """pyserial description of `port`, None if it is no USB port."""
+    for info in port_infos():
+        if info.device == port:
+            return info
+    return None
+
+
+def available_ports(patterns=('ttyACM*', 'ttyUSB*')):
+    """USB serial ports, likely photoinos first; falls back to the device
+    files matching `patterns` if pyserial lists none."""
+    ports = [info.device for info in port_infos()]
+    if ports:
+        return ports
+    return [str(path) for pattern in patterns
+            for path in sorted(Path('/dev/').glob(pattern))]
+
+
+class DeviceCache:
+    """Identities of the photoinos used before, stored as JSON.
+
+    Entries are keyed by USB serial number; the most recently used one is
+    preferred when no port is given.
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+        self._devices = None
+
+    @property
+    def path(self):
+        if self._path is None:
+            from pymodaq.utils.config import get_set_local_dir
+            self._path = Path(get_set_local_dir()) / 'photoino_devices.json'
+        return Path(self._path)
+
+    @property
+    def devices(self):
+        if self._devices is None:
+            try:
+                self._devices = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                self._devices = {}
+        return self._devices
+
+    def remember(self, info):
+        """Store the identity of the device described by the pyserial
+        `info`, ignored without a serial number."""
+        if info is None or not info.serial_number:
+            return
+        self.devices[info.serial_number] = {
+            'port': info.device, 'vid': info.vid, 'pid': info.pid,
+            'description': info.description, 'last_used': time.time()}
+        try:
+            self.path.write_text(json.dumps(self.devices, indent=2))
+        except OSError:
+            pass
+
+    def serial_numbers(self):
+        """Known serial numbers, most recently used first."""
+        return sorted(self.devices,
+                      key=lambda serial: -self.devices[serial]['last_used'])
+
+
+def find_port(serial_number=None, cache=None):
+    """Port of the photoino with `serial_number`, None if it is not
+    connected.
+
+    Without serial number, return the port of the most recently used
+    photoino of `cache` still connected, else the first available port or
+    None.
+    """
+    infos = port_infos()
+    by_serial = {info.serial_number: info.device for info in infos
+                 if info.serial_number}
+    if serial_number is not None:
+        return by_serial.get(serial_number)
+    if cache is not None:
+        for known in cache.serial_numbers():
+            if known in by_serial:
+                return by_serial[known]
+    ports = available_ports()
+    return ports[0] if ports else None
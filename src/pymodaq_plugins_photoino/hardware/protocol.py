@@ -0,0 +1,117 @@
+"""Binary framing used by the photoino firmware for bulk count transfers.
+
+A block of consecutive time bins is sent as a start byte ``#``, the number
+of bins as little-endian uint32 and then the counts themselves, each one a
+little-endian uint32.
+"""
+import struct
+
+import numpy as np
+
+
+BLOCK_START = b'#'
+BLOCK_HEADER = struct.Struct('<cI')
+COUNT_DTYPE = np.dtype('<u4')
+
+
+def encode_block(counts) -> bytes:
+    counts = np.asarray(counts, dtype=COUNT_DTYPE)
+    return BLOCK_HEADER.pack(BLOCK_START, len(counts)) + counts.tobytes()
+
+
+def decode_block_header(header: bytes) -> int:
+    """Return the number of bins announced by a block header."""
+    start, n = BLOCK_HEADER.unpack(header)
+    if start != BLOCK_START:
+        raise ValueError("invalid block start %r" % start)
+    return n
+
+
+def decode_counts(payload: bytes) -> np.ndarray:
+    return np.frombuffer(payload, dtype=COUNT_DTYPE)
+
+
+# Binary streaming protocol, negotiated with 'protocol binary'. Every time
+# bin is sent as a fixed size frame: sync byte, little-endian uint16
+# sequence number, little-endian uint32 count and a checksum byte holding
+# the sum of the preceding bytes modulo 256.
+FRAME_SYNC = 0xA5
+FRAME_DTYPE = np.dtype([('sync', 'u1'), ('seq', '<u2'), ('count', '<u4'),
+                        ('checksum', 'u1')])
+FRAME_SIZE = FRAME_DTYPE.itemsize
+SEQ_MODULO = 1 << 16
+
+
+def encode_frames(counts, first_seq=0) -> bytes:
+    counts = np.asarray(counts)
+    frames = np.zeros(len(counts), dtype=FRAME_DTYPE)
+    frames['sync'] = FRAME_SYNC
+    frames['seq'] = (first_seq + np.arange(len(counts))) % SEQ_MODULO
+    frames['count'] = counts
+    raw = frames.view(np.uint8).reshape(-1, FRAME_SIZE)
+    frames['checksum'] = raw[:, :-1].sum(axis=1, dtype=np.uint8)
+    return frames.tobytes()
+
+
+class FrameDecoder:
+    """Decode binary count frames, checking checksums and sequence numbers.
+
+    `missing` counts the bins lost between frames according to their sequence
+    numbers, `corrupt` the bytes skipped to resynchronise after a bad frame.
+    `bins` holds the bin indices of the frames returned by the last `decode`,
+    the sequence numbers unwrapped and counted from the first frame.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.last_seq = None
+        self.last_bin = -1
+        self.bins = np.zeros(0, dtype=np.int64)
+        self.missing = 0
+        self.corrupt = 0
+
+    def decode(self, data):
+        """Decode the complete frames at the start of `data`.
+
+        Returns the frames as a structured array and the number of bytes
+        consumed; an incomplete trailing frame is left for the next call.
+        """
+        sync = bytes([FRAME_SYNC])
+        chunks = []
+        offset = 0
+        while True:
+            n = (len(data) - offset) // FRAME_SIZE
+            if n == 0:
+                break
+            raw = np.frombuffer(data, dtype=np.uint8, count=n * FRAME_SIZE,
+                                offset=offset).reshape(n, FRAME_SIZE)
+            valid = (raw[:, 0] == FRAME_SYNC) \
+                & (raw[:, :-1].sum(axis=1, dtype=np.uint8) == raw[:, -1])
+            bad = np.flatnonzero(~valid)
+            good = n if len(bad) == 0 else bad[0]
+            if good > 0:
+                chunks.append(raw[:good].copy().view(FRAME_DTYPE).ravel())
+                offset += good * FRAME_SIZE
+            if good == n:
+                break
+            resync = data.find(sync, offset + 1)
+            if resync < 0:
+                resync = len(data)
+            self.corrupt += resync - offset
+            offset = resync
+
+        frames = np.concatenate(chunks) if chunks \
+            else np.zeros(0, dtype=FRAME_DTYPE)
+        if len(frames) > 0:
+            seq = frames['seq'].astype(np.int64)
+            previous = seq[0] - 1 if self.last_seq is None else self.last_seq
+            steps = np.diff(seq, prepend=previous) % SEQ_MODULO
+            self.missing += int(steps.sum()) - len(steps)
+            self.bins = self.last_bin + np.cumsum(steps)
+            self.last_bin = int(self.bins[-1])
+            self.last_seq = int(seq[-1])
+        else:
+            self.bins = np.zeros(0, dtype=np.int64)
+        return frames, offset
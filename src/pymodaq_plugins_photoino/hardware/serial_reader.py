@@ -0,0 +1,135 @@
+"""Buffered reader for the line oriented photoino serial protocol."""
+from pymodaq_plugins_photoino.hardware.metrics import Metrics
+
+
+class SerialReader:
+    """Pull bytes from a serial port in bulk and hand them out line by line.
+
+    Everything waiting on the port is read in a single call and kept in a
+    persistent receive buffer, so partial lines survive between calls and
+    replies already queued by the device are never thrown away.
+
+    Bytes read and discarded are counted in `metrics` ('bytes_read',
+    'bytes_discarded').
+    """
+
+    terminators = b'\r\n'
+
+    def __init__(self, ser, size=4096, metrics=None):
+        self.ser = ser
+        self.metrics = Metrics() if metrics is None else metrics
+        self._buffer = bytearray()
+        self._start = 0
+        self._size = size
+
+    def __len__(self):
+        return len(self._buffer) - self._start
+
+    def clear(self):
+        """Drop everything buffered and pending on the port."""
+        buffered = len(self)
+        self._buffer.clear()
+        self._start = 0
+        n = self.ser.in_waiting
+        if n > 0:
+            self.ser.read(n)
+        self.metrics.count('bytes_discarded', buffered + n)
+
+    def fill(self, block=True):
+        """Append the bytes available on the port to the receive buffer.
+
+        With `block` set, wait (up to the port timeout) for at least one byte.
+        Returns the number of bytes read.
+        """
+        n = self.ser.in_waiting
+        if n == 0:
+            if not block:
+                return 0
+            n = 1
+        data = self.ser.read(n)
+        if self._start > self._size and self._start * 2 > len(self._buffer):
+            del self._buffer[:self._start]
+            self._start = 0
+        self._buffer += data
+        self.metrics.count('bytes_read', len(data))
+        return len(data)
+
+    def _skip_line_breaks(self):
+        buffer = self._buffer
+        while self._start < len(buffer) \
+                and buffer[self._start] in self.terminators:
+            self._start += 1
+
+    def _next_line(self):
+        buffer = self._buffer
+        self._skip_line_breaks()
+        end = len(buffer)
+        for terminator in self.terminators:
+            pos = buffer.find(terminator, self._start)
+            if 0 <= pos < end:
+                end = pos
+        if end == len(buffer):
+            return None
+        line = bytes(buffer[self._start:end])
+        self._start = end + 1
+        return line
+
+    def read_line(self):
+        """Return the next non-empty line without terminator, None on timeout.
+        """
+        while True:
+            line = self._next_line()
+            if line is not None:
+                return line
+            if self.fill() == 0:
+                return None
+
+    def read_exact(self, n, skip_line_breaks=False):
+        """Return exactly `n` raw bytes, None on timeout.
+
+        With `skip_line_breaks`, line terminators preceding the data are
+        dropped first.
+        """
+        while skip_line_breaks:
+            self._skip_line_breaks()
+            if len(self) > 0:
+                break
+            if self.fill() == 0:
+                return None
+        while len(self) < n:
+            if self.fill() == 0:
+                return None
+        data = bytes(self._buffer[self._start:self._start + n])
+        self._start += n
+        return data
+
+    def decode(self, decoder, block=False):
+        """Pass the buffered bytes to `decoder` and drop what it consumed.
+
+        `decoder.decode(data)` must return a result and the number of bytes
+        it used, leaving incomplete data in the buffer for the next call.
+        """
+        self.fill(block=block)
+        result, consumed = decoder.decode(bytes(self._buffer[self._start:]))
+        self._start += consumed
+        return result
+
+    def read_number(self):
+        """Return the next line parsed as integer.
+
+        Raises TimeoutError if the device does not answer.
+        """
+        line = self.read_line()
+        if line is None:
+            raise TimeoutError("no reply from photoino")
+        return int(line)
+
+    def read_numbers(self, block=False):
+        """Return all complete lines received so far parsed as integers."""
+        self.fill(block=block)
+        numbers = []
+        while True:
+            line = self._next_line()
+            if line is None:
+                return numbers
+            numbers.append(int(line))
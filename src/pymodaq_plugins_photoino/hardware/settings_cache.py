@@ -0,0 +1,61 @@
+"""Host side cache of the photoino settings with coalesced writes."""
+import threading
+
+
+class SettingsCache:
+    """Remember the last value written for each setting and batch writes.
+
+    `write(name, value)` sends one setting to the device. With a positive
+    `debounce` window (s), the first change of a setting arms a timer and
+    every change until it fires only replaces the pending value, so a burst
+    of changes costs a single write of the latest value. `flush` sends the
+    pending values at once, `invalidate` forgets everything, e.g. after a
+    reconnect, so the next reads go back to the device.
+    """
+
+    def __init__(self, write, debounce=0.):
+        self._write = write
+        self.debounce = debounce
+        self._values = {}
+        self._pending = {}
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self._values
+
+    def get(self, name, default=None):
+        return self._values.get(name, default)
+
+    def update(self, name, value):
+        """Store a value read back from the device."""
+        self._values[name] = value
+
+    def set(self, name, value):
+        self._values[name] = value
+        if self.debounce <= 0:
+            self._write(name, value)
+            return
+        with self._lock:
+            self._pending[name] = value
+            if self._timer is None:
+                self._timer = threading.Timer(self.debounce, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending, self._pending = self._pending, {}
+            for name, value in pending.items():
+                self._write(name, value)
+
+    def invalidate(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._pending.clear()
+            self._values.clear()
@@ -0,0 +1,137 @@
+"""Background acquisition of the counts pushed by a streaming photoino."""
+from collections import deque
+import threading
+import time
+
+import numpy as np
+
+
+SAMPLE_DTYPE = np.dtype([('count', '<i8'), ('bin', '<i8'), ('time', '<f8')])
+
+
+def make_samples(counts, bins, timestamp):
+    """Pack counts with their device bin indices and the host time (s,
+    `time.perf_counter`) they were received at into SAMPLE_DTYPE."""
+    samples = np.empty(len(counts), dtype=SAMPLE_DTYPE)
+    samples['count'] = counts
+    samples['bin'] = bins
+    samples['time'] = timestamp
+    return samples
+
+
+class SampleQueue:
+    """Single producer / single consumer queue of timestamped count samples.
+
+    Every `put` stamps its batch with the host time and the device bin
+    indices, consecutive after the previous batch unless given, and appends
+    it as a whole to a `collections.deque`, whose appends and pops are
+    atomic, so neither side takes a lock. The consumer splits batches as
+    needed. The event only serves to wake up a waiting consumer. Batches that
+    would exceed `maxlen` pending samples are dropped and accounted for in
+    `dropped`; the gap shows in the bin indices. A `sink`, e.g. a recorder,
+    is handed every batch in the producer thread before that check, so it
+    sees all samples however late the consumer is.
+    """
+
+    def __init__(self, maxlen=100000):
+        self.maxlen = maxlen
+        self._chunks = deque()
+        self._head = None
+        self._put = 0
+        self._taken = 0
+        self._new_data = threading.Event()
+        self.dropped = 0
+        self.next_bin = 0
+        self.sink = None
+
+    def __len__(self):
+        return self._put - self._taken
+
+    def clear(self):
+        self._chunks.clear()
+        self._head = None
+        self._taken = self._put
+        self.dropped = 0
+        self.next_bin = 0
+
+    def put(self, counts, bins=None):
+        timestamp = time.perf_counter()
+        n = len(counts)
+        if bins is None:
+            bins = self.next_bin + np.arange(n)
+        if n == 0:
+            return
+        self.next_bin = int(bins[-1]) + 1
+        samples = make_samples(counts, bins, timestamp)
+        sink = self.sink
+        if sink is not None:
+            sink(samples)
+        if len(self) + n > self.maxlen:
+            self.dropped += n
+            return
+        self._chunks.append(samples)
+        self._put += n
+        self._new_data.set()
+
+    def get_samples(self, n=None, timeout=None):
+        """Return up to `n` samples (all pending if None) as a SAMPLE_DTYPE
+        array.
+
+        Waits up to `timeout` seconds for the first sample if the queue is
+        empty, returns an empty array if nothing arrived.
+        """
+        if len(self) == 0:
+            self._new_data.clear()
+            if len(self) == 0:
+                self._new_data.wait(timeout)
+        available = len(self)
+        count = available if n is None else min(n, available)
+        parts = []
+        needed = count
+        while needed > 0:
+            if self._head is None:
+                self._head = self._chunks.popleft()
+            part = self._head[:needed]
+            parts.append(part)
+            needed -= len(part)
+            self._head = self._head[len(part):] \
+                if len(part) < len(self._head) else None
+        self._taken += count
+        if not parts:
+            return np.zeros(0, dtype=SAMPLE_DTYPE)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def get(self, n=None, timeout=None):
+        """Like `get_samples`, but return the counts only."""
+        return self.get_samples(n, timeout)['count']
+
+
+class StreamReader(threading.Thread):
+    """Thread feeding a SampleQueue from a blocking `read` callable.
+
+    `read` must return a (possibly empty) sequence of counts and their bin
+    indices, or None for consecutive bins, and return regularly, e.g. on the
+    serial port timeout, so that `stop` is honoured.
+    """
+
+    def __init__(self, read, queue: SampleQueue):
+        super().__init__(daemon=True)
+        self._read = read
+        self.queue = queue
+        self.error = None
+        self._running = threading.Event()
+        self._running.set()
+
+    def run(self):
+        try:
+            while self._running.is_set():
+                counts, bins = self._read()
+                if len(counts) > 0:
+                    self.queue.put(counts, bins)
+        except Exception as e:
+            self.error = e
+
+    def stop(self, timeout=2.):
+        self._running.clear()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
@@ -0,0 +1,92 @@
+"""Relation between the photoino bin clock and the host clock.
+
+The device counts in bins of `time_base` ms timed by its own oscillator, the
+host stamps the batches it receives with `time.perf_counter`. Fitting the
+host time against the bin index gives the actual bin duration as seen by the
+host, hence the clock drift and the true count rate, while gaps in the bin
+indices reveal lost bins.
+"""
+import numpy as np
+
+
+class ClockDrift:
+    """Online least squares fit of host time = offset + period * bin index.
+
+    Points are weighted with an exponential forgetting factor so that the
+    fit follows slow drifts over about `memory` points. The sums are kept
+    relative to the latest point to stay accurate over long runs. Batches
+    arrive some latency after their last bin, only the last bin of every
+    batch (distinct host time) is fitted; the latency ends up in the offset.
+    """
+
+    def __init__(self, nominal_period=1e-3, memory=1000):
+        self.nominal_period = nominal_period
+        self.forgetting = 1. - 1. / memory
+        self.reset()
+
+    def reset(self):
+        self.origin = None
+        # sum of weights, x, y, x**2 and x*y relative to the origin
+        self._sums = np.zeros(5)
+        self.points = 0
+
+    def update(self, bins, times):
+        """Add samples given by their bin indices and host receive times."""
+        bins = np.asarray(bins)
+        times = np.asarray(times)
+        if len(bins) == 0:
+            return
+        last = np.append(times[1:] != times[:-1], True)
+        bins, times = bins[last], times[last]
+        if self.origin is None:
+            self.origin = (int(bins[0]), float(times[0]))
+        self._shift(int(bins[-1]), float(times[-1]))
+
+        x = (bins - self.origin[0]).astype(float)
+        y = times - self.origin[1]
+        weights = self.forgetting ** np.arange(len(x) - 1, -1, -1)
+        self._sums *= self.forgetting ** len(x)
+        self._sums += [weights.sum(), weights @ x, weights @ y,
+                       weights @ (x * x), weights @ (x * y)]
+        self.points += len(x)
+
+    def _shift(self, bin_index, time):
+        s, sx, sy, sxx, sxy = self._sums
+        dx = bin_index - self.origin[0]
+        dy = time - self.origin[1]
+        sxx += dx * (dx * s - 2 * sx)
+        sxy += dx * dy * s - dx * sy - dy * sx
+        sx -= dx * s
+        sy -= dy * s
+        self._sums[:] = s, sx, sy, sxx, sxy
+        self.origin = (bin_index, time)
+
+    @property
+    def period(self):
+        """Bin duration (s) on the host clock, nominal until two batches
+        were fitted."""
+        s, sx, _, sxx, _ = self._sums
+        denominator = s * sxx - sx * sx
+        if self.points < 2 or denominator <= 0:
+            return self.nominal_period
+        _, _, sy, _, sxy = self._sums
+        return (s * sxy - sx * sy) / denominator
+
+    @property
+    def drift(self):
+        """Relative rate of the device clock against the host clock."""
+        return self.period / self.nominal_period - 1.
+
+    def host_time(self, bins):
+        """Host time (s) at the end of the given bins, latency included."""
+        if self.origin is None:
+            raise ValueError("no timing data fitted yet")
+        s, sx, sy, _, _ = self._sums
+        period = self.period
+        offset = (sy - period * sx) / s
+        return self.origin[1] + offset \
+            + period * (np.asarray(bins) - self.origin[0])
+
+    def device_time(self, bins):
+        """Device time (s) at the end of the given bins."""
+        return (np.asarray(bins) + 1) * self.nominal_period
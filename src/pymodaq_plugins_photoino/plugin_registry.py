@@ -0,0 +1,82 @@
+"""Lazy discovery of the instrument plugins of a plugins subpackage.
+
+The plugin modules of a subpackage are listed from its directory without
+importing them; a module is imported the first time it is accessed as an
+attribute of the subpackage, which is how PyMoDAQ gets hold of a plugin
+before instantiating it. A failed import is logged once and remembered, so
+later accesses fail fast with the same cause instead of importing again.
+"""
+import ast
+import importlib
+import pkgutil
+import re
+
+from pymodaq.utils.logger import set_logger
+
+logger = set_logger('photoino_plugins', add_to_console=False)
+
+PLUGIN_MODULE = re.compile(r'^daq_(move|[0-9N]Dviewer)_(\w+)$')
+
+
+class PluginRegistry:
+    """Plugin modules of the subpackage `package` found in `directory`."""
+
+    def __init__(self, package, directory):
+        self.package = package
+        self.directory = directory
+        self.failures = {}
+        self._names = None
+
+    def names(self):
+        """Names of the modules of the subpackage, without importing them."""
+        if self._names is None:
+            self._names = [module.name for module in
+                           pkgutil.iter_modules([str(self.directory)])]
+        return self._names
+
+    def info(self, name):
+        """Plugin type, name, class and docstring of the module `name`, read
+        from its source without importing it."""
+        match = PLUGIN_MODULE.match(name)
+        if match is None:
+            raise ValueError("'%s' is no plugin module" % name)
+        plugin_type, plugin_name = match.groups()
+        class_name = 'DAQ_Move_%s' % plugin_name if plugin_type == 'move' \
+            else 'DAQ_%sViewer_%s' % (plugin_type[:2], plugin_name)
+        doc = None
+        source = (self.directory / (name + '.py')).read_text()
+        for node in ast.parse(source).body:
+            if isinstance(node, ast.ClassDef) and node.name == class_name:
+                doc = ast.get_docstring(node)
+        return {'type': 'daq_%s' % plugin_type, 'name': plugin_name,
+                'module': name, 'class': class_name, 'doc': doc}
+
+    def plugins(self):
+        return [self.info(name) for name in self.names()
+                if PLUGIN_MODULE.match(name)]
+
+    def load(self, name):
+        """Import the module `name` of the subpackage, raising ImportError
+        with the cause of an earlier failure without trying again."""
+        if name in self.failures:
+            raise ImportError("%s plugin couldn't be loaded: %s"
+                              % (name, self.failures[name])) \
+                from self.failures[name]
+        try:
+            return importlib.import_module('.' + name, self.package)
+        except Exception as e:
+            logger.warning("{:} plugin couldn't be loaded due to some missing "
+                           "packages or errors: {:}".format(name, str(e)))
+            self.failures[name] = e
+            raise ImportError("%s plugin couldn't be loaded: %s"
+                              % (name, e)) from e
+
+    def module_getattr(self, name):
+        """Module level `__getattr__` of the subpackage."""
+        if name in self.names():
+            return self.load(name)
+        raise AttributeError("module '%s' has no attribute '%s'"
+                             % (self.package, name))
+
+    def module_dir(self, namespace):
+        return sorted(set(namespace) | set(self.names()))
@@ -0,0 +1,62 @@
+"""Adaptive gating for a constant relative precision of the counts.
+
+The relative uncertainty of N Poisson counts is 1/sqrt(N), so a target
+uncertainty u needs u**-2 counts: the integration time follows from the
+count rate measured on the previous sample.
+"""
+import math
+
+
+class AdaptiveGate:
+    """Time base and number of summed bins reaching a `target` relative
+    uncertainty in the shortest integration time.
+
+    After each sample, `update` returns the time base (ms) and the number
+    of bins for the next one. The time base follows the wanted integration
+    time within [min_time_base, max_time_base]; beyond, the integration is
+    split evenly over as few bins as possible. The integration time changes
+    by at most a factor `max_step` per sample, so a transient or an empty
+    sample does not swing the setting.
+    """
+
+    def __init__(self, target=0.01, min_time_base=0.1, max_time_base=1000.,
+                 max_step=2.):
+        self.target = target
+        self.min_time_base = min_time_base
+        self.max_time_base = max_time_base
+        self.max_step = max_step
+        self.bins = 1
+
+    def reset(self):
+        self.bins = 1
+
+    @staticmethod
+    def uncertainty(total):
+        return 1. / math.sqrt(total) if total > 0 else math.inf
+
+    def integration_time(self, total, integration):
+        """Integration time (ms) wanted after `total` counts in
+        `integration` ms, within `max_step` of `integration`."""
+        if total > 0:
+            wanted = integration / (total * self.target ** 2)
+        else:
+            wanted = math.inf
+        return min(max(wanted, integration / self.max_step),
+                   integration * self.max_step)
+
+    def update(self, total, bins, time_base, fixed_time_base=False):
+        """Return the time base (ms) and number of bins of the next sample
+        after `total` counts in `bins` bins of `time_base` ms.
+
+        With `fixed_time_base`, e.g. while streaming, only the number of
+        bins adapts.
+        """
+        wanted = self.integration_time(total, bins * time_base)
+        # the tolerance keeps exact multiples from taking one more bin
+        if fixed_time_base:
+            self.bins = max(1, math.ceil(wanted / time_base - 1e-9))
+        else:
+            self.bins = max(1, math.ceil(wanted / self.max_time_base - 1e-9))
+            time_base = min(max(wanted / self.bins, self.min_time_base),
+                            self.max_time_base)
+        return time_base, self.bins
@@ -0,0 +1,128 @@
+"""Coincidence counting between the event streams of several counters.
+
+Events of every channel are merged in time order, and the events of each
+channel following every event within the coincidence window are counted
+with `np.searchsorted` over the merged times and per channel cumulative
+counts, so the cost grows linearly with the number of events.
+
+The photoino reports counts per time bin, not photon arrival times:
+`events_from_bins` places every count of a bin at the time of the bin, so
+the time resolution is the bin duration and windows shorter than a bin
+only pair counts of simultaneous bins.
+"""
+import itertools
+
+import numpy as np
+
+
+def events_from_bins(times, counts):
+    """Event times of binned counts, every count at the time of its bin."""
+    return np.repeat(np.asarray(times, dtype=float), np.asarray(counts))
+
+
+def merge_events(times):
+    """Merge the sorted event times of several channels.
+
+    Returns the merged times and the channel of every event. The stable
+    sort finds the sorted runs of the channels and merges them.
+    """
+    merged = np.concatenate([np.asarray(t, dtype=float) for t in times])
+    channels = np.repeat(np.arange(len(times)), [len(t) for t in times])
+    order = np.argsort(merged, kind='stable')
+    return merged[order], channels[order]
+
+
+def pair_counts(times, channels, n_channels, window, primaries=None):
+    """Matrix of the pairs of events closer than `window` (s), element
+    (i, j) counting the events of channel j at most `window` after an
+    event of channel i, among the first `primaries` merged events.
+
+    Every pair is counted once, from its earlier event (in merge order for
+    equal times); pairs within a channel are on the diagonal.
+    """
+    if primaries is None:
+        primaries = len(times)
+    first = np.arange(primaries)
+    ends = np.searchsorted(times, times[:primaries] + window, side='right')
+    # cumulative[j, k]: events of channel j among the first k merged events
+    cumulative = np.zeros((n_channels, len(times) + 1), dtype=np.int64)
+    cumulative[channels, np.arange(1, len(times) + 1)] = 1
+    np.cumsum(cumulative, axis=1, out=cumulative)
+    following = cumulative[:, ends] - cumulative[:, first + 1]
+    pairs = np.zeros((n_channels, n_channels), dtype=np.int64)
+    for i in range(n_channels):
+        pairs[i] = following[:, channels[:primaries] == i].sum(axis=1)
+    return pairs
+
+
+class CoincidenceCounter:
+    """Singles, coincidences and accidental coincidences of several event
+    streams fed in batches.
+
+    `update(events, until)` takes the new sorted event times of every
+    channel and the time up to which each channel is complete. Streams
+    arrive with different delays, so only the events before the common
+    horizon, the earliest `until` less one window, are counted; the others
+    wait for the next update, so that no pair is split across updates.
+    Accidentals are the coincidences expected between independent Poisson
+    streams, singles_i singles_j 2 window / duration.
+    """
+
+    def __init__(self, n_channels, window):
+        self.n_channels = n_channels
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self._pending = [np.zeros(0) for _ in range(self.n_channels)]
+        self._horizon = None
+        self.duration = 0.
+        self.singles = np.zeros(self.n_channels, dtype=np.int64)
+        self.coincidences = np.zeros((self.n_channels, self.n_channels),
+                                     dtype=np.int64)
+
+    @property
+    def pairs(self):
+        return list(itertools.combinations(range(self.n_channels), 2))
+
+    def accidentals(self, singles=None, duration=None):
+        """Expected accidental coincidences per pair of channels, of the
+        totals by default."""
+        singles = self.singles if singles is None else singles
+        duration = self.duration if duration is None else duration
+        if duration <= 0:
+            return np.zeros(len(self.pairs))
+        return np.array([singles[i] * singles[j] * 2 * self.window / duration
+                         for i, j in self.pairs])
+
+    def update(self, events, until):
+        """Count the events before the new horizon and return the singles,
+        coincidences per pair and duration (s) of this update."""
+        self._pending = [np.concatenate((pending, np.asarray(new, float)))
+                         for pending, new in zip(self._pending, events)]
+        horizon = min(until) - self.window
+        if self._horizon is None:
+            self._horizon = min(
+                [pending[0] for pending in self._pending if len(pending)]
+                + [horizon])
+        duration = max(horizon - self._horizon, 0.)
+        singles = np.zeros(self.n_channels, dtype=np.int64)
+        coincidences = np.zeros(len(self.pairs), dtype=np.int64)
+        if duration > 0:
+            times, channels = merge_events(self._pending)
+            primaries = np.searchsorted(times, horizon, side='left')
+            pairs = pair_counts(times, channels, self.n_channels,
+                                self.window, primaries)
+            pairs = pairs + pairs.T
+            singles = np.bincount(channels[:primaries],
+                                  minlength=self.n_channels)
+            coincidences = np.array([pairs[i, j] for i, j in self.pairs],
+                                    dtype=np.int64)
+            self._pending = [pending[np.searchsorted(pending, horizon):]
+                             for pending in self._pending]
+            self._horizon = horizon
+            self.duration += duration
+            self.singles += singles
+            for (i, j), n in zip(self.pairs, coincidences):
+                self.coincidences[i, j] += n
+        return singles, coincidences, duration
@@ -0,0 +1,133 @@
+"""Decimation of raw time bins before they are emitted to the GUI.
+
+Emitting every bin costs a Qt signal and a few allocations per bin, more
+than the acquisition itself at fast time bases. Bins are instead reduced by
+blocks to their sum, minimum and maximum, from which the sum, mean and
+min/max envelope are emitted at a bounded rate.
+"""
+import numpy as np
+
+
+DECIMATION_MODES = ('off', 'sum', 'mean', 'envelope')
+
+
+class Decimator:
+    """Reduce consecutive bins by blocks of `factor` bins.
+
+    The running sum, minimum and maximum of the current block are updated
+    in place; completed blocks are stored in preallocated arrays (grown by
+    doubling if needed, never overwritten) and read back in order with
+    `pop`. A partial block carries over to the next `add`, and changing
+    `factor` closes it as a shorter block, so every bin ends up in exactly
+    one block.
+    """
+
+    def __init__(self, factor=1, capacity=64):
+        self._factor = factor
+        self._sums = np.zeros(capacity)
+        self._mins = np.zeros(capacity)
+        self._maxs = np.zeros(capacity)
+        self._bins = np.zeros(capacity, dtype=np.int64)
+        self._head = 0
+        self._tail = 0
+        self._clear_partial()
+
+    def __len__(self):
+        """Number of completed blocks not popped yet."""
+        return self._tail - self._head
+
+    @property
+    def factor(self):
+        return self._factor
+
+    @factor.setter
+    def factor(self, value):
+        if value == self._factor:
+            return
+        self.flush()
+        self._factor = value
+
+    @property
+    def missing(self):
+        """Number of bins completing the current block."""
+        return self._factor - self._partial
+
+    def _clear_partial(self):
+        self._partial = 0
+        self._sum = 0.
+        self._min = np.inf
+        self._max = -np.inf
+
+    def reset(self):
+        """Drop the pending blocks and the partial block."""
+        self._head = self._tail = 0
+        self._clear_partial()
+
+    def flush(self):
+        """Close the partial block, if any, as a shorter block."""
+        if self._partial > 0:
+            self._push([self._sum], [self._min], [self._max],
+                       [self._partial])
+            self._clear_partial()
+
+    def _push(self, sums, mins, maxs, bins):
+        n = len(sums)
+        if self._tail + n > len(self._sums):
+            pending = slice(self._head, self._tail)
+            size = max(len(self._sums), 2 * (len(self) + n))
+            for name in ('_sums', '_mins', '_maxs', '_bins'):
+                old = getattr(self, name)
+                new = np.zeros(size, dtype=old.dtype) \
+                    if size > len(old) else old
+                new[:len(self)] = old[pending]
+                setattr(self, name, new)
+            self._head, self._tail = 0, len(self)
+        block = slice(self._tail, self._tail + n)
+        self._sums[block] = sums
+        self._mins[block] = mins
+        self._maxs[block] = maxs
+        self._bins[block] = bins
+        self._tail += n
+
+    def add(self, counts):
+        """Accumulate `counts`, consecutive bins, and return the number of
+        completed blocks."""
+        counts = np.asarray(counts)
+        start = 0
+        if self._partial > 0 or len(counts) < self._factor:
+            head = counts[:self.missing]
+            if len(head) > 0:
+                self._sum += head.sum()
+                self._min = min(self._min, head.min())
+                self._max = max(self._max, head.max())
+                self._partial += len(head)
+            start = len(head)
+            if self._partial == self._factor:
+                self.flush()
+        full = (len(counts) - start) // self._factor
+        if full > 0:
+            blocks = counts[start:start + full * self._factor]\
+                .reshape(full, self._factor)
+            self._push(blocks.sum(axis=1), blocks.min(axis=1),
+                       blocks.max(axis=1), np.full(full, self._factor))
+            start += full * self._factor
+        rest = counts[start:]
+        if len(rest) > 0:
+            self._sum = rest.sum()
+            self._min = rest.min()
+            self._max = rest.max()
+            self._partial = len(rest)
+        return len(self)
+
+    def pop(self):
+        """Return the sum, minimum, maximum and number of bins of the oldest
+        completed block."""
+        if len(self) == 0:
+            raise IndexError("no completed block")
+        i = self._head
+        block = (self._sums[i], self._mins[i], self._maxs[i],
+                 int(self._bins[i]))
+        self._head += 1
+        if self._head == self._tail:
+            self._head = self._tail = 0
+        return block
@@ -0,0 +1,70 @@
+"""Photon number distribution accumulated over batches of time bins."""
+import numpy as np
+
+
+class CountHistogram:
+    """Histogram of the counts per time bin, updated batch by batch.
+
+    Each batch is binned with `np.bincount` and added to the running
+    histogram, which grows to the largest count seen. The moments used for
+    photon statistics (Fano factor, g2(0)) follow from the histogram alone.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.histogram = np.zeros(0, dtype=np.int64)
+
+    def add(self, counts):
+        if len(counts) == 0:
+            return
+        batch = np.bincount(np.asarray(counts, dtype=np.int64).ravel())
+        if len(batch) > len(self.histogram):
+            grown = np.zeros(max(len(batch), 2 * len(self.histogram)),
+                             dtype=np.int64)
+            grown[:len(self.histogram)] = self.histogram
+            self.histogram = grown
+        self.histogram[:len(batch)] += batch
+
+    @property
+    def bins(self):
+        """Number of time bins accumulated."""
+        return int(self.histogram.sum())
+
+    def _moment(self, order):
+        n = np.arange(len(self.histogram), dtype=float)
+        return (self.histogram @ n ** order) / self.bins
+
+    @property
+    def mean(self):
+        return self._moment(1) if self.bins else np.nan
+
+    @property
+    def variance(self):
+        return self._moment(2) - self.mean ** 2 if self.bins else np.nan
+
+    @property
+    def fano(self):
+        """Variance over mean, 1 for Poisson light."""
+        return self.variance / self.mean if self.bins else np.nan
+
+    @property
+    def g2(self):
+        """Second order coherence at zero delay, <n(n-1)> / <n>**2."""
+        if not self.bins:
+            return np.nan
+        return (self._moment(2) - self.mean) / self.mean ** 2
+
+    def decimated(self, points):
+        """Histogram up to the largest count seen, summed over groups of
+        adjacent photon numbers to at most `points` values.
+
+        Returns the values and the group width.
+        """
+        seen = np.flatnonzero(self.histogram)
+        length = seen[-1] + 1 if len(seen) else 1
+        width = -(-length // points)
+        values = np.zeros(-(-length // width) * width, dtype=np.int64)
+        values[:length] = self.histogram[:length]
+        return values.reshape(-1, width).sum(axis=1), width
@@ -0,0 +1,167 @@
+"""Recording of raw streamed bins to disk, bypassing the GUI.
+
+Recorders are fed batches of SAMPLE_DTYPE samples from the stream reader
+thread and write them as they come, so memory use does not grow with the
+length of the run. Both formats can be read back with NumPy or PyTables,
+or by slices with Recording.
+"""
+import struct
+import threading
+
+import numpy as np
+import tables
+
+from pymodaq_plugins_photoino.hardware.stream import SAMPLE_DTYPE
+
+
+RECORDER_FORMATS = ('hdf5', 'npy')
+
+
+class HDF5Recorder:
+    """Append samples to a chunked, compressed table ('/samples').
+
+    The time base (ms) is stored as an attribute of the table.
+    """
+
+    def __init__(self, path, time_base=1., complevel=4,
+                 expected_bins=10 ** 7):
+        self.path = path
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._file = tables.open_file(path, mode='w')
+        filters = tables.Filters(complevel=complevel, complib='blosc:lz4',
+                                 shuffle=True)
+        self._table = self._file.create_table(
+            '/', 'samples', description=SAMPLE_DTYPE, filters=filters,
+            expectedrows=expected_bins)
+        self._table.attrs.time_base = time_base
+
+    def write(self, samples):
+        with self._lock:
+            if self._file is None:
+                return
+            self._table.append(samples)
+            self.recorded += len(samples)
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._table.flush()
+            self._file.close()
+            self._file = None
+
+
+class NpyRecorder:
+    """Write samples into a memory mapped .npy file growing in steps.
+
+    The file is preallocated for `capacity` samples and extended by doubling
+    when full; its header always describes the allocated length, and is
+    rewritten on `close` with the recorded length before the file is
+    truncated, so the file loads with `np.load(path, mmap_mode='r')`.
+    The time base is not stored in the file.
+    """
+
+    header_size = 256
+
+    def __init__(self, path, time_base=1., capacity=10 ** 6):
+        self.path = path
+        self.time_base = time_base
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._file = open(path, 'w+b')
+        self._map = None
+        self._allocate(capacity)
+
+    def _header(self, length):
+        header = repr({'descr': np.lib.format.dtype_to_descr(SAMPLE_DTYPE),
+                       'fortran_order': False, 'shape': (length,)})
+        prefix = np.lib.format.MAGIC_PREFIX + bytes([1, 0])
+        size = self.header_size - len(prefix) - 2
+        header = header.ljust(size - 1) + '\n'
+        return prefix + struct.pack('<H', size) + header.encode('latin1')
+
+    def _allocate(self, capacity):
+        if self._map is not None:
+            self._map.flush()
+        self._file.seek(0)
+        self._file.write(self._header(capacity))
+        self._file.truncate(self.header_size
+                            + capacity * SAMPLE_DTYPE.itemsize)
+        self._map = np.memmap(self._file, dtype=SAMPLE_DTYPE, mode='r+',
+                              offset=self.header_size, shape=(capacity,))
+
+    def write(self, samples):
+        with self._lock:
+            if self._file is None:
+                return
+            end = self.recorded + len(samples)
+            if end > len(self._map):
+                self._allocate(max(2 * len(self._map), end))
+            self._map[self.recorded:end] = samples
+            self.recorded = end
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._map.flush()
+            self._map = None
+            self._file.seek(0)
+            self._file.write(self._header(self.recorded))
+            self._file.truncate(self.header_size
+                                + self.recorded * SAMPLE_DTYPE.itemsize)
+            self._file.close()
+            self._file = None
+
+
+def open_recorder(path, file_format='hdf5', time_base=1., complevel=4):
+    """Return a recorder writing to `path` in one of RECORDER_FORMATS."""
+    if file_format == 'hdf5':
+        return HDF5Recorder(path, time_base=time_base, complevel=complevel)
+    elif file_format == 'npy':
+        return NpyRecorder(path, time_base=time_base)
+    raise ValueError("unknown recording format '%s'" % file_format)
+
+
+class Recording:
+    """Read a recording back by slices, without loading it.
+
+    .npy files, recorded samples or a plain array of counts, are memory
+    mapped; HDF5 tables are read by slices with PyTables. Bins are numbered
+    consecutively when the file has no bin indices, and `time_base` (ms)
+    is None when it is not stored.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.time_base = None
+        self._file = None
+        if str(path).endswith('.npy'):
+            self._data = np.load(path, mmap_mode='r')
+        else:
+            self._file = tables.open_file(path, mode='r')
+            self._data = self._file.root.samples
+            self.time_base = float(self._data.attrs.time_base)
+        if len(self) == 0:
+            self.close()
+            raise ValueError("empty recording '%s'" % path)
+        self._fields = self._data.dtype.names or ()
+
+    def __len__(self):
+        return len(self._data)
+
+    def read(self, start, stop):
+        """Counts and bin indices of the samples `start` to `stop`."""
+        data = self._data.read(start, stop) if self._file is not None \
+            else self._data[start:stop]
+        if 'count' not in self._fields:
+            return np.array(data, dtype=np.int64), np.arange(start, stop)
+        bins = np.array(data['bin'], dtype=np.int64) if 'bin' in self._fields \
+            else np.arange(start, stop)
+        return np.array(data['count'], dtype=np.int64), bins
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,58 @@
+"""Fixed size buffer of the latest count bins."""
+import numpy as np
+
+
+class RingBuffer:
+    """Keep the last `size` samples in preallocated memory.
+
+    Every sample is written twice, at its position and `size` further, so
+    the samples in chronological order always form a contiguous slice:
+    `view` returns it without copying and `extend` never allocates.
+    """
+
+    def __init__(self, size, dtype=np.int64):
+        self._data = np.zeros(2 * size, dtype=dtype)
+        self.size = size
+        self.clear()
+
+    def clear(self):
+        self._end = 0
+        self.filled = 0
+        self.total = 0
+
+    def __len__(self):
+        return self.filled
+
+    def resize(self, size):
+        """Change the capacity, keeping the latest samples."""
+        if size == self.size:
+            return
+        latest = self.view()[-size:].copy()
+        self._data = np.zeros(2 * size, dtype=self._data.dtype)
+        self.size = size
+        total = self.total
+        self.clear()
+        self.extend(latest)
+        self.total = total
+
+    def extend(self, values):
+        n = len(values)
+        self.total += n
+        if n >= self.size:
+            values = values[n - self.size:]
+            n = self.size
+        start = self._end
+        first = min(n, self.size - start)
+        for offset in (0, self.size):
+            self._data[offset + start:offset + start + first] = values[:first]
+            self._data[offset:offset + n - first] = values[first:]
+        self._end = (start + n) % self.size
+        self.filled = min(self.filled + n, self.size)
+
+    def view(self):
+        """The buffered samples, oldest first, as a read-only view that the
+        next `extend` overwrites."""
+        start = self._end + self.size - self.filled
+        view = self._data[start:self._end + self.size]
+        view.flags.writeable = False
+        return view
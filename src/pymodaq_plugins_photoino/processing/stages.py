@@ -0,0 +1,442 @@
+"""Optional processing stages of the photoino viewers.
+
+A viewer holds a list of stages, each owning its settings (`params`) and
+its state. For every grab the viewer asks the stages in turn how many bins
+to read (`bins`), feeds them the counts read (`update`) and emits the data
+they return (`process`) next to the counts. Groups named COUNTS add
+channels to the counts group, replacing a channel of the same label (see
+`merge_groups`): decimation replaces 'Counts' with its block, statistics
+add their channels next to it.
+"""
+import time
+
+import numpy as np
+from pymodaq.utils.daq_utils import ThreadCommand
+from pymodaq.utils.data import DataFromPlugins
+
+from pymodaq_plugins_photoino.hardware.timing import ClockDrift
+from pymodaq_plugins_photoino.processing.adaptive import AdaptiveGate
+from pymodaq_plugins_photoino.processing.decimation import \
+    DECIMATION_MODES, Decimator
+from pymodaq_plugins_photoino.processing.recorder import RECORDER_FORMATS, \
+    open_recorder
+from pymodaq_plugins_photoino.processing.statistics import AllanDeviation, \
+    RunningStats
+
+COUNTS = 'Photon counter'
+
+
+def merge_groups(groups):
+    """Merge the DataFromPlugins of the same name, in order: the channels of
+    a later group replace those of the same label and add the others."""
+    merged = {}
+    for group in groups:
+        if group.name not in merged:
+            merged[group.name] = [group]
+        else:
+            merged[group.name].append(group)
+    result = []
+    for name, same in merged.items():
+        if len(same) == 1:
+            result.append(same[0])
+            continue
+        channels = {}
+        for group in same:
+            channels.update(zip(group.labels, group.data))
+        result.append(DataFromPlugins(name=name, data=list(channels.values()),
+                                      dim=same[0].dim, labels=list(channels)))
+    return result
+
+
+class Stage:
+    """Processing stage of `viewer`, every hook does nothing by default.
+
+    `params` is the setting (usually a group) of the stage added to the
+    viewer settings. With `needs_samples` the viewer streams SAMPLE_DTYPE
+    samples instead of counts and passes them to `update`; with `reads_all`
+    every grab also takes all the bins streamed since the previous one.
+    """
+
+    params = None
+    needs_samples = False
+    reads_all = False
+
+    def __init__(self, viewer):
+        self.viewer = viewer
+
+    @property
+    def settings(self):
+        return self.viewer.settings
+
+    def reset(self):
+        """Start over from the settings, e.g. once the detector is open."""
+
+    def restart(self):
+        """The next bins do not follow the previous ones: the time base
+        changed or the stream restarted."""
+
+    def commit_settings(self, param):
+        """Apply the change of a viewer setting, seen by every stage."""
+
+    def bins(self, n):
+        """Number of bins of the next grab given the `n` wanted so far, 0 to
+        emit without reading."""
+        return n
+
+    def update(self, counts, samples=None):
+        """Take the `counts` of a grab, with their streamed `samples` if
+        `needs_samples`."""
+
+    def process(self, counts):
+        """DataFromPlugins to emit with the `counts` of a grab, empty for
+        a grab that read nothing and NaN for a gap."""
+        return []
+
+    def stop(self):
+        """The acquisition stops or the viewer closes."""
+
+
+class AdaptiveGatingStage(Stage):
+    """Adapt the time base and the number of summed bins to the count rate
+    for a target relative uncertainty (AdaptiveGate), reporting the rate,
+    integration time and uncertainty of every grab. While streaming the
+    time base is kept, the bins still queued were counted with it."""
+
+    params = {
+        'title': 'Adaptive gating:', 'name': 'adaptive', 'type': 'group',
+        'children': [
+            {'title': 'Enabled:', 'name': 'adaptive_enabled', 'type': 'bool',
+             'value': False, 'tip': 'adapt the time base and the number of '
+                                    'summed bins to the count rate'},
+            {'title': 'Target uncertainty:', 'name': 'target_uncertainty',
+             'type': 'float', 'value': 0.01, 'min': 1e-4, 'max': 1.,
+             'tip': 'relative, 1/sqrt(counts) for Poisson counts'},
+            {'title': 'Max time base (ms):', 'name': 'max_time_base',
+             'type': 'float', 'value': 1000., 'min': 0.1, 'max': 1e5},
+            {'title': 'Max change per sample:', 'name': 'max_step',
+             'type': 'float', 'value': 2., 'min': 1.01},
+        ]}
+
+    def __init__(self, viewer):
+        Stage.__init__(self, viewer)
+        self.gate = AdaptiveGate()
+        self._gated = None
+
+    @property
+    def enabled(self):
+        return self.settings['adaptive', 'adaptive_enabled']
+
+    def reset(self):
+        self.gate.target = self.settings['adaptive', 'target_uncertainty']
+        self.gate.max_time_base = self.settings['adaptive', 'max_time_base']
+        self.gate.max_step = self.settings['adaptive', 'max_step']
+        self.gate.reset()
+        self._gated = None
+
+    def commit_settings(self, param):
+        if param.name() in ("adaptive_enabled", "target_uncertainty",
+                            "max_time_base", "max_step"):
+            self.reset()
+
+    def bins(self, n):
+        return self.gate.bins if self.enabled else n
+
+    def update(self, counts, samples=None):
+        if not self.enabled:
+            return
+        time_base = self.settings['time_base']
+        integration = counts.shape[-1] * time_base
+        total = counts.sum()
+        self._gated = DataFromPlugins(
+            name='Adaptive gating',
+            data=[np.array([1e3 * total / integration]),
+                  np.array([integration]),
+                  np.array([self.gate.uncertainty(total)])],
+            dim='Data0D', labels=['Rate (Hz)', 'Integration time (ms)',
+                                  'Relative uncertainty'])
+        streaming = 'streaming' in self.settings.names \
+            and self.settings['streaming']
+        new_time_base, _ = self.gate.update(total, counts.shape[-1],
+                                            time_base,
+                                            fixed_time_base=streaming)
+        if new_time_base != time_base:
+            self.settings.child('time_base').setValue(new_time_base)
+            self.viewer.set_time_base(new_time_base)
+
+    def process(self, counts):
+        gated, self._gated = self._gated, None
+        return [] if gated is None else [gated]
+
+
+class DecimationStage(Stage):
+    """Emit blocks of bins reduced to their sum, mean or min/max envelope
+    (Decimator) at most `max_emit_rate` times per second, in place of the
+    counts of every grab. Every bin ends up in one block."""
+
+    params = {
+        'title': 'Decimation:', 'name': 'decimation', 'type': 'group',
+        'children': [
+            {'title': 'Mode:', 'name': 'decimation_mode', 'type': 'list',
+             'limits': list(DECIMATION_MODES), 'value': 'off',
+             'tip': 'emit blocks of bins reduced to their sum, mean or '
+                    'min/max envelope'},
+            {'title': 'Max emission rate (Hz):', 'name': 'max_emit_rate',
+             'type': 'float', 'value': 20., 'min': 0.1},
+        ]}
+
+    def __init__(self, viewer):
+        Stage.__init__(self, viewer)
+        self.decimator = Decimator()
+
+    @property
+    def mode(self):
+        return self.settings['decimation', 'decimation_mode']
+
+    def reset(self):
+        self.decimator.reset()
+
+    def restart(self):
+        self.decimator.flush()
+
+    def factor(self, n):
+        """Bins per emitted block: at least `n`, and enough to keep the
+        emissions under the maximum rate."""
+        bins_per_emission = 1e3 / (self.settings['decimation',
+                                                 'max_emit_rate']
+                                   * self.settings['time_base'])
+        return max(n, int(np.ceil(bins_per_emission - 1e-9)))
+
+    def bins(self, n):
+        if self.mode == 'off':
+            return n
+        self.decimator.factor = self.factor(n)
+        if len(self.decimator) > 0:
+            # blocks completed by an earlier, larger read go first
+            return 0
+        return self.decimator.missing
+
+    def update(self, counts, samples=None):
+        if self.mode != 'off':
+            self.decimator.add(counts)
+
+    def process(self, counts):
+        """Channels of the oldest completed block, NaN if there is none."""
+        mode = self.mode
+        if mode == 'off':
+            return []
+        if len(self.decimator) > 0:
+            total, low, high, bins = self.decimator.pop()
+        else:
+            total = low = high = np.nan
+            bins = 0
+        value = total if mode == 'sum' or bins == 0 else total / bins
+        if mode == 'envelope':
+            data = [np.array([value]), np.array([low]), np.array([high]),
+                    np.array([bins])]
+            labels = ['Counts', 'Min', 'Max', 'Bins']
+        else:
+            data = [np.array([value]), np.array([bins])]
+            labels = ['Counts', 'Bins']
+        return [DataFromPlugins(name=COUNTS, data=data, dim='Data0D',
+                                labels=labels)]
+
+
+class StatisticsStage(Stage):
+    """Running mean, standard deviation, SNR and Allan deviations of every
+    grabbed bin, emitted as channels next to 'Counts'. The Allan deviation
+    assumes consecutive bins, i.e. streaming or averaging over many bins."""
+
+    params = {
+        'title': 'Statistics:', 'name': 'statistics', 'type': 'group',
+        'children': [
+            {'title': 'Enabled:', 'name': 'statistics_enabled',
+             'type': 'bool', 'value': False},
+            {'title': 'Allan taus (bins):', 'name': 'allan_taus',
+             'type': 'str', 'value': '1, 10, 100',
+             'tip': 'comma separated averaging lengths'},
+            {'title': 'Reset statistics:', 'name': 'reset_statistics',
+             'type': 'bool_push', 'value': False},
+        ]}
+
+    def __init__(self, viewer):
+        Stage.__init__(self, viewer)
+        self.running_stats = RunningStats()
+        self.allan = AllanDeviation([])
+
+    @property
+    def enabled(self):
+        return self.settings['statistics', 'statistics_enabled']
+
+    def reset(self):
+        taus = [int(tau) for tau in
+                self.settings['statistics', 'allan_taus'].split(',')
+                if tau.strip()]
+        self.running_stats.reset()
+        self.allan = AllanDeviation(taus)
+
+    def commit_settings(self, param):
+        if param.name() == "allan_taus":
+            self.reset()
+        elif param.name() == "reset_statistics":
+            if param.value():
+                self.reset()
+                param.setValue(False)
+
+    def update(self, counts, samples=None):
+        if self.enabled and np.isfinite(counts).all():
+            self.running_stats.update(counts)
+            self.allan.update(counts)
+
+    def process(self, counts):
+        if not self.enabled or not np.isfinite(counts).all():
+            return []
+        values = [self.running_stats.mean, self.running_stats.std,
+                  self.running_stats.snr] + list(self.allan.deviations)
+        labels = ['Mean', 'Std', 'SNR'] + \
+            ['ADEV %d bins' % tau for tau in self.allan.taus]
+        return [DataFromPlugins(name=COUNTS,
+                                data=[np.array([value]) for value in values],
+                                dim='Data0D', labels=labels)]
+
+
+class TimingStage(Stage):
+    """Hardware timestamps of the streamed bins.
+
+    The host clock is fitted against the device bin indices (ClockDrift)
+    and a 'Timing' group reports the rate over the actual bin duration, the
+    last bin index, its device and host (Unix epoch) times, the clock drift
+    and the bins lost so far.
+    """
+
+    params = {
+        'title': 'Hardware timestamps:', 'name': 'timestamps',
+        'type': 'bool', 'value': False,
+        'tip': 'bin indices, clock drift and lost bins while streaming'}
+
+    def __init__(self, viewer):
+        Stage.__init__(self, viewer)
+        self.clock = ClockDrift()
+        self.missing_bins = 0
+        self._last_bin = None
+        self._epoch_offset = 0.
+        self._samples = None
+
+    @property
+    def needs_samples(self):
+        return self.settings['timestamps']
+
+    def reset(self):
+        self.restart()
+
+    def restart(self):
+        self.clock.nominal_period = 1e-3 * self.settings['time_base']
+        self.clock.reset()
+        self.missing_bins = 0
+        self._last_bin = None
+        self._epoch_offset = time.time() - time.perf_counter()
+
+    def commit_settings(self, param):
+        if param.name() == "timestamps":
+            self.restart()
+
+    def update(self, counts, samples=None):
+        """Fit the clocks on the streamed `samples` and flag lost bins."""
+        if samples is None or len(samples) == 0:
+            return
+        self._samples = samples
+        bins = samples['bin']
+        previous = bins[0] - 1 if self._last_bin is None else self._last_bin
+        missing = int(bins[-1] - previous) - len(bins)
+        if missing > 0:
+            self.missing_bins += missing
+            self.viewer.emit_status(ThreadCommand('Update_Status', [
+                'photoino lost %d time bins' % missing]))
+        self._last_bin = int(bins[-1])
+        self.clock.update(bins, samples['time'])
+
+    def process(self, counts):
+        samples, self._samples = self._samples, None
+        if samples is None:
+            return []
+        last_bin = samples['bin'][-1]
+        data = [np.array([counts.mean() / self.clock.period]),
+                np.array([last_bin]),
+                np.array([self.clock.device_time(last_bin)]),
+                np.array([self.clock.host_time(last_bin)
+                          + self._epoch_offset]),
+                np.array([1e6 * self.clock.drift]),
+                np.array([self.missing_bins])]
+        return [DataFromPlugins(name='Timing', data=data, dim='Data0D',
+                                labels=['Rate (Hz)', 'Bin index',
+                                        'Device time (s)', 'Host time (s)',
+                                        'Drift (ppm)', 'Missing bins'])]
+
+
+class RecorderStage(Stage):
+    """Record every raw bin (count, bin index, host time) to an HDF5 or
+    memory mapped .npy file from the stream reader thread.
+
+    While it records, each grab averages all the bins received since the
+    previous one, so the GUI only gets decimated data however fast the
+    device counts.
+    """
+
+    params = {
+        'title': 'Recorder:', 'name': 'recorder', 'type': 'group',
+        'children': [
+            {'title': 'Record raw bins:', 'name': 'recording', 'type': 'bool',
+             'value': False},
+            {'title': 'File:', 'name': 'record_path', 'type': 'str',
+             'value': '', 'tip': 'timestamped file in the working directory '
+                                 'if empty'},
+            {'title': 'Format:', 'name': 'record_format', 'type': 'list',
+             'limits': list(RECORDER_FORMATS), 'value': 'hdf5'},
+            {'title': 'Compression level:', 'name': 'record_complevel',
+             'type': 'int', 'value': 4, 'min': 0, 'max': 9},
+        ]}
+
+    def __init__(self, viewer):
+        Stage.__init__(self, viewer)
+        self.recorder = None
+
+    @property
+    def reads_all(self):
+        return self.recorder is not None
+
+    def commit_settings(self, param):
+        if param.name() == "recording":
+            if param.value():
+                self.start()
+            else:
+                self.stop()
+        elif param.name() == "streaming" and not param.value():
+            self.stop()
+
+    def start(self):
+        file_format = self.settings['recorder', 'record_format']
+        path = self.settings['recorder', 'record_path']
+        if path == '':
+            path = time.strftime('photoino_%Y%m%d_%H%M%S') \
+                + ('.h5' if file_format == 'hdf5' else '.npy')
+        self.recorder = open_recorder(
+            path, file_format, time_base=self.settings['time_base'],
+            complevel=self.settings['recorder', 'record_complevel'])
+        self.viewer.controller.start_recording(self.recorder)
+        if 'streaming' in self.settings.names \
+                and not self.settings['streaming']:
+            self.settings.child('streaming').setValue(True)
+        if not self.viewer.controller.streaming:
+            self.viewer.start_stream()
+        self.viewer.emit_status(ThreadCommand('Update_Status', [
+            'recording photoino bins to %s' % path]))
+
+    def stop(self):
+        if self.recorder is None:
+            return
+        self.viewer.controller.stop_recording()
+        self.recorder.close()
+        self.viewer.emit_status(ThreadCommand('Update_Status', [
+            'recorded %d photoino bins to %s' % (self.recorder.recorded,
+                                                 self.recorder.path)]))
+        self.recorder = None
+        self.settings.child('recorder', 'recording').setValue(False)
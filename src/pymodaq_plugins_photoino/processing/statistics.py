@@ -0,0 +1,97 @@
+"""Streaming statistics of the counts per time bin.
+
+Both accumulators take batches of consecutive bins and keep a fixed amount
+of state, so they can run for hours on a stream without storing it.
+"""
+import numpy as np
+
+
+class RunningStats:
+    """Running mean and variance, merging each batch Welford style.
+
+    The batch mean and sum of squared deviations are combined with the
+    accumulated ones (Chan et al.), which is as stable as the one sample at a
+    time update but vectorised.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.
+        self._m2 = 0.
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        n = len(values)
+        if n == 0:
+            return
+        mean = values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    @property
+    def snr(self):
+        return self.mean / self.std
+
+
+class AllanDeviation:
+    """Overlapping Allan deviation of the counts for several averaging
+    lengths `taus` (in bins).
+
+    Each tau keeps the sum and number of its squared differences of
+    successive averages. The averages come from cumulative sums, of which
+    the last 2 * max(taus) are kept across batches (shared by all taus) so
+    that the overlapping differences straddling two batches are counted.
+    """
+
+    def __init__(self, taus):
+        self.taus = np.array(sorted(set(int(tau) for tau in taus if tau >= 1)),
+                             dtype=np.int64)
+        self._span = 2 * int(self.taus.max()) if len(self.taus) else 0
+        self.reset()
+
+    def reset(self):
+        self._cumulative = np.zeros(1)
+        self._sums = np.zeros(len(self.taus))
+        self._counts = np.zeros(len(self.taus), dtype=np.int64)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        if len(values) == 0 or len(self.taus) == 0:
+            return
+        known = len(self._cumulative)
+        cumulative = np.concatenate(
+            (self._cumulative, self._cumulative[-1] + np.cumsum(values)))
+        end = len(cumulative)
+        for k, tau in enumerate(self.taus):
+            start = max(known, 2 * tau)
+            if start >= end:
+                continue
+            differences = (cumulative[start:]
+                           - 2 * cumulative[start - tau:end - tau]
+                           + cumulative[start - 2 * tau:end - 2 * tau]) / tau
+            self._sums[k] += differences @ differences
+            self._counts[k] += len(differences)
+        # rebased to keep the sums small over long runs
+        kept = cumulative[-(self._span + 1):]
+        self._cumulative = kept - kept[0]
+
+    @property
+    def deviations(self):
+        """Allan deviation for each tau, NaN until enough bins were seen."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.sqrt(self._sums / (2 * self._counts))
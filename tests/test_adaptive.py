@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_simulate_photoino import DAQ_0DViewer_simulate_photoino
+from pymodaq_plugins_photoino.processing.adaptive import AdaptiveGate
+
+
+def run_gate(gate, rate, samples, fixed_time_base=False, time_base=1.):
+    """Feed `gate` Poisson counts at `rate` counts per ms, return the
+    successive integration times."""
+    rng = np.random.default_rng(0)
+    bins = 1
+    integrations = []
+    for _ in range(samples):
+        total = rng.poisson(rate * time_base, bins).sum()
+        integrations.append(bins * time_base)
+        time_base, bins = gate.update(total, bins, time_base,
+                                      fixed_time_base=fixed_time_base)
+    return integrations
+
+
+@pytest.mark.parametrize('rate', (0.5, 100., 1e4))
+def test_gate_reaches_target_uncertainty(rate):
+    gate = AdaptiveGate(target=0.01, max_time_base=100.)
+    integration = run_gate(gate, rate, 40)[-1]
+    assert integration >= 0.1
+    assert integration == pytest.approx(1e4 / rate, rel=0.1)
+
+
+def test_gate_change_is_capped():
+    gate = AdaptiveGate(target=0.01, max_step=2.)
+    integrations = np.array(run_gate(gate, 100., 10))
+    steps = integrations[1:] / integrations[:-1]
+    assert np.all(steps <= 2. + 1e-9) and np.all(steps >= 0.5 - 1e-9)
+    assert integrations[-1] > integrations[0]
+
+
+def test_gate_with_fixed_time_base_sums_bins():
+    gate = AdaptiveGate(target=0.1)
+    integrations = run_gate(gate, 1., 20, fixed_time_base=True,
+                            time_base=2.)
+    assert integrations[-1] == pytest.approx(100., rel=0.2)
+    assert gate.bins == pytest.approx(50, rel=0.2)
+
+
+def test_viewer_reports_integration_time():
+    plugin = DAQ_0DViewer_simulate_photoino(None, None)
+    plugin.settings.child('adaptive', 'adaptive_enabled').setValue(True)
+    plugin.ini_detector()
+    plugin.controller.realtime = False
+    emitted = []
+    plugin.data_grabed_signal.connect(emitted.append)
+    for _ in range(3):
+        plugin.grab_data()
+    plugin.close()
+    gated = emitted[-1][1]
+    assert gated.labels == ['Rate (Hz)', 'Integration time (ms)',
+                            'Relative uncertainty']
+    integrations = [data[1][1][0] for data in emitted]
+    assert integrations == [1., 2., 4.]
+    assert plugin.settings['time_base'] == 8.
@@ -0,0 +1,123 @@
+import asyncio
+import sys
+import time
+
+import pytest
+import serial
+
+from pymodaq_plugins_photoino.hardware.async_controller import \
+    AsyncPhotoinoController, SyncPhotoinoAdapter
+from pymodaq_plugins_photoino.hardware.fake_device import FakePhotoino
+from pymodaq_plugins_photoino.hardware.multiplexer import DeviceBusy
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32',
+                                reason='needs a pseudo terminal')
+
+
+@pytest.mark.parametrize('binary', (False, True))
+def test_adapter_round_trip(binary):
+    with FakePhotoino(seed=0) as device:
+        controller = SyncPhotoinoAdapter()
+        controller.open(device.port, 0, binary=binary)
+        assert controller.binary == binary
+        controller.time_base = 2.
+        controller.trigger_level = 1.
+        assert controller.time_base == 2
+        assert controller.trigger_level == 1
+        assert controller.count_rate > 0
+        assert len(controller.read_counts(20)) == 20
+        controller.start_stream()
+        time.sleep(0.1)
+        assert len(controller.read_stream(timeout=1.)) > 0
+        controller.stop_stream()
+        assert controller.missing_bins == 0
+        controller.close()
+
+
+def test_adapter_start_and_stop_report_write_errors():
+    with FakePhotoino() as device:
+        controller = SyncPhotoinoAdapter()
+        controller.open(device.port, 0)
+        controller.start()
+        controller.stop()
+        controller.controller.ser.close()
+        with pytest.raises(serial.SerialException):
+            controller.start()
+        with pytest.raises(serial.SerialException):
+            controller.stop()
+
+
+def test_request_timeout_keeps_replies_matched():
+    async def run(port):
+        controller = AsyncPhotoinoController()
+        await controller.open(port, 115200)
+        await controller.set_time_base(7.)
+        await controller.set_trigger_level(2.)
+        with pytest.raises(asyncio.TimeoutError):
+            await controller.get_time_base(timeout=0.05)
+        # the late time base reply is discarded, not taken for the level
+        assert await controller.get_trigger_level(timeout=1.) == 2
+        await controller.close()
+
+    with FakePhotoino(latency=0.2) as device:
+        asyncio.run(run(device.port))
+
+
+def test_cancelled_request_keeps_replies_matched():
+    async def run(port):
+        controller = AsyncPhotoinoController()
+        await controller.open(port, 115200)
+        await controller.set_time_base(7.)
+        await controller.set_trigger_level(2.)
+        request = asyncio.ensure_future(controller.get_time_base())
+        await asyncio.sleep(0.05)
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+        assert await controller.get_trigger_level(timeout=1.) == 2
+        assert await controller.get_time_base(timeout=1.) == 7
+        await controller.close()
+
+    with FakePhotoino(latency=0.2) as device:
+        asyncio.run(run(device.port))
+
+
+def test_protocol_switch_fails_pending_requests():
+    async def run(port):
+        controller = AsyncPhotoinoController()
+        await controller.open(port, 115200)
+        # the old firmware never answers the switch
+        switch = asyncio.ensure_future(controller.set_binary(True, 0.1))
+        while not controller._pending:
+            await asyncio.sleep(0)
+        level = asyncio.ensure_future(controller.get_trigger_level())
+        await switch
+        assert not controller.binary
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(level, 1.)
+        await controller.close()
+
+    with FakePhotoino(binary=False, latency=0.3) as device:
+        asyncio.run(run(device.port))
+
+
+def test_adapter_caches_and_verifies_settings():
+    with FakePhotoino() as device:
+        controller = SyncPhotoinoAdapter()
+        controller.open(device.port, 0)
+        controller.debounce = 0.05
+        for level in (1., 2., 3.):
+            controller.trigger_level = level
+        controller.time_base = 4.
+        assert controller.trigger_level == 3.
+        assert controller.verify_settings() == {}
+        assert sum(c.startswith('level ') for c in device.commands) == 1
+        # e.g. a device reset behind the controller's back
+        device.trigger_level = 0.
+        assert controller.verify_settings() == {'trigger_level': 0}
+        assert controller.trigger_level == 0
+        controller.start_stream()
+        with pytest.raises(DeviceBusy):
+            controller.verify_settings()
+        controller.stop_stream()
+        controller.close()
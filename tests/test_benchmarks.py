@@ -0,0 +1,196 @@
+"""Acquisition throughput and latency benchmarks of the photoino plugins.
+
+Needs pytest-benchmark; every benchmark records its p50/p99 latency per call
+and the samples per second in `extra_info`. Store the results as JSON and
+compare them between versions with e.g.
+
+    pytest tests/test_benchmarks.py --benchmark-autosave
+    pytest tests/test_benchmarks.py --benchmark-compare
+
+or write them to a given file with --benchmark-json=<file>.
+"""
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_photoino import PhotoinoController
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_replay_photoino import DAQ_0DViewer_replay_photoino
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_simulate_photoino import DAQ_0DViewer_simulate_photoino, \
+    SimulatePhotoinoController
+from pymodaq_plugins_photoino.hardware.fake_device import FakePhotoino
+from pymodaq_plugins_photoino.hardware.protocol import FrameDecoder, \
+    encode_frames
+from pymodaq_plugins_photoino.hardware.serial_reader import SerialReader
+from pymodaq_plugins_photoino.hardware.stream import make_samples
+from pymodaq_plugins_photoino.processing.recorder import NpyRecorder
+
+posix_only = pytest.mark.skipif(sys.platform == 'win32',
+                                reason='needs a pseudo terminal')
+
+N_SAMPLES = 1000
+
+
+def record(benchmark, samples_per_call):
+    # no statistics with --benchmark-disable or under xdist, where the
+    # benchmarks only run once as plain tests
+    if benchmark.disabled:
+        return
+    times = np.array(benchmark.stats.stats.data)
+    benchmark.extra_info['p50_latency'] = float(np.percentile(times, 50))
+    benchmark.extra_info['p99_latency'] = float(np.percentile(times, 99))
+    benchmark.extra_info['samples_per_second'] = \
+        samples_per_call / float(times.mean())
+
+
+class MemorySerial:
+    """Serial port replaying the same bytes over and over."""
+
+    def __init__(self, data):
+        self.data = data
+        self.position = 0
+
+    @property
+    def in_waiting(self):
+        return len(self.data) - self.position
+
+    def read(self, n):
+        if self.position == len(self.data):
+            self.position = 0
+        data = self.data[self.position:self.position + n]
+        self.position += len(data)
+        return data
+
+
+def ascii_counts(n):
+    counts = np.random.default_rng(0).poisson(1000, n)
+    return b''.join(b'%d\r\n' % count for count in counts)
+
+
+@pytest.mark.parametrize('metrics', (False, True))
+def test_receive_number(benchmark, metrics):
+    controller = PhotoinoController()
+    controller.metrics.enabled = metrics
+    controller.reader = SerialReader(MemorySerial(ascii_counts(N_SAMPLES)),
+                                     metrics=controller.metrics)
+
+    def receive():
+        for _ in range(N_SAMPLES):
+            controller.receive_number()
+
+    benchmark.pedantic(receive, rounds=50, warmup_rounds=1)
+    record(benchmark, N_SAMPLES)
+
+
+def test_receive_numbers(benchmark):
+    reader = SerialReader(MemorySerial(ascii_counts(N_SAMPLES)))
+    benchmark.pedantic(reader.read_numbers, rounds=200, warmup_rounds=1)
+    record(benchmark, N_SAMPLES)
+
+
+def test_decode_frames(benchmark):
+    decoder = FrameDecoder()
+    data = encode_frames(np.arange(N_SAMPLES))
+    benchmark.pedantic(decoder.decode, args=(data,), rounds=200,
+                       warmup_rounds=1)
+    record(benchmark, N_SAMPLES)
+
+
+@pytest.mark.parametrize('block_size', (1, 64, 4096))
+def test_simulator_count_rate(benchmark, block_size):
+    controller = SimulatePhotoinoController(seed=0, block_size=block_size)
+
+    def grab():
+        for _ in range(N_SAMPLES):
+            controller.count_rate
+
+    benchmark.pedantic(grab, rounds=50, warmup_rounds=1)
+    record(benchmark, N_SAMPLES)
+
+
+@pytest.mark.parametrize('engine, n', (('poisson', 100000),
+                                       ('photon stream', 1000)))
+def test_simulator_read_counts(benchmark, engine, n):
+    controller = SimulatePhotoinoController(seed=0)
+    controller.engine = engine
+    benchmark.pedantic(controller.read_counts, args=(n,), rounds=20,
+                       warmup_rounds=1)
+    record(benchmark, n)
+
+
+@pytest.mark.parametrize('Naverage', (1, 100))
+def test_grab_data_simulated(benchmark, Naverage):
+    plugin = DAQ_0DViewer_simulate_photoino(None, None)
+    plugin.ini_detector()
+    emitted, grabs = [], []
+    plugin.data_grabed_signal.connect(emitted.append)
+
+    def grab():
+        grabs.append(Naverage)
+        plugin.grab_data(Naverage)
+    benchmark.pedantic(grab, rounds=500, warmup_rounds=5)
+    record(benchmark, Naverage)
+    plugin.close()
+    # one emission per grab
+    assert len(emitted) == len(grabs)
+
+
+@pytest.mark.parametrize('streaming', (False, True))
+def test_grab_data_replay(benchmark, tmp_path, streaming):
+    """Replay a recording as fast as possible, the bound of the plugin."""
+    path = tmp_path / 'bins.npy'
+    recorder = NpyRecorder(path)
+    counts = np.random.default_rng(0).poisson(100, 100000)
+    recorder.write(make_samples(counts, np.arange(len(counts)), 0.))
+    recorder.close()
+    plugin = DAQ_0DViewer_replay_photoino(None, None)
+    plugin.settings.child('replay', 'replay_file').setValue(str(path))
+    plugin.settings.child('replay', 'replay_speed').setValue(0.)
+    plugin.settings.child('streaming').setValue(streaming)
+    plugin.ini_detector()
+    benchmark.pedantic(plugin.grab_data, args=(N_SAMPLES,), rounds=200,
+                       warmup_rounds=5)
+    record(benchmark, N_SAMPLES)
+    plugin.stop()
+    plugin.close()
+
+
+@posix_only
+@pytest.mark.parametrize('binary', (False, True))
+@pytest.mark.parametrize('baudrate', (None, 115200, 9600))
+def test_count_rate_fake_serial(benchmark, baudrate, binary):
+    with FakePhotoino(baudrate=baudrate, seed=0) as device:
+        controller = PhotoinoController()
+        controller.open(device.port, 0, binary=binary)
+        benchmark.pedantic(lambda: controller.count_rate, rounds=100,
+                           warmup_rounds=2)
+        record(benchmark, 1)
+        controller.close()
+
+
+@posix_only
+@pytest.mark.parametrize('time_base', (0.1, 1.))
+def test_stream_fake_serial(benchmark, time_base):
+    n = 100
+    with FakePhotoino(seed=0) as device:
+        controller = PhotoinoController()
+        controller.open(device.port, 0, binary=True)
+        controller.time_base = time_base
+        controller.start_stream()
+
+        def stream():
+            received = 0
+            while received < n:
+                received += len(controller.read_stream(n - received,
+                                                       timeout=1.))
+
+        benchmark.pedantic(stream, rounds=10, warmup_rounds=1)
+        record(benchmark, n)
+        controller.stop_stream()
+        assert controller.missing_bins == 0
+        controller.close()
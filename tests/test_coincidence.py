@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_photoino_coincidence import DAQ_0DViewer_photoino_coincidence
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_photoino_multi import MultiPhotoinoController
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_simulate_photoino import SimulatePhotoinoController
+from pymodaq_plugins_photoino.hardware.stream import SAMPLE_DTYPE
+from pymodaq_plugins_photoino.processing.coincidence import \
+    CoincidenceCounter, events_from_bins, merge_events, pair_counts
+
+
+def correlated_events(rng, duration=10., rate=1000., pairs=200., jitter=1e-6):
+    """Three channels of Poisson events, the first two sharing `pairs`
+    coincidences per second."""
+    common = np.sort(rng.uniform(0, duration, int(pairs * duration)))
+    channels = []
+    for i in range(3):
+        own = rng.uniform(0, duration, int(rate * duration))
+        shared = common + rng.normal(0, jitter, len(common)) \
+            if i < 2 else np.zeros(0)
+        channels.append(np.sort(np.concatenate((own, shared))))
+    return channels
+
+
+def test_pair_counts_matches_brute_force():
+    rng = np.random.default_rng(0)
+    times = [np.sort(rng.uniform(0, 1, n)) for n in (50, 80, 30)]
+    merged, channels = merge_events(times)
+    assert np.all(np.diff(merged) >= 0)
+    pairs = pair_counts(merged, channels, 3, 0.01)
+    for i in range(3):
+        for j in range(3):
+            if i == j:
+                continue
+            close = np.abs(times[i][:, np.newaxis] - times[j]) <= 0.01
+            assert pairs[i, j] + pairs[j, i] == close.sum()
+
+
+def test_coincidences_and_accidentals():
+    events = correlated_events(np.random.default_rng(1))
+    counter = CoincidenceCounter(3, window=1e-5)
+    counter.update(events, [10.] * 3)
+    assert counter.duration == pytest.approx(10., abs=1e-3)
+    assert list(counter.singles) == pytest.approx([12000, 12000, 10000],
+                                                  abs=50)
+    accidentals = counter.accidentals()
+    # 12000 * 12000 * 2e-5 / 10 pairs by chance between independent streams
+    assert accidentals[0] == pytest.approx(288, rel=0.01)
+    assert counter.coincidences[0, 1] - accidentals[0] \
+        == pytest.approx(2000, abs=60)
+    assert counter.coincidences[0, 2] == pytest.approx(accidentals[1], abs=60)
+    assert counter.coincidences[1, 2] == pytest.approx(accidentals[2], abs=60)
+
+
+def test_counts_do_not_depend_on_batches():
+    events = correlated_events(np.random.default_rng(2), duration=2.)
+    whole = CoincidenceCounter(3, window=1e-3)
+    whole.update(events, [2.] * 3)
+    batched = CoincidenceCounter(3, window=1e-3)
+    # the second channel arrives ahead of the others
+    starts = np.zeros(3)
+    for end in np.linspace(0.1, 2., 20):
+        ends = np.minimum([end, end + 0.05, end], 2.)
+        stops = np.where(ends < 2., ends, np.inf)
+        batched.update([t[(t >= start) & (t < stop)] for t, start, stop
+                        in zip(events, starts, stops)], ends)
+        starts = stops
+    assert batched.duration == pytest.approx(whole.duration)
+    assert list(batched.singles) == list(whole.singles)
+    assert np.array_equal(batched.coincidences, whole.coincidences)
+
+
+def test_events_from_bins():
+    assert list(events_from_bins([1., 2., 3.], [2, 0, 1])) == [1., 1., 3.]
+
+
+def test_coincidence_viewer(monkeypatch):
+    monkeypatch.setattr(MultiPhotoinoController, 'controller_type',
+                        SimulatePhotoinoController)
+    plugin = DAQ_0DViewer_photoino_coincidence(None, None)
+    plugin.settings.child('serial_ports').setValue('a, b')
+    plugin.ini_detector()
+    emitted = []
+    plugin.data_grabed_signal.connect(emitted.append)
+    for _ in range(5):
+        plugin.grab_data(Naverage=20)
+    plugin.stop()
+    plugin.close()
+    rates, totals = emitted[-1]
+    assert rates.labels == ['Singles a', 'Singles b', 'Coincidences a-b',
+                            'Accidentals a-b']
+    # 100 counts per 1 ms bin
+    assert rates.data[0][0] == pytest.approx(1e5, rel=0.2)
+    assert totals.labels[-1] == 'Duration (s)'
+    assert totals.data[-1][0] > 0
+    assert totals.data[2][0] > 0
+
+
+def test_coincidence_viewer_keeps_samples_of_a_short_grab(monkeypatch):
+    monkeypatch.setattr(MultiPhotoinoController, 'controller_type',
+                        SimulatePhotoinoController)
+    plugin = DAQ_0DViewer_photoino_coincidence(None, None)
+    plugin.settings.child('serial_ports').setValue('a, b')
+    plugin.ini_detector()
+    ahead, behind = plugin.controller.controllers
+    read, stalled, bins = ahead.read_samples, [True], []
+
+    def read_ahead(n=None, timeout=None):
+        samples = read(n, timeout)
+        bins.extend(samples['bin'])
+        return samples
+    ahead.read_samples = read_ahead
+    behind.read_samples = lambda n=None, timeout=None: \
+        np.zeros(0, dtype=SAMPLE_DTYPE) if stalled[0] \
+        else SimulatePhotoinoController.read_samples(behind, n, timeout)
+    counted = []
+    count_coincidences = plugin.count_coincidences
+    plugin.count_coincidences = lambda samples: \
+        counted.extend(samples[0]['bin']) or count_coincidences(samples)
+    plugin.grab_data(Naverage=20)
+    assert counted == []
+    stalled[0] = False
+    for _ in range(3):
+        plugin.grab_data(Naverage=20)
+    plugin.stop()
+    plugin.close()
+    assert len(bins) == 60
+    assert counted == bins
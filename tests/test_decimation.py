@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_simulate_photoino import DAQ_0DViewer_simulate_photoino
+from pymodaq_plugins_photoino.processing.decimation import Decimator
+
+
+def pop_all(decimator):
+    return [decimator.pop() for _ in range(len(decimator))]
+
+
+def test_blocks_do_not_depend_on_chunking():
+    counts = np.random.default_rng(0).poisson(10, 1000)
+    decimator = Decimator(factor=7, capacity=4)
+    for chunk in np.array_split(counts, [1, 3, 50, 51, 400, 999]):
+        decimator.add(chunk)
+    blocks = pop_all(decimator)
+    assert len(blocks) == 1000 // 7
+    assert decimator.missing == 7 - 1000 % 7
+    reference = counts[:len(blocks) * 7].reshape(-1, 7)
+    assert [block[0] for block in blocks] == list(reference.sum(axis=1))
+    assert [block[1] for block in blocks] == list(reference.min(axis=1))
+    assert [block[2] for block in blocks] == list(reference.max(axis=1))
+
+
+def test_factor_change_closes_partial_block():
+    decimator = Decimator(factor=4)
+    decimator.add([1, 2, 3])
+    assert len(decimator) == 0
+    decimator.factor = 2
+    decimator.add([4, 5, 6])
+    assert pop_all(decimator) == [(6, 1, 3, 3), (9, 4, 5, 2)]
+    assert decimator.missing == 1
+    with pytest.raises(IndexError):
+        decimator.pop()
+
+
+def test_viewer_emits_bounded_blocks():
+    plugin = DAQ_0DViewer_simulate_photoino(None, None)
+    plugin.settings.child('decimation', 'decimation_mode').setValue(
+        'envelope')
+    plugin.settings.child('decimation', 'max_emit_rate').setValue(20.)
+    plugin.ini_detector()
+    plugin.controller.realtime = False
+    emitted = []
+    plugin.data_grabed_signal.connect(emitted.append)
+    for _ in range(3):
+        plugin.grab_data()
+    plugin.close()
+    counts = emitted[-1][0]
+    assert counts.labels == ['Counts', 'Min', 'Max', 'Bins']
+    mean, low, high, bins = [channel[0] for channel in counts.data]
+    assert bins == 50
+    assert low <= mean <= high
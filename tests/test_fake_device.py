@@ -0,0 +1,104 @@
+import sys
+import time
+
+import pytest
+import serial
+
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_photoino import PhotoinoController
+from pymodaq_plugins_photoino.hardware.fake_device import FakePhotoino
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32',
+                                reason='needs a pseudo terminal')
+
+
+@pytest.mark.parametrize('binary', (False, True))
+def test_controller_round_trip(binary):
+    with FakePhotoino(seed=0) as device:
+        controller = PhotoinoController()
+        controller.open(device.port, 0, binary=binary)
+        assert controller.binary == binary
+        controller.time_base = 2.
+        controller.trigger_level = 1.
+        assert controller.time_base == 2
+        assert controller.trigger_level == 1
+        assert controller.count_rate > 0
+        assert len(controller.read_counts(20)) == 20
+        controller.start_stream()
+        time.sleep(0.1)
+        assert len(controller.read_stream(timeout=1.)) > 0
+        controller.stop_stream()
+        assert controller.missing_bins == 0
+        controller.close()
+
+
+def test_old_firmware_falls_back_to_ascii():
+    with FakePhotoino(binary=False) as device:
+        controller = PhotoinoController()
+        controller.open(device.port, 0, binary=True)
+        assert not controller.binary
+        assert controller.count_rate > 0
+        controller.close()
+
+
+def test_settings_are_cached_and_verified():
+    with FakePhotoino() as device:
+        controller = PhotoinoController()
+        controller.open(device.port, 0)
+        controller.debounce = 10.
+        for level in range(10):
+            controller.trigger_level = level / 10
+        assert controller.trigger_level == 0.9
+        assert not any(c.startswith('level') for c in device.commands)
+        controller.count_rate
+        assert [c for c in device.commands if c.startswith('level')] \
+            == ['level 0.900000']
+        device.trigger_level = 3.
+        assert controller.verify_settings() == {'trigger_level': 3}
+        controller.close()
+
+
+def test_reconnect_restores_settings_and_stream():
+    device = FakePhotoino().open()
+    controller = PhotoinoController()
+    controller.open(device.port, 0, binary=True)
+    controller.time_base = 5.
+    controller.trigger_level = 2.
+    controller.start_stream()
+    device.close()
+    time.sleep(0.1)
+    with pytest.raises(serial.SerialException):
+        controller.read_stream(timeout=1.)
+
+    with FakePhotoino() as replugged:
+        controller.port = replugged.port
+        controller.reconnect()
+        assert controller.wait_connected(timeout=5.)
+        while controller.reconnecting:
+            time.sleep(0.01)
+        assert controller.binary and controller.streaming
+        assert {'timebase 5.000000', 'level 2.000000', 'start'} \
+            <= set(replugged.commands)
+        assert len(controller.read_stream(timeout=1.)) > 0
+        controller.close()
+
+
+def test_close_during_reconnect_closes_the_port():
+    device = FakePhotoino().open()
+    controller = PhotoinoController()
+    controller.open(device.port, 0, binary=True)
+    controller.start_stream()
+    reopen = controller._open
+
+    def close_while_reopening(*args):
+        reopen(*args)
+        controller.close()
+    controller._open = close_while_reopening
+    controller.reconnect()
+    assert controller.wait_connected(timeout=5.)
+    while controller.reconnecting:
+        time.sleep(0.01)
+    assert controller.ser is None
+    assert not controller.io.running
+    assert not controller.streaming
+    device.close()
@@ -0,0 +1,42 @@
+import numpy as np
+
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_simulate_photoino import SimulatePhotoinoController
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_1D.\
+    daq_1Dviewer_photoino_histogram import DAQ_1DViewer_photoino_histogram
+from pymodaq_plugins_photoino.processing.histogram import CountHistogram
+
+
+def test_histogram_accumulates_batches():
+    counts = np.random.default_rng(0).poisson(20, 100000)
+    histogram = CountHistogram()
+    for batch in np.split(counts, 10):
+        histogram.add(batch)
+    assert np.all(histogram.histogram[:counts.max() + 1]
+                  == np.bincount(counts))
+    assert histogram.bins == len(counts)
+    assert abs(histogram.fano - 1) < 0.02
+    assert abs(histogram.g2 - 1) < 0.01
+    values, width = histogram.decimated(10)
+    assert len(values) <= 10
+    assert values.sum() == len(counts)
+    histogram.reset()
+    assert histogram.bins == 0
+
+
+def test_histogram_viewer(monkeypatch):
+    monkeypatch.setattr(DAQ_1DViewer_photoino_histogram, 'controller_type',
+                        SimulatePhotoinoController)
+    plugin = DAQ_1DViewer_photoino_histogram(None, None)
+    plugin.settings.child('batch_size').setValue(500)
+    plugin.ini_detector()
+    emitted = []
+    plugin.data_grabed_signal.connect(emitted.append)
+    for _ in range(4):
+        plugin.grab_data()
+    plugin.close()
+    distribution, statistics = emitted[-1]
+    assert distribution.dim == 'Data1D'
+    assert distribution.data[0].sum() == 2000
+    assert statistics.labels[-1] == 'Bins'
+    assert statistics.data[-1][0] == 2000
@@ -0,0 +1,52 @@
+import json
+import sys
+
+import pytest
+
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_photoino import PhotoinoController
+from pymodaq_plugins_photoino.hardware.fake_device import FakePhotoino
+from pymodaq_plugins_photoino.hardware.metrics import LatencyHistogram, \
+    Metrics
+
+
+def test_histogram_quantiles():
+    histogram = LatencyHistogram(resolution=1e-6)
+    for value in [1e-5] * 90 + [1e-3] * 10:
+        histogram.add(value)
+    assert histogram.count == 100
+    assert histogram.min == 1e-5 and histogram.max == 1e-3
+    assert histogram.mean == pytest.approx(1.09e-4)
+    assert 1e-5 <= histogram.quantile(0.5) < 2e-5
+    assert histogram.quantile(0.99) == 1e-3
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics()
+    metrics.count('bytes_read', 10)
+    metrics.observe('grab_interval', 1e-3)
+    with metrics.timer('rate_round_trip'):
+        pass
+    assert metrics.timer('a') is metrics.timer('b')
+    assert metrics.counters == {} and metrics.histograms == {}
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='needs a pseudo terminal')
+def test_controller_metrics(tmp_path):
+    with FakePhotoino() as device:
+        controller = PhotoinoController()
+        controller.open(device.port, 0, binary=True)
+        controller.metrics.enabled = True
+        for _ in range(5):
+            controller.count_rate
+        controller.read_counts(100)
+        controller.close()
+    snapshot = controller.metrics.snapshot()
+    assert snapshot['counters']['bytes_written'] > 0
+    assert snapshot['counters']['bytes_read'] > 100
+    assert snapshot['histograms']['rate_round_trip']['count'] == 5
+    assert snapshot['histograms']['counts_round_trip']['count'] == 1
+    assert 'rate_round_trip' in controller.metrics.summary()
+    controller.metrics.dump(tmp_path / 'metrics.json')
+    dumped = json.loads((tmp_path / 'metrics.json').read_text())
+    assert dumped['counters'] == snapshot['counters']
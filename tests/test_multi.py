@@ -0,0 +1,100 @@
+import time
+
+import numpy as np
+import pytest
+
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_photoino_multi import DAQ_0DViewer_photoino_multi, \
+    MultiPhotoinoController
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_simulate_photoino import SimulatePhotoinoController
+
+
+class CountingController(SimulatePhotoinoController):
+    """Simulated photoino counting its bin indices, delivering at most
+    `limit` streamed bins per read and answering after `delay` s."""
+
+    limit = None
+    delay = 0.
+
+    def __init__(self):
+        super().__init__()
+        self.realtime = False
+        self.calls = []
+        self._next = 0
+
+    def _generate(self, n):
+        counts = self._next + np.arange(n)
+        self._next += n
+        return counts
+
+    @property
+    def count_rate(self):
+        self.calls.append(time.perf_counter())
+        time.sleep(self.delay)
+        return 1
+
+    def read_samples(self, n=None, timeout=None):
+        if self.limit is not None:
+            n = self.limit if n is None else min(n, self.limit)
+        return SimulatePhotoinoController.read_samples(self, n, timeout)
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    monkeypatch.setattr(MultiPhotoinoController, 'controller_type',
+                        CountingController)
+    controller = MultiPhotoinoController()
+    controller.open(['a', 'b', 'c'], 0)
+    yield controller
+    controller.close()
+
+
+def test_queries_leave_together(controller):
+    # a busy worker holds the others at the barrier
+    controller._pool.submit(time.sleep, 0.1)
+    assert list(controller.count_rate) == [1, 1, 1]
+    starts = [device.calls[0] for device in controller.controllers]
+    assert max(starts) - min(starts) < 0.02
+
+
+def test_skew_is_the_spread_of_the_replies(controller):
+    controller.controllers[1].delay = 0.05
+    controller.count_rate
+    assert controller.skew == pytest.approx(0.05, abs=0.02)
+
+
+def test_streams_are_aligned_by_bin(controller):
+    controller.controllers[1].limit = 3
+    controller.controllers[2].limit = 7
+    controller.skew = 1.
+    controller.start_stream()
+    counts = [controller.read_stream(10) for _ in range(5)]
+    controller.stop_stream()
+    assert [c.shape for c in counts] == [(3, 3)] * 5
+    counts = np.concatenate(counts, axis=1)
+    # every device counts its bin index, rows are equal once aligned
+    assert np.array_equal(counts, np.tile(np.arange(15), (3, 1)))
+    # the skew follows the streamed bins
+    assert controller.skew < 0.1
+
+
+def test_viewer_emits_a_gap_while_reconnecting(monkeypatch):
+    monkeypatch.setattr(MultiPhotoinoController, 'controller_type',
+                        CountingController)
+    plugin = DAQ_0DViewer_photoino_multi(None, None)
+    plugin.settings.child('serial_ports').setValue('a, b')
+    plugin.ini_detector()
+    emitted = []
+    plugin.data_grabed_signal.connect(emitted.append)
+    lost = plugin.controller.controllers[1]
+    lost.reconnecting = True
+    lost.wait_connected = lambda timeout=None: False
+    plugin.grab_data()
+    lost.reconnecting = False
+    plugin.grab_data()
+    plugin.close()
+    gap, counts = [data[0] for data in emitted]
+    assert gap.labels == ['Counts a', 'Counts b']
+    assert all(np.isnan(channel[0]) for channel in gap.data)
+    assert [channel[0] for channel in counts.data] == [1, 1]
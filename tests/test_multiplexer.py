@@ -0,0 +1,124 @@
+import sys
+import threading
+
+import pytest
+
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_photoino import PhotoinoController
+from pymodaq_plugins_photoino.hardware.fake_device import FakePhotoino
+from pymodaq_plugins_photoino.hardware.multiplexer import PRIORITY_COUNTS, \
+    PRIORITY_SETTINGS, CommandQueue, DeviceBusy
+
+
+def test_count_reads_overtake_settings():
+    io = CommandQueue()
+    io.start()
+    release = threading.Event()
+    order = []
+    busy = io.submit(release.wait)
+    futures = [io.submit(lambda: order.append('level'), PRIORITY_SETTINGS),
+               io.submit(lambda: order.append('rate'), PRIORITY_COUNTS),
+               io.submit(lambda: order.append('timebase'), PRIORITY_SETTINGS)]
+    release.set()
+    for future in [busy] + futures:
+        future.result(timeout=1.)
+    io.stop()
+    assert order == ['rate', 'level', 'timebase']
+
+
+def test_exchanges_run_on_the_io_thread():
+    io = CommandQueue()
+    assert io.call(threading.current_thread) is threading.current_thread()
+    io.start()
+    thread = io.call(threading.current_thread)
+    assert thread is not threading.current_thread()
+    # nested calls run in place instead of waiting on themselves
+    assert io.call(lambda: io.call(threading.current_thread)) is thread
+    with pytest.raises(ZeroDivisionError):
+        io.call(lambda: 1 / 0)
+    io.stop()
+    assert not io.running
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='needs a pseudo terminal')
+def test_shared_controller_keeps_replies_apart():
+    with FakePhotoino(seed=0) as device:
+        device.mean_count_rate = 100000
+        controller = PhotoinoController()
+        controller.open(device.port, 0, binary=False)
+        errors = []
+
+        def viewer():
+            try:
+                for _ in range(50):
+                    assert controller.count_rate > 10000
+                    assert len(controller.read_counts(10)) == 10
+            except Exception as e:
+                errors.append(e)
+
+        def actuator():
+            try:
+                for level in range(50):
+                    controller.trigger_level = level % 5
+                    assert controller.verify_settings() == {}
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=viewer),
+                   threading.Thread(target=actuator)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        controller.close()
+    assert errors == []
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='needs a pseudo terminal')
+@pytest.mark.parametrize('binary', [False, True])
+def test_shared_controller_while_streaming(binary):
+    with FakePhotoino(seed=0) as device:
+        device.mean_count_rate = 100
+        controller = PhotoinoController()
+        controller.open(device.port, 0, binary=binary)
+        controller.trigger_level = 1
+        controller.time_base = 1
+        controller.start_stream()
+        errors, busy = [], []
+
+        def viewer():
+            try:
+                for _ in range(20):
+                    counts = controller.read_stream(10, timeout=1.)
+                    assert len(counts) > 0
+            except Exception as e:
+                errors.append(e)
+
+        def actuator():
+            try:
+                for level in range(20):
+                    controller.trigger_level = level % 5
+                    assert controller.trigger_level == level % 5
+                    for query in (controller.verify_settings,
+                                  lambda: controller.count_rate):
+                        try:
+                            query()
+                        except DeviceBusy:
+                            busy.append(level)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=viewer),
+                   threading.Thread(target=actuator)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert controller.stream.error is None
+        controller.stop_stream()
+        # the levels written while streaming reached the device
+        assert controller.verify_settings() == {}
+        assert device.trigger_level == 19 % 5
+        controller.close()
+    assert errors == []
+    assert len(busy) == 40
@@ -93,3 +93,20 @@ def test_viewer_has_mandatory_methods(dim):
         klass = getattr(getattr(mod, plug), f'DAQ_{dim}Viewer_{name}')
         for meth in MANDATORY_VIEWER_METHODS:
             assert hasattr(klass, meth)
+
+
+@pytest.mark.parametrize('dim', ('0D', '1D'))
+def test_viewer_stages_have_their_settings(dim):
+    from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+        daq_0Dviewer_photoino import DAQ_0DViewer_photoino
+    plugin_list, mod = get_viewer_plugins(dim)
+    for plug in plugin_list:
+        name = plug.split(f'daq_{dim}viewer_')[1]
+        klass = getattr(getattr(mod, plug), f'DAQ_{dim}Viewer_{name}')
+        stage_types = getattr(klass, 'stage_types', None)
+        if stage_types is None:
+            continue
+        names = {param['name'] for param in klass.params}
+        for stage_type in DAQ_0DViewer_photoino.stage_types:
+            assert (stage_type.params['name'] in names) \
+                == (stage_type in stage_types), (name, stage_type.__name__)
@@ -0,0 +1,83 @@
+import importlib
+import subprocess
+import sys
+
+import pytest
+
+from pymodaq_plugins_photoino.plugin_registry import PluginRegistry
+
+PLUGIN_PACKAGES = ['daq_move_plugins'] + [
+    'daq_viewer_plugins.plugins_%s' % dim for dim in ('0D', '1D', '2D', 'ND')]
+
+STARTUP_SCRIPT = """
+import importlib, sys, time
+start = time.perf_counter()
+import pymodaq
+startup = time.perf_counter()
+loaded = set(sys.modules)
+packages = [importlib.import_module('pymodaq_plugins_photoino.' + package)
+            for package in %r]
+imported = time.perf_counter()
+for package in packages:
+    package.registry.plugins()
+listed = time.perf_counter()
+plugins = [name for name in set(sys.modules) - loaded
+           if name.rsplit('.', 1)[-1].startswith(('daq_move_', 'daq_0D',
+                                                  'daq_1D', 'daq_2D', 'daq_ND'))]
+print(startup - start, imported - startup, listed - imported, len(plugins))
+""" % PLUGIN_PACKAGES
+
+
+def test_startup_and_listing_cost(record_property):
+    """Measure in a fresh interpreter the PyMoDAQ startup (which imports
+    every installed plugin), then importing the plugin packages and listing
+    their plugins, which must import no plugin module beyond those PyMoDAQ
+    imported. The times are recorded as test properties, e.g. in the
+    --junitxml report. Listing must stay well below the cost of importing
+    the plugins: it is bounded relative to the startup, which pays for the
+    imports, so that the bound holds on a loaded machine."""
+    output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT],
+                            capture_output=True, text=True, check=True)
+    startup, imported, listed, plugins = output.stdout.split()
+    record_property('pymodaq_startup', float(startup))
+    record_property('plugin_packages_import', float(imported))
+    record_property('plugin_listing', float(listed))
+    assert int(plugins) == 0
+    assert float(imported) + float(listed) < 0.25 * float(startup)
+
+
+@pytest.mark.parametrize('package', PLUGIN_PACKAGES)
+def test_listing_imports_nothing(package, monkeypatch):
+    module = importlib.import_module('pymodaq_plugins_photoino.' + package)
+    registry = PluginRegistry(module.__name__, module.path.parent)
+
+    def no_import(*args):
+        raise AssertionError('listing the plugins imported a module')
+
+    monkeypatch.setattr(importlib, 'import_module', no_import)
+    for plugin in registry.plugins():
+        assert plugin['module'] in registry.names()
+        assert plugin['class'].startswith('DAQ_')
+
+
+def test_failures_are_cached(tmp_path, monkeypatch):
+    package = tmp_path / 'fake_plugins'
+    package.mkdir()
+    (package / '__init__.py').write_text('')
+    (package / 'daq_0Dviewer_broken.py').write_text(
+        'import missing_dependency\n'
+        'class DAQ_0DViewer_broken:\n'
+        '    """Broken plugin"""\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    registry = PluginRegistry('fake_plugins', package)
+    assert registry.plugins() == [{
+        'type': 'daq_0Dviewer', 'name': 'broken',
+        'module': 'daq_0Dviewer_broken', 'class': 'DAQ_0DViewer_broken',
+        'doc': 'Broken plugin'}]
+    with pytest.raises(ImportError):
+        registry.module_getattr('daq_0Dviewer_broken')
+    (package / 'daq_0Dviewer_broken.py').write_text('')
+    with pytest.raises(ImportError, match='missing_dependency'):
+        registry.module_getattr('daq_0Dviewer_broken')
+    with pytest.raises(AttributeError):
+        registry.module_getattr('unknown')
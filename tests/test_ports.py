@@ -0,0 +1,28 @@
+from serial.tools import list_ports
+from serial.tools.list_ports_common import ListPortInfo
+
+from pymodaq_plugins_photoino.hardware import ports
+from pymodaq_plugins_photoino.hardware.ports import DeviceCache, find_port
+
+
+def usb_port(device, vid, pid, serial_number):
+    info = ListPortInfo(device, skip_link_detection=True)
+    info.vid, info.pid, info.serial_number = vid, pid, serial_number
+    return info
+
+
+def test_find_port_prefers_known_photoino(monkeypatch, tmp_path):
+    connected = [usb_port('/dev/ttyUSB0', 0x0403, 0x6015, 'OTHER'),
+                 usb_port('/dev/ttyACM1', 0x2341, 0x0043, 'B'),
+                 usb_port('/dev/ttyACM0', 0x2341, 0x0043, 'A')]
+    monkeypatch.setattr(list_ports, 'comports', lambda: connected)
+    assert ports.available_ports() == ['/dev/ttyACM0', '/dev/ttyACM1',
+                                       '/dev/ttyUSB0']
+
+    cache = DeviceCache(tmp_path / 'devices.json')
+    assert find_port(cache=cache) == '/dev/ttyACM0'
+    cache.remember(connected[1])
+    assert find_port(cache=DeviceCache(tmp_path / 'devices.json')) \
+        == '/dev/ttyACM1'
+    assert find_port('A') == '/dev/ttyACM0'
+    assert find_port('C') is None
@@ -0,0 +1,49 @@
+import numpy as np
+
+from pymodaq_plugins_photoino.hardware.protocol import FRAME_SIZE, \
+    FrameDecoder, decode_block_header, decode_counts, encode_block, \
+    encode_frames, BLOCK_HEADER
+
+
+def test_block_round_trip():
+    counts = np.arange(1000) * 7
+    block = encode_block(counts)
+    n = decode_block_header(block[:BLOCK_HEADER.size])
+    assert n == 1000
+    assert np.all(decode_counts(block[BLOCK_HEADER.size:]) == counts)
+
+
+def test_frames_round_trip():
+    counts = np.array([0, 1, 2**32 - 1, 12345])
+    decoder = FrameDecoder()
+    frames, consumed = decoder.decode(encode_frames(counts, first_seq=10))
+    assert consumed == len(counts) * FRAME_SIZE
+    assert np.all(frames['count'] == counts)
+    assert decoder.missing == 0
+
+
+def test_partial_frame_is_kept():
+    data = encode_frames([5, 6])
+    decoder = FrameDecoder()
+    frames, consumed = decoder.decode(data[:-3])
+    assert list(frames['count']) == [5]
+    assert consumed == FRAME_SIZE
+
+
+def test_missing_bins_across_wrap():
+    decoder = FrameDecoder()
+    decoder.decode(encode_frames([1, 2], first_seq=65534))
+    decoder.decode(encode_frames([3], first_seq=2))
+    assert decoder.missing == 2
+    assert list(decoder.bins) == [4]
+
+
+def test_resync_after_corruption():
+    data = bytearray(encode_frames([1, 2, 3]))
+    data[FRAME_SIZE + 3] ^= 0xFF
+    decoder = FrameDecoder()
+    frames, consumed = decoder.decode(bytes(data))
+    assert list(frames['count']) == [1, 3]
+    assert consumed == len(data)
+    assert decoder.corrupt == FRAME_SIZE
+    assert decoder.missing == 1
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+import tables
+
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_simulate_photoino import DAQ_0DViewer_simulate_photoino
+from pymodaq_plugins_photoino.hardware.stream import SampleQueue, \
+    make_samples
+from pymodaq_plugins_photoino.processing.recorder import NpyRecorder, \
+    open_recorder
+
+
+def batches(n, size):
+    for k in range(n):
+        bins = np.arange(k * size, (k + 1) * size)
+        yield make_samples(bins % 7, bins, float(k))
+
+
+def test_npy_recorder_grows_and_loads(tmp_path):
+    path = tmp_path / 'bins.npy'
+    recorder = NpyRecorder(path, capacity=10)
+    for samples in batches(5, 7):
+        recorder.write(samples)
+    recorder.close()
+    recorded = np.load(path, mmap_mode='r')
+    assert len(recorded) == 35
+    assert np.all(recorded['bin'] == np.arange(35))
+    assert np.all(recorded['count'] == np.arange(35) % 7)
+
+
+def test_hdf5_recorder(tmp_path):
+    path = tmp_path / 'bins.h5'
+    recorder = open_recorder(path, 'hdf5', time_base=2.)
+    for samples in batches(3, 100):
+        recorder.write(samples)
+    recorder.close()
+    recorder.write(next(batches(1, 1)))
+    with tables.open_file(path) as h5:
+        assert h5.root.samples.attrs.time_base == 2.
+        assert np.all(h5.root.samples.col('bin') == np.arange(300))
+        assert h5.root.samples.filters.complevel == 4
+
+
+def test_queue_sink_sees_dropped_batches():
+    recorded = []
+    queue = SampleQueue(maxlen=4)
+    queue.sink = recorded.append
+    queue.put([1, 2, 3])
+    queue.put([4, 5])
+    assert queue.dropped == 2
+    assert sum(len(samples) for samples in recorded) == 5
+
+
+@pytest.mark.parametrize('file_format', ('hdf5', 'npy'))
+def test_plugin_records_all_bins(tmp_path, file_format):
+    path = tmp_path / ('bins.' + file_format)
+    plugin = DAQ_0DViewer_simulate_photoino(None, None)
+    plugin.settings.child('realtime').setValue(False)
+    plugin.settings.child('block_size').setValue(100)
+    plugin.settings.child('recorder', 'record_path').setValue(str(path))
+    plugin.settings.child('recorder', 'record_format').setValue(file_format)
+    plugin.ini_detector()
+    plugin.settings.child('recorder', 'recording').setValue(True)
+    plugin.commit_settings(plugin.settings.child('recorder', 'recording'))
+    emitted = []
+    plugin.data_grabed_signal.connect(emitted.append)
+    for _ in range(5):
+        plugin.grab_data(10)
+    plugin.stop()
+    plugin.close()
+    assert len(emitted) == 5
+    if file_format == 'npy':
+        recorded = np.load(path)['bin']
+    else:
+        with tables.open_file(path) as h5:
+            recorded = h5.root.samples.col('bin')
+    assert np.all(recorded == np.arange(5 * 110))
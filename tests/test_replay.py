@@ -0,0 +1,68 @@
+import time
+
+import numpy as np
+import pytest
+
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_replay_photoino import DAQ_0DViewer_replay_photoino, \
+    ReplayPhotoinoController
+from pymodaq_plugins_photoino.hardware.stream import make_samples
+from pymodaq_plugins_photoino.processing.recorder import open_recorder
+
+
+@pytest.fixture(params=['hdf5', 'npy'])
+def recording(request, tmp_path):
+    """100 recorded bins of 2 ms, counting 0 to 99, with bin 50 lost."""
+    path = tmp_path / ('bins.h5' if request.param == 'hdf5' else 'bins.npy')
+    recorder = open_recorder(path, request.param, time_base=2.)
+    bins = np.arange(101)
+    bins = bins[bins != 50]
+    recorder.write(make_samples(np.arange(100), bins, 0.))
+    recorder.close()
+    return path
+
+
+def test_replay_loops_over_recorded_bins(recording):
+    controller = ReplayPhotoinoController()
+    controller.open(str(recording), 0)
+    controller.speed = 0
+    assert controller.count_rate == 0
+    assert list(controller.read_counts(3)) == [1, 2, 3]
+    controller.start_stream()
+    samples = controller.read_samples(200)
+    assert list(samples['count'][:96]) == list(range(4, 100))
+    assert list(samples['count'][96:100]) == [0, 1, 2, 3]
+    assert samples['bin'][96] == 101
+    controller.loop = False
+    assert len(controller.read_stream(1000)) == 96
+    with pytest.raises(TimeoutError):
+        controller.count_rate
+    controller.close()
+
+
+def test_replay_speed(recording):
+    controller = ReplayPhotoinoController()
+    controller.open(str(recording), 0)
+    controller.time_base = 2.
+    controller.speed = 10.
+    start = time.perf_counter()
+    controller.read_counts(50)
+    assert time.perf_counter() - start == pytest.approx(0.01, abs=0.02)
+    controller.close()
+
+
+def test_viewer_replays_recording(tmp_path):
+    path = tmp_path / 'bins.h5'
+    recorder = open_recorder(path, 'hdf5', time_base=5.)
+    recorder.write(make_samples(np.full(10, 7), np.arange(10), 0.))
+    recorder.close()
+    plugin = DAQ_0DViewer_replay_photoino(None, None)
+    plugin.settings.child('replay', 'replay_file').setValue(str(path))
+    plugin.settings.child('replay', 'replay_speed').setValue(0.)
+    plugin.ini_detector()
+    assert plugin.settings['time_base'] == 5.
+    emitted = []
+    plugin.data_grabed_signal.connect(emitted.append)
+    plugin.grab_data(Naverage=4)
+    plugin.close()
+    assert emitted[0][0].data[0][0] == 7.
@@ -0,0 +1,43 @@
+import numpy as np
+
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_simulate_photoino import SimulatePhotoinoController
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_1D.\
+    daq_1Dviewer_photoino import DAQ_1DViewer_photoino
+from pymodaq_plugins_photoino.processing.ring_buffer import RingBuffer
+
+
+def test_ring_buffer_keeps_latest_in_order():
+    buffer = RingBuffer(5)
+    buffer.extend(np.arange(3))
+    assert list(buffer.view()) == [0, 1, 2]
+    buffer.extend(np.arange(3, 7))
+    assert list(buffer.view()) == [2, 3, 4, 5, 6]
+    buffer.extend(np.arange(7, 20))
+    assert list(buffer.view()) == [15, 16, 17, 18, 19]
+    assert buffer.total == 20
+    buffer.resize(3)
+    assert list(buffer.view()) == [17, 18, 19]
+    buffer.resize(6)
+    buffer.extend([20])
+    assert list(buffer.view()) == [17, 18, 19, 20]
+
+
+def test_1D_viewer_emits_throttled_trace(monkeypatch):
+    monkeypatch.setattr(DAQ_1DViewer_photoino, 'controller_type',
+                        SimulatePhotoinoController)
+    plugin = DAQ_1DViewer_photoino(None, None)
+    plugin.settings.child('trace_length').setValue(50)
+    plugin.settings.child('refresh_rate').setValue(50.)
+    plugin.ini_detector()
+    emitted = []
+    plugin.data_grabed_signal.connect(emitted.append)
+    for _ in range(5):
+        plugin.grab_data()
+    plugin.stop()
+    plugin.close()
+    trace = emitted[-1][0]
+    assert len(emitted) == 5
+    assert trace.dim == 'Data1D'
+    assert trace.size == 50
+    assert trace.axes[0].get_data()[-1] == 0.
@@ -0,0 +1,62 @@
+import pytest
+
+from pymodaq_plugins_photoino.hardware.serial_reader import SerialReader
+
+
+class FakeSerial:
+    """Minimal stand-in for serial.Serial delivering preset chunks."""
+
+    def __init__(self, *chunks):
+        self.chunks = list(chunks)
+        self.pending = b''
+        self.reads = 0
+
+    @property
+    def in_waiting(self):
+        if not self.pending and self.chunks:
+            self.pending = self.chunks.pop(0)
+        return len(self.pending)
+
+    def read(self, n):
+        self.reads += 1
+        self.in_waiting
+        data, self.pending = self.pending[:n], self.pending[n:]
+        return data
+
+
+def test_read_number_skips_line_breaks():
+    reader = SerialReader(FakeSerial(b'\r\n\r\n1234\r\n'))
+    assert reader.read_number() == 1234
+
+
+def test_partial_lines_are_kept():
+    ser = FakeSerial(b'12', b'34\n5', b'6\n')
+    reader = SerialReader(ser)
+    assert reader.read_number() == 1234
+    assert reader.read_number() == 56
+
+
+def test_many_numbers_in_one_read():
+    ser = FakeSerial(b'1\n2\n3\n4')
+    reader = SerialReader(ser)
+    assert reader.read_numbers() == [1, 2, 3]
+    assert ser.reads == 1
+    assert len(reader) == 1
+
+
+def test_timeout():
+    reader = SerialReader(FakeSerial(b'42'))
+    with pytest.raises(TimeoutError):
+        reader.read_number()
+
+
+def test_read_exact():
+    reader = SerialReader(FakeSerial(b'7\nabc', b'def'))
+    assert reader.read_number() == 7
+    assert reader.read_exact(5) == b'abcde'
+    assert reader.read_exact(2) is None
+
+
+def test_read_exact_skips_line_breaks():
+    reader = SerialReader(FakeSerial(b'\r\n', b'\nxyz'))
+    assert reader.read_exact(3, skip_line_breaks=True) == b'xyz'
@@ -0,0 +1,36 @@
+import time
+
+from pymodaq_plugins_photoino.hardware.settings_cache import SettingsCache
+
+
+def test_immediate_writes_without_debounce():
+    writes = []
+    cache = SettingsCache(lambda name, value: writes.append((name, value)))
+    cache.set('level', 1.)
+    cache.set('level', 2.)
+    assert writes == [('level', 1.), ('level', 2.)]
+    assert cache.get('level') == 2.
+
+
+def test_burst_is_coalesced():
+    writes = []
+    cache = SettingsCache(lambda name, value: writes.append((name, value)),
+                          debounce=0.05)
+    for value in range(20):
+        cache.set('level', value)
+    cache.set('timebase', 5.)
+    assert writes == []
+    assert cache.get('level') == 19
+    time.sleep(0.2)
+    assert sorted(writes) == [('level', 19), ('timebase', 5.)]
+
+
+def test_flush_and_invalidate():
+    writes = []
+    cache = SettingsCache(lambda name, value: writes.append((name, value)),
+                          debounce=10.)
+    cache.set('level', 3.)
+    cache.flush()
+    assert writes == [('level', 3.)]
+    cache.invalidate()
+    assert 'level' not in cache
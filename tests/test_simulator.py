@@ -0,0 +1,57 @@
+import numpy as np
+
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_simulate_photoino import SimulatePhotoinoController
+from pymodaq_plugins_photoino.hardware.photon_stream import \
+    PhotonStreamSimulator
+
+
+def test_seeded_controllers_agree():
+    first = SimulatePhotoinoController(seed=1, block_size=16)
+    second = SimulatePhotoinoController(seed=1, block_size=16)
+    assert np.all(first.read_counts(100) == second.read_counts(100))
+
+
+def test_blocks_are_served_in_order():
+    controller = SimulatePhotoinoController(seed=2, block_size=8)
+    counts = [controller.count_rate for _ in range(5)]
+    counts.extend(controller.read_counts(11))
+    expected = np.random.default_rng(2).poisson(controller._mean(), 16)
+    assert np.all(np.array(counts) == expected)
+
+
+def test_rate_change_discards_block():
+    controller = SimulatePhotoinoController(seed=3)
+    controller.read_counts(10)
+    controller.trigger_level = 0.
+    assert controller.read_counts(10000).mean() > 1000
+
+
+def test_stream_not_realtime():
+    controller = SimulatePhotoinoController(seed=4, block_size=1000)
+    controller.realtime = False
+    controller.start_stream()
+    assert len(controller.read_stream()) == 1000
+    assert len(controller.read_stream(10)) == 10
+    controller.stop_stream()
+    assert not controller.streaming
+
+
+def test_photon_stream_dead_time_saturation():
+    photons = PhotonStreamSimulator(np.random.default_rng(5))
+    photons.signal_rate = 1e7
+    photons.afterpulse_probability = 0.
+    t = photons.events(0.01)
+    assert np.all(np.diff(t) >= photons.dead_time)
+    expected = photons.signal_rate / (1 + photons.signal_rate
+                                      * photons.dead_time)
+    assert abs(len(t) / 0.01 / expected - 1) < 0.01
+
+
+def test_photon_stream_engine_bins():
+    controller = SimulatePhotoinoController(seed=6)
+    controller.engine = 'photon stream'
+    controller.set_photon_parameter('dead_time', 0.)
+    controller.set_photon_parameter('afterpulse_probability', 0.)
+    controller.mean_count_rate = 100
+    assert abs(controller.read_counts(10000).mean() - 100) < 1
@@ -0,0 +1,50 @@
+import numpy as np
+from pymodaq.utils.data import DataFromPlugins
+
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_simulate_photoino import DAQ_0DViewer_simulate_photoino
+from pymodaq_plugins_photoino.processing.stages import COUNTS, Stage, \
+    merge_groups
+
+
+def group(name, labels):
+    return DataFromPlugins(name=name, dim='Data0D', labels=labels,
+                           data=[np.array([k]) for k in range(len(labels))])
+
+
+def test_merge_replaces_and_appends_channels():
+    merged = merge_groups([group(COUNTS, ['Counts']), group('Timing', ['a']),
+                           group(COUNTS, ['Counts', 'Bins']),
+                           group(COUNTS, ['Mean'])])
+    assert [data.name for data in merged] == [COUNTS, 'Timing']
+    assert merged[0].labels == ['Counts', 'Bins', 'Mean']
+    assert [channel[0] for channel in merged[0].data] == [0, 1, 0]
+
+
+def test_viewer_runs_its_stages():
+    class Peak(Stage):
+        params = {'title': 'Peak:', 'name': 'peak', 'type': 'bool',
+                  'value': True}
+
+        def bins(self, n):
+            return 2 * n
+
+        def update(self, counts, samples=None):
+            self.peak = counts.max()
+
+        def process(self, counts):
+            return [DataFromPlugins(name=COUNTS, data=[np.array([self.peak])],
+                                    dim='Data0D', labels=['Peak'])]
+
+    class Viewer(DAQ_0DViewer_simulate_photoino):
+        stage_types = (Peak,)
+
+    plugin = Viewer(None, None)
+    plugin.ini_detector()
+    emitted = []
+    plugin.data_grabed_signal.connect(emitted.append)
+    plugin.grab_data(5)
+    plugin.close()
+    counts = emitted[-1][0]
+    assert counts.labels == ['Counts', 'Peak']
+    assert plugin.stages[0].peak == counts.data[1][0]
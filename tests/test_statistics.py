@@ -0,0 +1,51 @@
+import numpy as np
+
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_simulate_photoino import DAQ_0DViewer_simulate_photoino
+from pymodaq_plugins_photoino.processing.statistics import AllanDeviation, \
+    RunningStats
+
+
+def overlapping_adev(values, tau):
+    cumulative = np.concatenate(([0.], np.cumsum(values)))
+    averages = (cumulative[tau:] - cumulative[:-tau]) / tau
+    differences = averages[tau:] - averages[:-tau]
+    return np.sqrt(differences @ differences / (2 * len(differences)))
+
+
+def test_streaming_statistics_match_batch_results():
+    values = np.random.default_rng(1).poisson(50, 10007)
+    stats = RunningStats()
+    allan = AllanDeviation([1, 3, 10, 100])
+    for batch in np.array_split(values, 37):
+        stats.update(batch)
+        allan.update(batch)
+    assert np.isclose(stats.mean, values.mean())
+    assert np.isclose(stats.variance, values.var(ddof=1))
+    assert np.allclose(allan.deviations,
+                       [overlapping_adev(values, tau) for tau in allan.taus])
+
+
+def test_allan_deviation_needs_two_averages():
+    allan = AllanDeviation([10])
+    allan.update(np.ones(15))
+    assert np.isnan(allan.deviations[0])
+
+
+def test_statistics_channels_next_to_counts():
+    plugin = DAQ_0DViewer_simulate_photoino(None, None)
+    plugin.settings.child('seed').setValue(0)
+    plugin.settings.child('statistics', 'statistics_enabled').setValue(True)
+    plugin.settings.child('statistics', 'allan_taus').setValue('1, 4')
+    plugin.ini_detector()
+    emitted = []
+    plugin.data_grabed_signal.connect(emitted.append)
+    for _ in range(10):
+        plugin.grab_data(100)
+    plugin.close()
+    counts = emitted[-1][0]
+    assert counts.labels == ['Counts', 'Mean', 'Std', 'SNR', 'ADEV 1 bins',
+                             'ADEV 4 bins']
+    mean, std = counts.data[1][0], counts.data[2][0]
+    assert abs(mean - 100) < 2
+    assert abs(std - 10) < 1
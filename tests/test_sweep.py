@@ -0,0 +1,112 @@
+import sys
+
+import numpy as np
+import pytest
+
+from pymodaq.utils.data import DataActuator
+from pymodaq_plugins_photoino.daq_move_plugins.daq_move_photoino import \
+    DAQ_Move_photoino
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_photoino import PhotoinoController
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_0D.\
+    daq_0Dviewer_simulate_photoino import SimulatePhotoinoController
+from pymodaq_plugins_photoino.daq_viewer_plugins.plugins_1D.\
+    daq_1Dviewer_photoino_sweep import DAQ_1DViewer_photoino_sweep
+from pymodaq_plugins_photoino.hardware.fake_device import FakePhotoino
+
+needs_pty = pytest.mark.skipif(sys.platform == 'win32',
+                               reason='needs a pseudo terminal')
+
+
+@needs_pty
+def test_sweep_uploads_levels_in_chunks():
+    with FakePhotoino(seed=0) as device:
+        controller = PhotoinoController()
+        controller.open(device.port, 0, binary=True)
+        levels = np.linspace(0., 2., 70)
+        counts = controller.sweep(levels, bins=5)
+        assert len(counts) == 70
+        assert np.all(counts > 0)
+        assert sum(c.startswith('sweep 5 ') for c in device.commands) == 3
+        assert device.trigger_level == 2.
+        assert controller.trigger_level == 2.
+        controller.close()
+
+
+def test_simulated_sweep_follows_trigger_level():
+    controller = SimulatePhotoinoController(seed=0)
+    counts = controller.sweep([0., 1.], bins=100)
+    assert counts[0] > counts[1]
+    assert controller.trigger_level == 1.
+
+
+def test_sweep_viewer_emits_curve(monkeypatch):
+    monkeypatch.setattr(DAQ_1DViewer_photoino_sweep, 'controller_type',
+                        SimulatePhotoinoController)
+    plugin = DAQ_1DViewer_photoino_sweep(None, None)
+    plugin.settings.child('sweep', 'sweep_points').setValue(11)
+    plugin.ini_detector()
+    emitted = []
+    plugin.data_grabed_signal.connect(emitted.append)
+    plugin.grab_data()
+    plugin.close()
+    curve = emitted[-1][0]
+    assert curve.size == 11
+    assert curve.axes[0].get_data()[-1] == 2.
+    assert plugin.controller.trigger_level == plugin.settings['trigger_level']
+
+
+@needs_pty
+def test_sweep_viewer_reports_busy_and_lost_device():
+    device = FakePhotoino().open()
+    plugin = DAQ_1DViewer_photoino_sweep(None, None)
+    plugin.settings.child('serial_port').setValue(device.port)
+    plugin.settings.child('sweep', 'sweep_points').setValue(5)
+    plugin.ini_detector()
+    emitted, statuses = [], []
+    plugin.data_grabed_signal.connect(emitted.append)
+    plugin.emit_status = lambda status: statuses.append(status.attribute[0])
+    plugin.controller.start_stream()
+    plugin.grab_data()
+    plugin.controller.stop_stream()
+    assert statuses[-1].startswith('photoino busy')
+    device.close()
+    plugin.grab_data()
+    assert plugin.controller.reconnecting
+    assert statuses[-1].startswith('photoino connection lost')
+    plugin.close()
+    assert [curve[0].size for curve in emitted] == [5, 5]
+    assert all(np.isnan(curve[0].data[0]).all() for curve in emitted)
+
+
+@needs_pty
+def test_actuator_sets_trigger_level_and_time_base():
+    with FakePhotoino() as device:
+        actuator = DAQ_Move_photoino(None, None)
+        actuator.settings.child('serial_port').setValue(device.port)
+        actuator.ini_stage()
+        actuator.move_abs(DataActuator(data=2.5))
+        assert actuator.get_actuator_value().value() == 2.5
+        actuator.axis_name = 'Time base'
+        assert actuator.axis_unit == 'ms'
+        actuator.move_abs(DataActuator(data=0.))
+        assert actuator.get_actuator_value().value() == 0.1
+        actuator.controller.count_rate
+        assert device.trigger_level == 2.5 and device.time_base == 0.1
+        actuator.close()
+
+
+@needs_pty
+def test_actuator_relative_move_is_scaled():
+    with FakePhotoino() as device:
+        actuator = DAQ_Move_photoino(None, None)
+        actuator.settings.child('serial_port').setValue(device.port)
+        actuator.ini_stage()
+        actuator.move_abs(DataActuator(data=1., units='V'))
+        actuator.settings.child('scaling', 'use_scaling').setValue(True)
+        actuator.settings.child('scaling', 'scaling').setValue(2.)
+        actuator.current_value = DataActuator(data=2., units='V')
+        actuator.move_rel(DataActuator(data=1., units='V'))
+        assert actuator.target_value.value() == 3.
+        assert actuator.controller.trigger_level == 1.5
+        actuator.close()
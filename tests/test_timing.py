@@ -0,0 +1,29 @@
+import numpy as np
+
+from pymodaq_plugins_photoino.hardware.stream import SampleQueue
+from pymodaq_plugins_photoino.hardware.timing import ClockDrift
+
+
+def test_clock_drift_fit():
+    clock = ClockDrift(nominal_period=1e-3)
+    rng = np.random.default_rng(0)
+    for k in range(500):
+        bins = 10 ** 9 + np.arange(100 * k, 100 * (k + 1))
+        latency = rng.exponential(1e-4)
+        times = np.full(100, 2. + 1.00005e-3 * (bins[-1] + 1) + latency)
+        clock.update(bins, times)
+    assert abs(1e6 * clock.drift - 50) < 1
+    assert abs(clock.host_time(bins[-1]) - times[-1]) < 1e-3
+
+
+def test_sample_queue_bins_and_split_batches():
+    queue = SampleQueue(maxlen=5)
+    queue.put([1, 2, 3])
+    queue.put([4, 5], bins=np.array([5, 6]))
+    queue.put([6])
+    assert queue.dropped == 1
+    samples = queue.get_samples(4)
+    assert list(samples['count']) == [1, 2, 3, 4]
+    assert list(samples['bin']) == [0, 1, 2, 5]
+    assert list(queue.get()) == [5]
+    assert len(queue.get(timeout=0.01)) == 0